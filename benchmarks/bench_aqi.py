@@ -0,0 +1,96 @@
+"""
+AQI em janelas móveis: paridade e custo da atualização incremental
+
+Gera medições horárias com timestamps irregulares e lacunas, compara as
+médias móveis com o rolling temporal do pandas, calcula o AQI diário do
+histórico completo e verifica que a mesma série entregue em lotes
+(update_aqi) produz exatamente o mesmo resultado, medindo o tempo de
+cada lote.
+
+Uso:
+    python benchmarks/bench_aqi.py --cities 100 --days 365 --batches 10
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from aqi import compute_aqi, load_aqi, rolling_means, update_aqi
+
+POLLUTANTS = ['PM2.5', 'PM10', 'O3', 'NO2']
+
+def make_dataset(n_cities, n_days, seed=42):
+    """Medições horárias com jitter de ±10 min, 10% de falhas e uma lacuna de 30 h por grupo"""
+    rng = np.random.default_rng(seed)
+    hours = pd.date_range('2024-01-01', periods=24 * n_days, freq='h')
+    frames = []
+    for city in range(n_cities):
+        for parameter in POLLUTANTS:
+            keep = rng.random(len(hours)) > 0.1
+            gap = rng.integers(0, max(1, len(hours) - 30))
+            keep[gap:gap + 30] = False
+            jitter = pd.to_timedelta(rng.integers(-600, 600, keep.sum()), unit='s')
+            frames.append(pd.DataFrame({
+                'date': hours[keep] + jitter,
+                'city': f'Estação {city:04d}',
+                'parameter': parameter,
+                'value': rng.gamma(3, 15, keep.sum()).round(2)
+            }))
+    return pd.concat(frames, ignore_index=True)
+
+def main():
+    parser = argparse.ArgumentParser(description='AQI: paridade e atualização incremental')
+    parser.add_argument('--cities', type=int, default=50, help='Número de estações')
+    parser.add_argument('--days', type=int, default=180, help='Dias de medições horárias')
+    parser.add_argument('--batches', type=int, default=10, help='Lotes da atualização incremental')
+    args = parser.parse_args()
+    
+    df = make_dataset(args.cities, args.days)
+    print(f"📊 {len(df):,} medições, {args.cities * len(POLLUTANTS)} grupos")
+    
+    # Médias móveis vs. rolling temporal do pandas
+    indicators = rolling_means(df)
+    reference = (
+        indicators.set_index('date').groupby(['city', 'parameter'], sort=False)['value']
+        .rolling('24h').mean().to_numpy()
+    )
+    pm = (indicators['parameter'] == 'PM2.5').to_numpy()
+    sample = indicators.loc[pm, 'window_mean'].to_numpy()
+    reference_pm = reference[pm]
+    assert np.allclose(sample, reference_pm, equal_nan=True), 'média móvel diverge do pandas'
+    print("✅ Médias móveis de 24 h idênticas ao rolling('24h') do pandas")
+    
+    start = time.perf_counter()
+    full, _ = compute_aqi(df)
+    full_seconds = time.perf_counter() - start
+    print(f"\n{'Histórico completo':<24}{full_seconds:>8.3f}s  {len(full):,} dias-grupo")
+    
+    # Mesmos dados entregues em lotes cronológicos
+    workdir = tempfile.mkdtemp(prefix='aq_aqi_')
+    try:
+        ordered = df.sort_values('date', ignore_index=True)
+        timings = []
+        for batch in np.array_split(np.arange(len(ordered)), args.batches):
+            start = time.perf_counter()
+            update_aqi(ordered.iloc[batch], workdir)
+            timings.append(time.perf_counter() - start)
+        incremental, _ = load_aqi(workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    
+    print(f"{'Lote incremental (média)':<24}{np.mean(timings[1:]):>8.3f}s  "
+          f"{len(ordered) // args.batches:,} linhas por lote")
+    pd.testing.assert_frame_equal(
+        incremental.reset_index(drop=True), full.astype(incremental.dtypes).reset_index(drop=True)
+    )
+    print("\n✅ AQI incremental idêntico ao recálculo completo")
+
+if __name__ == "__main__":
+    main()
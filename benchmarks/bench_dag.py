@@ -0,0 +1,156 @@
+"""
+Grafo de etapas: sobreposição, contrapressão e paridade do pipeline completo
+
+Primeiro mede o executor com etapas sintéticas (esperas que liberam o
+GIL, como E/S de rede e disco): executadas em sequência, o tempo é a
+soma das etapas; no grafo, tende ao da etapa mais lenta, e mais
+threads na etapa gargalo reduzem o tempo. Verifica também que as filas
+limitam os lotes em trânsito e que uma falha cancela o grafo. Depois
+executa o pipeline completo em um diretório temporário e compara
+dataset, agregados, AQI e estações com o cálculo sobre o dataset
+inteiro de uma vez.
+
+Uso:
+    python benchmarks/bench_dag.py --batches 20 --days 3000 --workers 2
+"""
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from aqi import compute_aqi, load_aqi
+from dag import StageGraph
+from data_cleaning import DataCleaner
+from data_collection import DataCollector
+from instrumentation import quiet
+from pipeline import run_full_pipeline
+from rollups import build_rollups, load_rollups
+from stations import StationRegistry
+from storage import read_dataset
+
+# Tempo de cada lote por etapa (s): a limpeza é o gargalo
+DELAYS = {'collect': 0.02, 'clean': 0.05, 'write': 0.03}
+
+class InFlight:
+    """Lotes coletados e ainda não gravados (máximo observado)"""
+    
+    def __init__(self):
+        self.current = self.peak = 0
+        self._lock = threading.Lock()
+    
+    def add(self, delta):
+        with self._lock:
+            self.current += delta
+            self.peak = max(self.peak, self.current)
+
+def synthetic_graph(n_batches, clean_workers=1, queue_size=2, fail_at=None):
+    in_flight = InFlight()
+    
+    def collect():
+        for i in range(n_batches):
+            time.sleep(DELAYS['collect'])
+            in_flight.add(1)
+            yield i
+    
+    def clean(batch):
+        time.sleep(DELAYS['clean'])
+        if batch == fail_at:
+            raise RuntimeError(f'falha simulada no lote {batch}')
+        return batch
+    
+    def write(batch):
+        time.sleep(DELAYS['write'])
+        in_flight.add(-1)
+    
+    graph = StageGraph('bench')
+    graph.add('collect', collect)
+    graph.add('clean', clean, after='collect', workers=clean_workers, queue_size=queue_size)
+    graph.add('write', write, after='clean', queue_size=queue_size)
+    return graph, in_flight
+
+def bench_executor(n_batches):
+    sequential = n_batches * sum(DELAYS.values())
+    print(f"\n{'Execução':<30}{'Tempo (s)':>11}{'Lotes em trânsito':>19}")
+    print(f"{'Sequencial (soma das etapas)':<30}{sequential:>11.2f}{1:>19}")
+    
+    for workers in (1, 2, 3):
+        graph, in_flight = synthetic_graph(n_batches, clean_workers=workers)
+        with quiet():
+            seconds = graph.run()['seconds']
+        print(f"{f'Grafo (limpeza com {workers} thread(s))':<30}{seconds:>11.2f}{in_flight.peak:>19}")
+        # Um lote em cada thread e filas de 2: coleta + fila + limpeza + fila + gravação
+        assert in_flight.peak <= 1 + 2 + workers + 2 + 1, 'contrapressão não limitou os lotes em trânsito'
+        if workers == 1:
+            slowest = n_batches * max(DELAYS.values())
+            assert seconds < sequential * 0.75, 'etapas não se sobrepõem'
+            assert seconds < slowest * 1.5, 'tempo longe do da etapa mais lenta'
+    
+    graph, _ = synthetic_graph(n_batches, fail_at=3)
+    start = time.perf_counter()
+    try:
+        with quiet():
+            graph.run()
+    except RuntimeError as exc:
+        print(f"\n✅ Falha propagada em {time.perf_counter() - start:.2f}s: {exc}")
+    else:
+        raise AssertionError('falha de etapa não propagada')
+
+def bench_pipeline(n_days, workers, cities_per_batch):
+    workdir = tempfile.mkdtemp(prefix='aq_dag_')
+    cwd = os.getcwd()
+    options = {'n_days': n_days}
+    try:
+        os.chdir(workdir)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()), quiet():
+            cleaned = run_full_pipeline(
+                use_cache=False, workers=workers, collector_options=options,
+                cities_per_batch=cities_per_batch
+            )
+        seconds = time.perf_counter() - start
+        
+        with contextlib.redirect_stdout(io.StringIO()), quiet():
+            raw = DataCollector(data_dir=workdir).download_sample_data(save=False, **options)
+            expected = DataCleaner(raw, verbose=False).clean_data()
+        
+        pd.testing.assert_frame_equal(cleaned.reset_index(drop=True), expected.reset_index(drop=True))
+        for got, want in zip(load_rollups('data/processed/rollups'), build_rollups(expected)):
+            pd.testing.assert_frame_equal(got, want)
+        for got, want in zip(load_aqi('data/processed/aqi'), compute_aqi(expected)):
+            pd.testing.assert_frame_equal(got, want)
+        pd.testing.assert_frame_equal(
+            StationRegistry.load('data/processed/stations.parquet').stations,
+            StationRegistry.from_frame(expected).stations.sort_values('station_id', ignore_index=True),
+            check_dtype=False
+        )
+        assert len(read_dataset('data/processed/dataset')) == len(expected)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    
+    print(f"\n📊 Pipeline completo: {len(expected):,} registros em {seconds:.2f}s "
+          f"({workers} processo(s) de limpeza, {cities_per_batch} cidade(s) por lote)")
+    print("✅ Dados limpos, dataset, agregados, AQI e estações idênticos ao processamento de uma vez")
+
+def main():
+    parser = argparse.ArgumentParser(description='Grafo de etapas do pipeline')
+    parser.add_argument('--batches', type=int, default=20, help='Lotes do grafo sintético')
+    parser.add_argument('--days', type=int, default=2000, help='Dias por grupo no pipeline')
+    parser.add_argument('--workers', type=int, default=1, help='Processos de limpeza no pipeline')
+    parser.add_argument('--cities-per-batch', type=int, default=1, help='Cidades por lote no pipeline')
+    args = parser.parse_args()
+    
+    bench_executor(args.batches)
+    bench_pipeline(args.days, args.workers, args.cities_per_batch)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Coleta da OpenAQ contra um servidor HTTP local que imita a API
+
+O servidor responde /v2/measurements com paginação, latência fixa e
+falhas aleatórias (429 com Retry-After e 503). O script compara a busca
+sequencial com a concorrente, simula uma queda no meio da coleta,
+verifica que a retomada pelo checkpoint não perde nem duplica registros
+e mede o tráfego de uma nova coleta com o cache de downloads (dentro do
+TTL e revalidando com ETag).
+
+Uso:
+    python benchmarks/bench_fetcher.py --cities 20 --days 60 --latency 0.05
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from download_cache import DownloadCache
+from fetcher import OpenAQFetcher, RequestsTransport, build_jobs
+from instrumentation import quiet
+
+POLLUTANTS = ['PM2.5', 'NO2', 'O3']
+
+class MockOpenAQ(BaseHTTPRequestHandler):
+    """Imitação do endpoint de medições: uma medição por hora no período"""
+    
+    protocol_version = 'HTTP/1.1'  # keep-alive, para o pool de conexões
+    latency = 0.05
+    failure_rate = 0.05
+    body_bytes = 0
+    
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        threading.Event().wait(self.latency)
+        
+        if url.path != '/v2/measurements':
+            return self._send(404, {'detail': 'not found'})
+        roll = random.random()
+        if roll < self.failure_rate / 2:
+            return self._send(429, {'detail': 'rate limited'}, {'Retry-After': '0.05'})
+        if roll < self.failure_rate:
+            return self._send(503, {'detail': 'unavailable'})
+        
+        hours = pd.date_range(query['date_from'], query['date_to'], freq='h', inclusive='left')
+        limit, page = int(query['limit']), int(query['page'])
+        selected = hours[(page - 1) * limit:page * limit]
+        seed = sum(map(ord, query['city'] + query['parameter']))
+        results = [
+            {
+                'location': f"{query['city']} Central",
+                'city': query['city'],
+                'country': 'XX',
+                'parameter': query['parameter'],
+                'value': round(20 + (seed + i) % 50 + 0.5, 2),
+                'unit': 'µg/m³',
+                'date': {'utc': ts.strftime('%Y-%m-%dT%H:%M:%S+00:00')},
+                'coordinates': {'latitude': -23.55, 'longitude': -46.63}
+            }
+            for i, ts in enumerate(selected, start=(page - 1) * limit)
+        ]
+        self._send(200, {'meta': {'found': len(hours), 'page': page, 'limit': limit},
+                         'results': results})
+    
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        if status == 200:
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            if self.headers.get('If-None-Match') == etag:
+                status, body = 304, b''
+            headers = {**(headers or {}), 'ETag': etag}
+            MockOpenAQ.body_bytes += len(body)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, *args):
+        pass
+
+class SimulatedCrash(Exception):
+    """Queda do processo no meio da coleta"""
+
+class CrashingTransport(RequestsTransport):
+    """Transporte que interrompe a coleta após um número de requisições"""
+    
+    def __init__(self, crash_after, **options):
+        super().__init__(**options)
+        self.remaining = crash_after
+    
+    async def get(self, url, params=None, headers=None):
+        self.remaining -= 1
+        if self.remaining < 0:
+            raise SimulatedCrash("queda simulada")
+        return await super().get(url, params=params, headers=headers)
+
+def start_server(latency, failure_rate):
+    MockOpenAQ.latency = latency
+    MockOpenAQ.failure_rate = failure_rate
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockOpenAQ)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+def run(base_url, output_dir, jobs, **options):
+    fetcher = OpenAQFetcher(output_dir, base_url=base_url, backoff=0.05, page_size=500, **options)
+    stats = asyncio.run(fetcher.fetch(jobs))
+    return fetcher, stats
+
+def main():
+    parser = argparse.ArgumentParser(description='Coleta OpenAQ contra servidor local')
+    parser.add_argument('--cities', type=int, default=10, help='Número de cidades')
+    parser.add_argument('--days', type=int, default=60, help='Dias de medições horárias')
+    parser.add_argument('--latency', type=float, default=0.05, help='Latência por requisição (s)')
+    parser.add_argument('--failure-rate', type=float, default=0.05, help='Fração de respostas 429/503')
+    parser.add_argument('--concurrency', type=int, default=16, help='Tarefas simultâneas')
+    args = parser.parse_args()
+    
+    random.seed(42)
+    server, base_url = start_server(args.latency, args.failure_rate)
+    workdir = tempfile.mkdtemp(prefix='aq_fetch_')
+    cities = [f'Cidade {i:03d}' for i in range(args.cities)]
+    end = pd.Timestamp('2024-01-01') + pd.Timedelta(days=args.days)
+    jobs = build_jobs(cities, POLLUTANTS, '2024-01-01', end, window_days=30)
+    expected = args.cities * len(POLLUTANTS) * args.days * 24
+    print(f"🌐 Servidor local: {base_url} | {len(jobs)} tarefas, {expected:,} registros esperados")
+    
+    try:
+        with quiet():
+            results = {}
+            for label, concurrency in (('sequencial', 1), ('concorrente', args.concurrency)):
+                fetcher, stats = run(
+                    base_url, os.path.join(workdir, label), jobs,
+                    concurrency=concurrency, rate_limit=1000
+                )
+                df = fetcher.load(jobs)
+                results[label] = stats['seconds']
+                print(f"  {label:<12}{stats['seconds']:>8.2f}s  {len(df):>10,} registros  "
+                      f"{stats['requests']:>6} requisições  {stats['retries']:>4} retentativas")
+                assert len(df) == expected and not stats['failed'], 'coleta incompleta'
+            
+            # Queda no meio da coleta e retomada pelo checkpoint
+            resume_dir = os.path.join(workdir, 'retomada')
+            try:
+                run(base_url, resume_dir, jobs, concurrency=args.concurrency, rate_limit=1000,
+                    transport=CrashingTransport(len(jobs), pool_size=args.concurrency))
+            except SimulatedCrash:
+                pass
+            fetcher, stats = run(base_url, resume_dir, jobs, concurrency=args.concurrency, rate_limit=1000)
+            df = fetcher.load(jobs)
+            duplicated = df.duplicated(['city', 'parameter', 'date']).sum()
+            
+            # Nova coleta do mesmo período com o cache de downloads
+            cache_dir = os.path.join(workdir, 'cache')
+            traffic = {}
+            for label, ttl in (('cache vazio', 3600), ('no TTL', 3600), ('revalidação', 0)):
+                cache = DownloadCache(cache_dir, ttls={'openaq': ttl})
+                before = MockOpenAQ.body_bytes
+                fetcher, _ = run(base_url, os.path.join(workdir, f'cache_{ttl}_{len(traffic)}'), jobs,
+                                 concurrency=args.concurrency, rate_limit=1000, cache=cache)
+                assert len(fetcher.load(jobs)) == expected, 'coleta com cache incompleta'
+                traffic[label] = (MockOpenAQ.body_bytes - before, dict(cache.counters))
+    finally:
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+    
+    print(f"  retomada    {stats['skipped']} tarefas puladas, {len(df):,} registros, "
+          f"{duplicated} duplicatas")
+    assert len(df) == expected and duplicated == 0, 'retomada inconsistente'
+    
+    print("\n🗄️  Cache de downloads (contadores acumulados)")
+    for label, (sent, counters) in traffic.items():
+        print(f"  {label:<12}{sent / 1e6:>8.2f} MB transferidos  {counters['hits']:>5} acertos  "
+              f"{counters['revalidated']:>5} revalidados (304)  {counters['misses']:>5} faltas")
+    assert traffic['no TTL'][0] == 0, 'coleta dentro do TTL não deveria usar a rede'
+    print(f"\n✅ Ganho da concorrência: {results['sequencial'] / results['concorrente']:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Tempo de importação do pacote e da CLI (python -X importtime)
+
+Executa cada alvo em um processo novo, soma o tempo cumulativo dos
+módulos de primeiro nível relatado por -X importtime (exceto os da
+inicialização do interpretador, como site) e compara a mediana com o
+orçamento do alvo. Também verifica que dependências pesadas não
+são carregadas por quem não precisa delas (ex.: `import src` sem pandas,
+pipeline sem Streamlit). Sai com código 1 se algum alvo estourar o
+orçamento.
+
+Uso:
+    python benchmarks/bench_import.py --repeat 5
+    python benchmarks/bench_import.py --budget-scale 2 --top 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# nome: (argumentos do python, orçamento em ms, módulos que não podem ser importados)
+TARGETS = {
+    'import src': (['-c', 'import src'], 15, ['pandas', 'pyarrow', 'streamlit', 'requests']),
+    'main.py --help': (['main.py', '--help'], 50, ['pandas', 'pyarrow', 'streamlit']),
+    'src.instrumentation': (['-c', 'import src.instrumentation'], 25, ['pandas', 'pyarrow']),
+    'src.data_collection': (['-c', 'import src.data_collection'], 900,
+                            ['requests', 'tqdm', 'streamlit', 'plotly']),
+    'src.pipeline': (['-c', 'import src.pipeline'], 900, ['streamlit', 'plotly', 'requests', 'duckdb'])
+}
+
+def import_profile(args):
+    """
+    Importações de uma execução
+    
+    Returns:
+        tuple: ({módulo de primeiro nível: tempo cumulativo em ms},
+            conjunto de todos os pacotes carregados)
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', *args],
+        cwd=REPO_DIR, capture_output=True, text=True, check=True
+    )
+    modules, loaded = {}, set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        loaded.add(name.strip().split('.')[0])
+        # Módulos aninhados são indentados; os de primeiro nível já incluem o tempo deles
+        if not name.startswith('  '):
+            modules[name.strip()] = int(cumulative) / 1000
+    return modules, loaded
+
+def main():
+    parser = argparse.ArgumentParser(description='Tempo de importação vs. orçamento')
+    parser.add_argument('--repeat', type=int, default=5, help='Execuções por alvo (mediana)')
+    parser.add_argument('--budget-scale', type=float, default=1.0,
+                        help='Multiplicador dos orçamentos (máquinas mais lentas)')
+    parser.add_argument('--top', type=int, default=5, help='Módulos mais caros exibidos por alvo')
+    args = parser.parse_args()
+    
+    # Módulos carregados por qualquer processo Python (não contam para os alvos)
+    startup = set(import_profile(['-c', 'pass'])[0])
+    
+    failures = []
+    print(f"{'Alvo':<22}{'Mediana (ms)':>14}{'Orçamento':>12}")
+    for target, (command, budget_ms, forbidden) in TARGETS.items():
+        runs = [import_profile(command) for _ in range(args.repeat)]
+        profiles = [
+            {name: ms for name, ms in modules.items() if name not in startup} for modules, _ in runs
+        ]
+        totals = [sum(profile.values()) for profile in profiles]
+        median_ms = statistics.median(totals)
+        budget_ms *= args.budget_scale
+        status = '✅' if median_ms <= budget_ms else '❌'
+        print(f"{target:<22}{median_ms:>14.1f}{budget_ms:>12.0f}  {status}")
+        
+        heavy = sorted(profiles[-1].items(), key=lambda item: -item[1])[:args.top]
+        print('      ' + ', '.join(f"{name} {ms:.0f}" for name, ms in heavy))
+        
+        if median_ms > budget_ms:
+            failures.append(f"{target}: {median_ms:.1f} ms > {budget_ms:.0f} ms")
+        unexpected = sorted(runs[-1][1] & set(forbidden))
+        if unexpected:
+            failures.append(f"{target}: importa {', '.join(unexpected)}")
+    
+    if failures:
+        print("\n❌ " + "\n❌ ".join(failures))
+        sys.exit(1)
+    print("\n✅ Todos os alvos dentro do orçamento")
+
+if __name__ == "__main__":
+    main()
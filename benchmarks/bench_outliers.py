@@ -0,0 +1,114 @@
+"""
+Detecção de leituras inválidas: throughput, acerto por detector e paridade com pandas
+
+Gera medições horárias com anomalias injetadas (valores negativos, picos,
+sensores travados e linhas em ppb), mede linhas por minuto da etapa
+completa (unidades + detectores), a fração de anomalias encontradas por
+detector e os falsos positivos, e compara a mediana móvel agrupada com
+o rolling(center=True).median() do pandas no interior dos grupos.
+
+Uso:
+    python benchmarks/bench_outliers.py --groups 2000 --hours 5000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from outliers import FLAGS, OutlierDetector, _grouped_median_filter
+
+POLLUTANTS = ['PM2.5', 'PM10', 'O3', 'NO2']
+
+def make_dataset(n_groups, n_hours, seed=42):
+    """Medições horárias por grupo e as linhas de cada anomalia injetada"""
+    rng = np.random.default_rng(seed)
+    n = n_groups * n_hours
+    group = np.repeat(np.arange(n_groups), n_hours)
+    hours = np.tile(np.arange(n_hours), n_groups)
+    daily = 10 * np.sin(2 * np.pi * hours / 24)
+    values = rng.uniform(20, 80, n_groups)[group] + daily + rng.normal(0, 5, n)
+    values = np.maximum(values, 0.5).round(2)
+    
+    anomalies = {}
+    picked = rng.choice(n, size=n // 200, replace=False)
+    negative, spikes = np.array_split(picked, 2)
+    values[negative] = -rng.uniform(1, 999, len(negative)).round(2)
+    values[spikes] = values[spikes] + rng.uniform(300, 800, len(spikes)).round(2)
+    anomalies['bounds'], anomalies['spike'] = negative, spikes
+    
+    # Sensores travados: 24 h repetindo a leitura (a primeira é mantida)
+    run_starts = rng.choice(np.arange(n_groups) * n_hours + n_hours // 2, size=n_groups // 10, replace=False)
+    stuck = (run_starts[:, None] + np.arange(1, 24)).ravel()
+    values[stuck] = np.repeat(values[run_starts], 23)
+    anomalies['flat'] = stuck
+    anomalies['spike'] = np.setdiff1d(anomalies['spike'], np.r_[stuck, run_starts])
+    
+    parameters = np.array(POLLUTANTS, dtype=object)[group % len(POLLUTANTS)]
+    df = pd.DataFrame({
+        'date': pd.Timestamp('2024-01-01') + pd.to_timedelta(hours, unit='h'),
+        'city': pd.Categorical.from_codes(group // len(POLLUTANTS),
+                                          [f'Estação {i:05d}' for i in range(n_groups)]),
+        'parameter': pd.Categorical(parameters, categories=POLLUTANTS),
+        'value': values,
+        'unit': pd.Categorical(np.full(n, 'µg/m³'), categories=['µg/m³', 'ppb'])
+    })
+    # 10% dos grupos de gases reportados em ppb
+    ppb = np.isin(parameters, ['O3', 'NO2']) & (group % 10 == 0)
+    df.loc[ppb, 'value'] = (df.loc[ppb, 'value'] / np.where(parameters[ppb] == 'O3', 1.962, 1.88)).round(4)
+    df.loc[ppb, 'unit'] = 'ppb'
+    return df.sample(frac=1, random_state=seed), anomalies, int(ppb.sum())
+
+def main():
+    parser = argparse.ArgumentParser(description='Detecção de leituras inválidas')
+    parser.add_argument('--groups', type=int, default=1000, help='Grupos cidade/poluente')
+    parser.add_argument('--hours', type=int, default=5000, help='Medições horárias por grupo')
+    args = parser.parse_args()
+    
+    df, anomalies, ppb_rows = make_dataset(args.groups, args.hours)
+    print(f"📊 {len(df):,} medições, {args.groups} grupos")
+    
+    detector = OutlierDetector(action='flag')
+    start = time.perf_counter()
+    converted = detector.normalize_units(df)
+    flags = detector.detect(df)
+    seconds = time.perf_counter() - start
+    print(f"\n⚡ {len(df) / seconds * 60 / 1e6:,.1f} milhões de linhas/min ({seconds:.2f}s)")
+    for line in detector.summary():
+        print(f"   {line}")
+    assert converted == ppb_rows, 'conversão de unidades incompleta'
+    
+    # Flags na ordem original das linhas
+    flags = pd.Series(flags, index=df.index).sort_index().to_numpy()
+    print(f"\n{'Detector':<10}{'Injetadas':>11}{'Encontradas':>13}{'Falsos +':>10}")
+    injected = np.zeros(len(flags), dtype=bool)
+    for name, rows in anomalies.items():
+        found = (flags[rows] & FLAGS[name]) > 0
+        injected[rows] = True
+        marked = (flags & FLAGS[name]) > 0
+        print(f"{name:<10}{len(rows):>11,}{found.mean():>12.1%}{(marked & ~injected).sum():>10,}")
+        assert found.mean() > 0.95, f'{name}: poucas anomalias encontradas'
+    false_positives = (flags > 0) & ~injected
+    print(f"\nFalsos positivos: {false_positives.sum():,} ({false_positives.mean():.4%} das linhas limpas)")
+    
+    # Mediana móvel agrupada vs. pandas, no interior dos grupos
+    sample = pd.Series(np.random.default_rng(0).normal(size=200 * 500))
+    groups = np.repeat(np.arange(200), 500)
+    starts, sizes = np.arange(200) * 500, np.full(200, 500)
+    start = time.perf_counter()
+    ours = _grouped_median_filter(sample.to_numpy(), starts, sizes, detector.window)
+    ours_s = time.perf_counter() - start
+    start = time.perf_counter()
+    reference = sample.groupby(groups).rolling(detector.window, center=True).median().to_numpy()
+    pandas_s = time.perf_counter() - start
+    interior = ~np.isnan(reference)
+    assert np.allclose(ours[interior], reference[interior]), 'mediana móvel diverge do pandas'
+    print(f"✅ Mediana móvel idêntica ao pandas no interior dos grupos "
+          f"({pandas_s / ours_s:.0f}x mais rápida)")
+
+if __name__ == "__main__":
+    main()
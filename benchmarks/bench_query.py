@@ -0,0 +1,107 @@
+"""
+Paridade e desempenho dos backends de consulta (pandas vs. DuckDB)
+
+Grava um dataset sintético particionado, executa as mesmas consultas
+(seleção, agregações e janela móvel) em cada backend disponível, sobre
+o DataFrame em memória e sobre o Parquet, e verifica que os resultados
+são iguais aos do pandas em memória.
+
+Uso:
+    python benchmarks/bench_query.py --days 3650 --cities 200
+"""
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from data_collection import DataCollector
+from data_cleaning import DataCleaner
+from query import available_backends, get_backend
+from storage import write_dataset
+
+def make_queries(cities):
+    """Consultas representativas do pipeline e do dashboard"""
+    where = {'city': cities[:3], 'parameter': ['PM2.5']}
+    return {
+        'aggregate.city_parameter': lambda q: q.aggregate(['city', 'parameter']),
+        'aggregate.year_filtered': lambda q: q.aggregate(
+            ['city', 'year'], funcs=('count', 'sum', 'mean', 'max'), where=where
+        ),
+        'window.rolling_mean_7': lambda q: q.window(size=7, where=where),
+        'select.date_range': lambda q: q.select(
+            where={**where, 'date': ('2021-01-01', '2021-12-31')},
+            columns=['date', 'city', 'parameter', 'value'],
+            order_by=['city', 'parameter', 'date']
+        )
+    }
+
+def normalize(df):
+    """Tipos e ordem comparáveis entre backends"""
+    df = df.copy()
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype) or df[col].dtype == object:
+            df[col] = df[col].astype(str)
+        elif pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = df[col].astype('datetime64[us]')
+        elif pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = df[col].astype('float64')
+    keys = [c for c in ['city', 'parameter', 'year', 'date'] if c in df.columns]
+    return df.sort_values(keys, ignore_index=True)
+
+def main():
+    parser = argparse.ArgumentParser(description='Paridade dos backends de consulta')
+    parser.add_argument('--days', type=int, default=1461, help='Dias por grupo')
+    parser.add_argument('--cities', type=int, default=50, help='Número de estações')
+    args = parser.parse_args()
+    
+    workdir = tempfile.mkdtemp(prefix='aq_query_')
+    try:
+        cities = [f'Estação {i:05d}' for i in range(args.cities)]
+        with contextlib.redirect_stdout(io.StringIO()):
+            raw = DataCollector(data_dir=workdir).download_sample_data(
+                n_days=args.days, cities=cities, save=False
+            )
+            df = DataCleaner(raw, verbose=False).clean_data()
+        dataset_dir = os.path.join(workdir, 'dataset')
+        write_dataset(df, dataset_dir)
+        print(f"📊 Dataset: {len(df):,} linhas | backends: {', '.join(available_backends())}")
+        
+        queries = make_queries(cities)
+        reference = {name: normalize(run(get_backend('pandas', df))) for name, run in queries.items()}
+        
+        print(f"\n{'Consulta':<28}{'Backend':<18}{'Tempo (s)':>11}  Paridade")
+        failures = 0
+        for backend in available_backends():
+            for label, source in (('memória', df), ('parquet', dataset_dir)):
+                engine = get_backend(backend, source)
+                for name, run in queries.items():
+                    start = time.perf_counter()
+                    result = run(engine)
+                    elapsed = time.perf_counter() - start
+                    try:
+                        pd.testing.assert_frame_equal(
+                            normalize(result), reference[name], check_exact=False, rtol=1e-9
+                        )
+                        status = '✅'
+                    except AssertionError as e:
+                        failures += 1
+                        status = f"❌ {str(e).splitlines()[0]}"
+                    print(f"{name:<28}{backend + '/' + label:<18}{elapsed:>11.4f}  {status}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    
+    if failures:
+        print(f"\n❌ {failures} consulta(s) divergente(s)")
+        sys.exit(1)
+    print("\n✅ Todos os backends produzem os mesmos resultados")
+
+if __name__ == "__main__":
+    main()
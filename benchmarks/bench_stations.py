@@ -0,0 +1,85 @@
+"""
+Consultas espaciais de estações: BallTree haversine vs. força bruta
+
+Gera estações espalhadas pelo globo, monta o cadastro a partir das
+medições e compara vizinho mais próximo e busca por raio com a matriz
+completa de distâncias (haversine_distances), verificando que os
+resultados são idênticos.
+
+Uso:
+    python benchmarks/bench_stations.py --stations 20000 --points 2000 --radius 100
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics.pairwise import haversine_distances
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from stations import EARTH_RADIUS_KM, StationRegistry
+
+POLLUTANTS = ['PM2.5', 'PM10', 'O3', 'NO2']
+
+def make_dataset(n_stations, seed=42):
+    """Duas medições por estação, com poluentes sorteados"""
+    rng = np.random.default_rng(seed)
+    stations = pd.DataFrame({
+        'city': [f'Estação {i:05d}' for i in range(n_stations)],
+        'latitude': np.degrees(np.arcsin(rng.uniform(-1, 1, n_stations))),
+        'longitude': rng.uniform(-180, 180, n_stations)
+    })
+    return pd.concat([
+        stations.assign(parameter=rng.choice(POLLUTANTS, n_stations)) for _ in range(2)
+    ], ignore_index=True)
+
+def main():
+    parser = argparse.ArgumentParser(description='Consultas espaciais: BallTree vs. força bruta')
+    parser.add_argument('--stations', type=int, default=20000, help='Número de estações')
+    parser.add_argument('--points', type=int, default=1000, help='Pontos consultados')
+    parser.add_argument('--radius', type=float, default=100.0, help='Raio da busca (km)')
+    args = parser.parse_args()
+    
+    df = make_dataset(args.stations)
+    start = time.perf_counter()
+    registry = StationRegistry.from_frame(df)
+    registry.tree
+    build_seconds = time.perf_counter() - start
+    print(f"📍 {len(registry):,} estações, cadastro e índice em {build_seconds:.3f}s")
+    
+    rng = np.random.default_rng(0)
+    lats = np.degrees(np.arcsin(rng.uniform(-1, 1, args.points)))
+    lons = rng.uniform(-180, 180, args.points)
+    
+    start = time.perf_counter()
+    nearest = registry.nearest(lats, lons, k=1)
+    within = registry.within_radius(lats, lons, args.radius)
+    tree_seconds = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    coords = np.radians(registry.stations[['latitude', 'longitude']].to_numpy())
+    distances = haversine_distances(np.radians(np.column_stack([lats, lons])), coords) * EARTH_RADIUS_KM
+    expected_nearest = distances.argmin(axis=1)
+    points, positions = np.nonzero(distances <= args.radius)
+    brute_seconds = time.perf_counter() - start
+    
+    print(f"\n{'Método':<16}{'Tempo (s)':>11}")
+    print(f"{'BallTree':<16}{tree_seconds:>11.3f}")
+    print(f"{'Força bruta':<16}{brute_seconds:>11.3f}")
+    
+    ids = registry.stations['station_id'].to_numpy()
+    assert np.array_equal(nearest['station_id'].to_numpy(), ids[expected_nearest]), 'vizinho diverge'
+    assert np.allclose(nearest['distance_km'], distances[np.arange(args.points), expected_nearest])
+    reference = pd.DataFrame({'point': points, 'station_id': ids[positions]})
+    found = within[['point', 'station_id']].astype(reference.dtypes)
+    pd.testing.assert_frame_equal(
+        found.sort_values(['point', 'station_id'], ignore_index=True),
+        reference.sort_values(['point', 'station_id'], ignore_index=True)
+    )
+    print(f"\n✅ Vizinhos e {len(within):,} pares no raio idênticos à força bruta")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+Suíte de benchmarks: coleta, limpeza, pipeline, gravação e consultas do dashboard
+
+Mede tempo e pico de memória (tracemalloc) de cada operação em vários
+tamanhos de dataset sintético, grava os resultados em JSON e compara com
+uma linha de base armazenada para detectar regressões.
+
+Uso:
+    python benchmarks/run_benchmarks.py --sizes 1e4 1e5 1e6
+    python benchmarks/run_benchmarks.py --sizes 1e4 1e5 --save-baseline
+    python benchmarks/run_benchmarks.py --compare benchmarks/baseline.json --threshold 0.25
+"""
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, SRC_DIR)
+
+from data_collection import DataCollector
+from data_cleaning import DataCleaner
+from pipeline import run_full_pipeline
+from rollups import build_rollups, quantiles, summarize
+from storage import read_dataset, write_dataset
+from writers import FORMATS, write_table
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, 'results', 'latest.json')
+
+CLEANING_STEPS = [
+    '_convert_dtypes',
+    '_remove_duplicates',
+    '_detect_outliers',
+    '_handle_missing_values',
+    '_create_time_features',
+    '_validate_data'
+]
+
+POLLUTANTS = ['PM2.5', 'NO2', 'O3']
+
+# Filtro típico do dashboard
+QUERY_CITIES = 3
+QUERY_PARAMETERS = ['PM2.5']
+
+def sample_options(rows, max_days=3650):
+    """Parâmetros do gerador de exemplo para aproximadamente `rows` linhas"""
+    n_days = max(1, min(max_days, rows // (len(POLLUTANTS) * 10)))
+    n_cities = max(1, math.ceil(rows / (len(POLLUTANTS) * n_days)))
+    return {
+        'n_days': n_days,
+        'cities': [f'Cidade {i:05d}' for i in range(n_cities)],
+        'pollutants': POLLUTANTS,
+        'seed': 42,
+        'save': False
+    }
+
+def measure(fn, repeat=1, track_memory=True, setup=None):
+    """
+    Executa fn e retorna (menor tempo, pico de memória em MB, resultado)
+    
+    O tempo é medido sem tracemalloc (que deixa código com muitos objetos
+    Python várias vezes mais lento); o pico de memória vem de uma execução
+    adicional rastreada. Com setup, cada execução chama fn(setup()), com
+    o argumento criado fora da medição: operações que alteram os dados
+    nunca rodam sobre o resultado de uma execução anterior.
+    """
+    def arguments():
+        return (setup(),) if setup else ()
+    
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        args = arguments()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    
+    peak_mb = None
+    if track_memory:
+        args = arguments()
+        tracemalloc.start()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                fn(*args)
+            peak_mb = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+        finally:
+            tracemalloc.stop()
+    return best, peak_mb, result
+
+def run_size(rows, workdir, repeat, track_memory, include_pipeline):
+    """Executa todos os benchmarks para um tamanho de dataset"""
+    results = []
+    
+    def record(name, fn, n_rows=None, setup=None):
+        seconds, peak_mb, value = measure(fn, repeat, track_memory, setup)
+        n_rows = n_rows or rows
+        results.append({
+            'name': name,
+            'rows': rows,
+            'seconds': round(seconds, 6),
+            'rows_per_second': round(n_rows / seconds) if seconds > 0 else None,
+            'peak_mb': round(peak_mb, 2) if peak_mb is not None else None
+        })
+        print(f"  {name:<32}{seconds:>10.4f}s" + (f"{peak_mb:>10.1f} MB" if peak_mb is not None else ''))
+        return value
+    
+    options = sample_options(rows)
+    collector = DataCollector(data_dir=os.path.join(workdir, 'data'))
+    
+    # Coleta
+    raw = record('collect.get_data', lambda: collector.get_data(use_sample=True, **options))
+    
+    # Limpeza, etapa por etapa: cada execução parte de um DataCleaner novo
+    # com os dados anteriores à etapa
+    cleaned = raw
+    for step in CLEANING_STEPS:
+        cleaned = record(
+            f'clean.{step.lstrip("_")}', partial(_run_step, step=step),
+            setup=partial(DataCleaner, cleaned, verbose=False)
+        )
+    
+    # Gravação
+    record('write.csv', lambda: cleaned.to_csv(os.path.join(workdir, 'cleaned.csv'), index=False))
+    record('write.parquet', lambda: cleaned.to_parquet(os.path.join(workdir, 'cleaned.parquet'), index=False))
+    for fmt, ext in FORMATS.items():
+        record(f'write.writers_{fmt}', lambda: write_table(cleaned, os.path.join(workdir, f'out{ext}')))
+    dataset_dir = os.path.join(workdir, 'dataset')
+    record('write.partitioned', lambda: write_dataset(cleaned, dataset_dir))
+    
+    # Consultas do dashboard
+    cities = list(options['cities'][:QUERY_CITIES])
+    record('query.pandas_filter_groupby', lambda: _pandas_query(cleaned, cities))
+    record('query.read_dataset', lambda: read_dataset(
+        dataset_dir, cities=cities, parameters=QUERY_PARAMETERS,
+        columns=['date', 'city', 'parameter', 'value']
+    ))
+    aggregates, sketches = record('rollups.build', lambda: build_rollups(cleaned))
+    record('query.rollups', lambda: (
+        summarize(aggregates, cities, QUERY_PARAMETERS),
+        summarize(aggregates, cities, QUERY_PARAMETERS, grain='day', by=['period', 'city']),
+        quantiles(sketches, cities, QUERY_PARAMETERS)
+    ))
+    
+    # Pipeline completo (sem cache), executado em um diretório temporário
+    if include_pipeline:
+        def pipeline():
+            cwd = os.getcwd()
+            os.chdir(workdir)
+            try:
+                return run_full_pipeline(use_cache=False, collector_options=options)
+            finally:
+                os.chdir(cwd)
+        record('pipeline.run_full_pipeline', pipeline)
+    
+    return results
+
+def _run_step(cleaner, step):
+    """Executa uma etapa da limpeza e retorna os dados resultantes"""
+    getattr(cleaner, step)()
+    return cleaner.df
+
+def _pandas_query(df, cities):
+    """Consulta original do dashboard sobre as linhas brutas"""
+    filtered = df[df['city'].isin(cities) & df['parameter'].isin(QUERY_PARAMETERS)]
+    return (
+        filtered['value'].mean(),
+        filtered.groupby('city', observed=True)['value'].mean().idxmax(),
+        filtered.groupby(['city', 'parameter'], observed=True)['value'].mean()
+    )
+
+def compare(results, baseline, threshold):
+    """
+    Compara resultados com a linha de base
+    
+    Returns:
+        list: Regressões (tempo acima de (1 + threshold) x a linha de base)
+    """
+    reference = {(r['name'], r['rows']): r for r in baseline['results']}
+    regressions = []
+    
+    print(f"\n{'Benchmark':<34}{'Linhas':>12}{'Base (s)':>11}{'Atual (s)':>11}{'Razão':>8}")
+    for result in results:
+        base = reference.get((result['name'], result['rows']))
+        if base is None or not base['seconds']:
+            continue
+        ratio = result['seconds'] / base['seconds']
+        flag = ''
+        if ratio > 1 + threshold:
+            regressions.append({**result, 'baseline_seconds': base['seconds'], 'ratio': round(ratio, 3)})
+            flag = ' ⚠️'
+        print(f"{result['name']:<34}{result['rows']:>12,}{base['seconds']:>11.4f}"
+              f"{result['seconds']:>11.4f}{ratio:>7.2f}x{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks do projeto de qualidade do ar')
+    parser.add_argument('--sizes', nargs='+', type=float, default=[1e4, 1e5, 1e6],
+                        help='Tamanhos do dataset em linhas (ex.: 1e4 1e6 1e8)')
+    parser.add_argument('--repeat', type=int, default=1, help='Repetições (vale o menor tempo)')
+    parser.add_argument('--no-memory', action='store_true', help='Não medir memória (tracemalloc)')
+    parser.add_argument('--pipeline-max-rows', type=float, default=1e6,
+                        help='Maior tamanho em que o pipeline completo é medido')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='Arquivo JSON de resultados')
+    parser.add_argument('--compare', nargs='?', const=DEFAULT_BASELINE, help='Linha de base para comparação')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Tolerância de regressão (0.2 = 20%%)')
+    parser.add_argument('--save-baseline', action='store_true', help='Gravar os resultados como linha de base')
+    args = parser.parse_args()
+    
+    if args.compare and not os.path.exists(args.compare):
+        sys.exit(f"❌ Linha de base não encontrada: {args.compare}\n"
+                 f"   Gere uma com --save-baseline (na mesma máquina) antes de usar --compare")
+    
+    results = []
+    for size in args.sizes:
+        rows = int(size)
+        print(f"📊 {rows:,} linhas")
+        workdir = tempfile.mkdtemp(prefix='aq_bench_')
+        try:
+            results.extend(run_size(
+                rows, workdir, args.repeat, not args.no_memory,
+                include_pipeline=rows <= args.pipeline_max_rows
+            ))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'results': results
+    }
+    
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Resultados: {args.output}")
+    
+    if args.save_baseline:
+        with open(DEFAULT_BASELINE, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Linha de base: {DEFAULT_BASELINE}")
+    
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regressão(ões) acima de {args.threshold:.0%}")
+            sys.exit(1)
+        print("\n✅ Nenhuma regressão")
+
+if __name__ == "__main__":
+    main()
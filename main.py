@@ -3,6 +3,7 @@
 Script principal simplificado
 """
 import argparse
+import os
 import subprocess
 import sys
 
@@ -14,9 +15,60 @@ def main():
     parser.add_argument('--pipeline', action='store_true', help='Executar pipeline completo')
     parser.add_argument('--dashboard', action='store_true', help='Iniciar dashboard')
     parser.add_argument('--notebook', action='store_true', help='Abrir notebook')
+    parser.add_argument('--no-cache', action='store_true', help='Ignorar o cache de etapas do pipeline')
+    parser.add_argument('--incremental', action='store_true', help='Processar apenas dados novos no pipeline')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Processos para a limpeza paralela (no pipeline: lotes limpos ao mesmo tempo)')
+    parser.add_argument('--cities-per-batch', type=int, default=1,
+                        help='Cidades por lote no pipeline (coleta, limpeza e gravação se sobrepõem)')
+    parser.add_argument('--export', nargs='+', choices=['parquet', 'feather', 'csv'],
+                        help='Formatos de saída dos dados limpos (ex.: --export parquet csv)')
+    parser.add_argument('--query-backend', choices=['pandas', 'duckdb'],
+                        help='Backend das consultas analíticas (padrão: $AQ_QUERY_BACKEND ou pandas)')
+    parser.add_argument('--profile', action='store_true', help='Medir tempo, linhas e memória por etapa')
+    parser.add_argument('--profile-output', default='data/processed/profile.jsonl',
+                        help='Arquivo JSON lines com as medições do --profile')
+    parser.add_argument('--profile-tracemalloc', action='store_true',
+                        help='Incluir o pico de memória Python (tracemalloc) por etapa; o pico '
+                             'é do processo, então etapas que rodam ao mesmo tempo em outras '
+                             'threads (grafo do pipeline) ficam sem ele')
+    parser.add_argument('--profile-cprofile', action='store_true',
+                        help='Capturar um perfil cProfile (.prof ao lado do JSON lines), somando '
+                             'as threads das etapas; processos de limpeza (--workers) não entram')
+    parser.add_argument('--log-level', default='INFO',
+                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], help='Nível das mensagens')
     
     args = parser.parse_args()
     
+    # Logger e perfil valem para os comandos executados neste processo
+    recorder = None
+    if args.collect or args.clean or args.pipeline:
+        from src import instrumentation
+        instrumentation.set_log_level(args.log_level)
+        if args.profile:
+            recorder = instrumentation.enable(
+                tracemalloc=args.profile_tracemalloc, cprofile=args.profile_cprofile
+            )
+    
+    try:
+        run_command(args)
+    finally:
+        if recorder is not None:
+            report_profile(instrumentation.disable(), args.profile_output)
+
+def report_profile(recorder, output):
+    """Exibe a tabela de medições e grava o JSON lines (e o .prof, se houver)"""
+    print("\n⏱️  PERFIL POR ETAPA")
+    print(recorder.summary_table())
+    print(f"\n💾 Medições: {recorder.export_jsonl(output)}")
+    
+    prof_path = recorder.export_cprofile(os.path.splitext(output)[0] + '.prof')
+    if prof_path:
+        print(recorder.cprofile_top())
+        print(f"💾 cProfile: {prof_path}")
+
+def run_command(args):
+    """Executa o comando escolhido na linha de comando"""
     if args.collect:
         print("📥 Coletando dados...")
         from src.data_collection import DataCollector
@@ -30,13 +82,26 @@ def main():
         from src.data_cleaning import clean_air_quality_data
         collector = DataCollector()
         raw = collector.get_data(use_sample=True)
-        cleaned = clean_air_quality_data(raw)
+        options = {'output_formats': tuple(args.export)} if args.export else {}
+        cleaned = clean_air_quality_data(raw, workers=args.workers, **options)
         print(f"✅ Limpos {len(cleaned):,} registros")
     
     elif args.pipeline:
         print("🚀 Executando pipeline...")
-        from src.pipeline import run_full_pipeline
-        run_full_pipeline()
+        from src.pipeline import incremental_conflict, run_full_pipeline
+        conflict = args.incremental and incremental_conflict()
+        if conflict:
+            sys.exit(f"❌ {conflict} não tem marcas d'água.\n"
+                     f"   Acrescentar em modo incremental duplicaria os dados: rode "
+                     f"--pipeline sem --incremental para recriá-lo com o estado incremental.")
+        run_full_pipeline(
+            use_cache=not args.no_cache,
+            incremental=args.incremental,
+            workers=args.workers,
+            cities_per_batch=args.cities_per_batch,
+            output_formats=tuple(args.export or ()),
+            query_backend=args.query_backend
+        )
     
     elif args.dashboard:
         print("🎨 Iniciando dashboard...")
@@ -56,6 +121,8 @@ Comandos:
   python main.py --pipeline     # Pipeline completo
   python main.py --dashboard    # Dashboard
   python main.py --notebook     # Notebook
+  python main.py --pipeline --profile   # Pipeline com perfil por etapa
+  python main.py --pipeline --workers 4 # Limpeza de 4 lotes em paralelo
 
 Ou direto:
   streamlit run src/dashboard.py
@@ -1,19 +1,34 @@
 """
 Módulo de análise de qualidade do ar
+
+Os submódulos são importados sob demanda: `import src` não carrega
+pandas, pyarrow nem o Streamlit, e cada nome público só importa o
+submódulo que o define no primeiro acesso.
 """
+import importlib
+
 __version__ = "1.0.0"
 __author__ = "David Matias"
 __email__ = "davidmatias8@gmail.com"
 
-from .data_collection import DataCollector
-from .data_cleaning import DataCleaner, clean_air_quality_data
-from .dashboard import AirQualityDashboard
-from .pipeline import run_full_pipeline
+# Nome público -> submódulo que o define
+_EXPORTS = {
+    'DataCollector': 'data_collection',
+    'DataCleaner': 'data_cleaning',
+    'clean_air_quality_data': 'data_cleaning',
+    'run_full_pipeline': 'pipeline',
+    'run_incremental_pipeline': 'pipeline',
+    'StationRegistry': 'stations'
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{_EXPORTS[name]}', __name__), name)
+    globals()[name] = value
+    return value
 
-__all__ = [
-    'DataCollector',
-    'DataCleaner',
-    'clean_air_quality_data',
-    'AirQualityDashboard',
-    'run_full_pipeline'
-]
\ No newline at end of file
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
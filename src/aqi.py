@@ -0,0 +1,304 @@
+"""
+Indicadores em janelas móveis e Índice de Qualidade do Ar (AQI, escala da EPA)
+
+Por (cidade, poluente), calcula a média móvel da janela regulatória
+(24 h para PM2.5/PM10, 8 h para O3, 1 h para NO2) sobre timestamps
+irregulares, o valor diário (média de 24 h no fim do dia ou máxima das
+médias de 8 h) e o AQI e sua categoria. A atualização incremental
+guarda só a cauda recente de cada grupo e recalcula apenas os dias
+afetados pelas linhas novas.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .writers import write_table
+except ImportError:
+    from writers import write_table
+
+AQI_DIR = 'data/processed/aqi'
+GROUP_KEYS = ['city', 'parameter']
+
+# Fração mínima das amostras esperadas na janela para o valor ser válido
+MIN_COVERAGE = 0.75
+
+# Histórico mantido para as atualizações incrementais (cobre a maior
+# janela e o dia corrente inteiro)
+TAIL_HOURS = 48
+
+# Faixas de concentração (na unidade da EPA) e do índice: (c_lo, c_hi, i_lo, i_hi)
+PM25_BREAKPOINTS = [
+    (0.0, 9.0, 0, 50), (9.1, 35.4, 51, 100), (35.5, 55.4, 101, 150),
+    (55.5, 125.4, 151, 200), (125.5, 225.4, 201, 300), (225.5, 325.4, 301, 500)
+]
+PM10_BREAKPOINTS = [
+    (0, 54, 0, 50), (55, 154, 51, 100), (155, 254, 101, 150),
+    (255, 354, 151, 200), (355, 424, 201, 300), (425, 604, 301, 500)
+]
+O3_8H_BREAKPOINTS = [
+    (0.0, 0.054, 0, 50), (0.055, 0.070, 51, 100), (0.071, 0.085, 101, 150),
+    (0.086, 0.105, 151, 200), (0.106, 0.200, 201, 300)
+]
+NO2_1H_BREAKPOINTS = [
+    (0, 53, 0, 50), (54, 100, 51, 100), (101, 360, 101, 150),
+    (361, 649, 151, 200), (650, 1249, 201, 300), (1250, 2049, 301, 500)
+]
+
+# Indicador de cada poluente: janela (horas), valor diário ('last' = janela
+# que termina na última medição do dia, 'max' = maior janela do dia),
+# fator de µg/m³ para a unidade da EPA (25 °C) e casas decimais truncadas
+INDICATORS = {
+    'PM2.5': {'window': 24, 'daily': 'last', 'scale': 1.0, 'decimals': 1,
+              'breakpoints': PM25_BREAKPOINTS},
+    'PM10': {'window': 24, 'daily': 'last', 'scale': 1.0, 'decimals': 0,
+             'breakpoints': PM10_BREAKPOINTS},
+    'O3': {'window': 8, 'daily': 'max', 'scale': 1 / 1962, 'decimals': 3,
+           'breakpoints': O3_8H_BREAKPOINTS},
+    'NO2': {'window': 1, 'daily': 'max', 'scale': 1 / 1.88, 'decimals': 0,
+            'breakpoints': NO2_1H_BREAKPOINTS}
+}
+
+CATEGORIES = [
+    'Boa', 'Moderada', 'Insalubre para grupos sensíveis',
+    'Insalubre', 'Muito insalubre', 'Perigosa'
+]
+CATEGORY_BOUNDS = [0, 50, 100, 150, 200, 300, 500]
+CATEGORY_COLORS = ['#00e400', '#ffff00', '#ff7e00', '#ff0000', '#8f3f97', '#7e0023']
+
+DAILY_COLUMNS = ['date', 'city', 'parameter', 'concentration', 'samples', 'aqi', 'category']
+TAIL_COLUMNS = ['date', 'city', 'parameter', 'value', 'interval']
+
+def rolling_means(df, intervals=None):
+    """
+    Média móvel temporal da janela de cada poluente, por (cidade, poluente)
+    
+    A janela é (t - janela, t] em tempo, não em número de linhas, então
+    lacunas e timestamps irregulares são tratados corretamente. A
+    cobertura compara as amostras na janela com as esperadas pelo
+    intervalo típico de amostragem do grupo (ex.: dados diários têm uma
+    amostra esperada por janela de 24 h).
+    
+    Args:
+        df (pd.DataFrame): date, city, parameter, value
+        intervals (pd.Series): Intervalo de amostragem em segundos por
+            (cidade, poluente); grupos ausentes são estimados de df
+    
+    Returns:
+        pd.DataFrame: date, city, parameter, value, interval, window_mean,
+            window_count e valid, ordenado por grupo e data
+    """
+    frame = _prepare(df)
+    frame['interval'] = _intervals(frame, intervals)
+    frame['window_mean'] = np.nan
+    frame['window_count'] = 0
+    frame['valid'] = False
+    
+    seconds = frame['date'].to_numpy(dtype='datetime64[s]').astype(np.int64)
+    codes = frame.groupby(GROUP_KEYS, sort=False, observed=True).ngroup().to_numpy()
+    parameters = frame['parameter'].to_numpy()
+    
+    for parameter, indicator in INDICATORS.items():
+        rows = np.flatnonzero(parameters == parameter)
+        if not len(rows):
+            continue
+        window = indicator['window'] * 3600
+        sums, counts = _window_sums(codes[rows], seconds[rows], frame['value'].to_numpy()[rows], window)
+        
+        expected = np.maximum(1, np.round(window / frame['interval'].to_numpy()[rows]))
+        frame.iloc[rows, frame.columns.get_loc('window_mean')] = np.round(sums / np.where(counts > 0, counts, np.nan), 9)
+        frame.iloc[rows, frame.columns.get_loc('window_count')] = counts
+        frame.iloc[rows, frame.columns.get_loc('valid')] = counts >= np.ceil(MIN_COVERAGE * expected)
+    return frame
+
+def daily_aqi(indicators):
+    """
+    Valor diário do indicador, AQI e categoria por (dia, cidade, poluente)
+    
+    Args:
+        indicators (pd.DataFrame): Saída de rolling_means
+    
+    Returns:
+        pd.DataFrame: date, city, parameter, concentration (µg/m³),
+            samples, aqi, category
+    """
+    valid = indicators[indicators['valid']]
+    valid = valid.assign(day=valid['date'].dt.floor('D'))
+    keys = ['day'] + GROUP_KEYS
+    
+    parts = []
+    for parameter, indicator in INDICATORS.items():
+        rows = valid[valid['parameter'] == parameter]
+        if rows.empty:
+            continue
+        grouped = rows.groupby(keys, sort=False, observed=True)
+        if indicator['daily'] == 'last':
+            concentration = grouped['window_mean'].last()
+        else:
+            concentration = grouped['window_mean'].max()
+        daily = pd.DataFrame({'concentration': concentration, 'samples': grouped['value'].count()})
+        daily['aqi'] = aqi_index(parameter, daily['concentration'].to_numpy())
+        parts.append(daily.reset_index())
+    
+    if not parts:
+        return pd.DataFrame(columns=DAILY_COLUMNS)
+    daily = pd.concat(parts, ignore_index=True).rename(columns={'day': 'date'})
+    daily['category'] = aqi_category(daily['aqi'])
+    return _sort(daily[DAILY_COLUMNS])
+
+def aqi_index(parameter, concentrations):
+    """
+    AQI de concentrações em µg/m³ (interpolação linear entre as faixas)
+    
+    Concentrações acima da última faixa recebem o índice máximo da tabela.
+    """
+    indicator = INDICATORS[parameter]
+    table = np.asarray(indicator['breakpoints'], dtype=np.float64)
+    c_lo, c_hi, i_lo, i_hi = table.T
+    
+    factor = 10 ** indicator['decimals']
+    values = np.floor(np.asarray(concentrations, dtype=np.float64) * indicator['scale'] * factor) / factor
+    band = np.minimum(np.searchsorted(c_hi, values, side='left'), len(table) - 1)
+    
+    index = (i_hi[band] - i_lo[band]) / (c_hi[band] - c_lo[band]) * (values - c_lo[band]) + i_lo[band]
+    index = np.where(values > c_hi[-1], i_hi[-1], np.round(index))
+    return np.where(np.isnan(values), np.nan, index)
+
+def aqi_category(aqi):
+    """Categoria do AQI (Boa, Moderada, ...)"""
+    return pd.cut(aqi, bins=CATEGORY_BOUNDS, labels=CATEGORIES, include_lowest=True).astype(str)
+
+def dominant_aqi(daily, cities=None, parameters=None):
+    """AQI diário de cada cidade: o maior entre os poluentes e qual o define"""
+    selected = daily
+    if cities is not None:
+        selected = selected[selected['city'].isin(list(cities))]
+    if parameters is not None:
+        selected = selected[selected['parameter'].isin(list(parameters))]
+    selected = selected.dropna(subset=['aqi'])
+    
+    top = selected.sort_values('aqi').drop_duplicates(['date', 'city'], keep='last')
+    return top.rename(columns={'parameter': 'dominant'}).sort_values(['city', 'date'], ignore_index=True)
+
+def compute_aqi(df):
+    """
+    Calcula os indicadores de todo o histórico
+    
+    Returns:
+        tuple: (daily, tail) — AQI diário e cauda recente para update_aqi
+    """
+    indicators = rolling_means(df)
+    return daily_aqi(indicators), _tail(indicators)
+
+def merge_aqi(results):
+    """
+    Junta resultados de compute_aqi calculados em lotes com grupos distintos
+    
+    Cada (cidade, poluente) precisa estar inteiro em um único lote, já
+    que as janelas móveis não atravessam lotes.
+    """
+    results = list(results)
+    daily = pd.concat([daily for daily, _ in results], ignore_index=True)
+    tail = pd.concat([tail for _, tail in results], ignore_index=True)
+    return _sort(daily), tail.sort_values(GROUP_KEYS + ['date'], kind='stable', ignore_index=True)
+
+def update_aqi(df, root_path=AQI_DIR):
+    """
+    Incorpora linhas novas sem recalcular o histórico
+    
+    Só a cauda gravada (últimas TAIL_HOURS de cada grupo) e as linhas
+    novas entram nas janelas, e só os dias a partir da primeira linha
+    nova de cada grupo são substituídos. Supõe lotes com datas
+    posteriores às já ingeridas (como o pipeline incremental).
+    """
+    try:
+        daily, tail = load_aqi(root_path)
+    except FileNotFoundError:
+        return write_aqi(compute_aqi(df), root_path)
+    
+    new = _prepare(df)
+    if new.empty:
+        return root_path
+    stored = tail.groupby(GROUP_KEYS, observed=True)['interval'].first()
+    combined = pd.concat([tail.drop(columns='interval'), new], ignore_index=True)
+    indicators = rolling_means(combined, intervals=stored)
+    
+    # Dias afetados: a partir do dia da primeira linha nova de cada grupo
+    first_new = new.groupby(GROUP_KEYS, observed=True)['date'].min().dt.floor('D')
+    starts = first_new.reindex(pd.MultiIndex.from_frame(indicators[GROUP_KEYS])).to_numpy()
+    recomputed = daily_aqi(indicators[indicators['date'].to_numpy() >= starts])
+    
+    replaced = pd.MultiIndex.from_frame(recomputed[['date'] + GROUP_KEYS])
+    keep = ~pd.MultiIndex.from_frame(daily[['date'] + GROUP_KEYS]).isin(replaced)
+    daily = _sort(pd.concat([daily[keep], recomputed], ignore_index=True))
+    return write_aqi((daily, _tail(indicators)), root_path)
+
+def write_aqi(result, root_path=AQI_DIR):
+    """Grava o AQI diário e a cauda em Parquet"""
+    daily, tail = result
+    os.makedirs(root_path, exist_ok=True)
+    for name, df in (('daily', daily), ('tail', tail)):
+        write_table(df, os.path.join(root_path, f'{name}.parquet'))
+    return root_path
+
+def load_aqi(root_path=AQI_DIR):
+    """Lê o AQI diário e a cauda gravados (FileNotFoundError se não existirem)"""
+    return (
+        pd.read_parquet(os.path.join(root_path, 'daily.parquet')),
+        pd.read_parquet(os.path.join(root_path, 'tail.parquet'))
+    )
+
+def _prepare(df):
+    """Colunas usadas, apenas poluentes com indicador, ordenadas por grupo e data"""
+    frame = pd.DataFrame({
+        'date': pd.to_datetime(df['date']).astype('datetime64[ns]'),
+        'city': df['city'].astype(str),
+        'parameter': df['parameter'].astype(str),
+        'value': pd.to_numeric(df['value'], errors='coerce').astype(np.float64)
+    })
+    frame = frame[frame['parameter'].isin(list(INDICATORS)) & frame['date'].notna()]
+    return frame.sort_values(GROUP_KEYS + ['date'], kind='stable', ignore_index=True)
+
+def _intervals(frame, known=None):
+    """Intervalo típico (mediana das diferenças, em segundos) de cada linha do seu grupo"""
+    gaps = frame[GROUP_KEYS].assign(
+        gap=frame.groupby(GROUP_KEYS, sort=False, observed=True)['date'].diff().dt.total_seconds()
+    )
+    estimated = gaps[gaps['gap'] > 0].groupby(GROUP_KEYS, observed=True)['gap'].median()
+    if known is not None and len(known):
+        estimated = known.replace(np.inf, np.nan).combine_first(estimated)
+    
+    keys = pd.MultiIndex.from_frame(frame[GROUP_KEYS])
+    # Grupos com uma única medição: uma amostra esperada por janela
+    return estimated.reindex(keys).fillna(np.inf).to_numpy()
+
+def _window_sums(codes, seconds, values, window):
+    """
+    Soma e contagem dos valores em (t - window, t] para cada linha
+    
+    Cada grupo é deslocado para um trecho próprio do eixo do tempo; assim
+    uma única busca binária encontra o início de todas as janelas. As
+    somas acumuladas recomeçam em cada grupo, o que mantém o erro de
+    arredondamento igual no recálculo completo e no incremental.
+    """
+    span = int(seconds.max() - seconds.min()) + window + 1
+    axis = (seconds - seconds.min()) + codes.astype(np.int64) * span
+    starts = np.searchsorted(axis, axis - window, side='right')
+    
+    observed = ~np.isnan(values)
+    filled = np.where(observed, values, 0.0)
+    cumsum = pd.Series(filled).groupby(codes).cumsum().to_numpy()
+    cumcount = np.concatenate([[0], np.cumsum(observed)])
+    ends = np.arange(1, len(values) + 1)
+    sums = cumsum - (cumsum[starts] - filled[starts])
+    return np.round(sums, 9), cumcount[ends] - cumcount[starts]
+
+def _tail(indicators):
+    """Últimas TAIL_HOURS de cada grupo, com o intervalo de amostragem"""
+    last = indicators.groupby(GROUP_KEYS, sort=False, observed=True)['date'].transform('max')
+    recent = indicators[indicators['date'] > last - pd.Timedelta(hours=TAIL_HOURS)]
+    return recent[TAIL_COLUMNS].reset_index(drop=True)
+
+def _sort(daily):
+    return daily.sort_values(GROUP_KEYS + ['date'], ignore_index=True)
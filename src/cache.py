@@ -0,0 +1,188 @@
+"""
+Cache de etapas do pipeline baseado em hash de conteúdo
+"""
+import hashlib
+import json
+import os
+import time
+
+import pandas as pd
+
+class StageCache:
+    """
+    Cache em disco para os artefatos de cada etapa do pipeline
+    
+    Cada etapa é identificada por uma impressão digital (fingerprint) dos
+    seus parâmetros, arquivos de origem e da etapa anterior. Se a
+    impressão digital não mudou, o artefato Parquet armazenado é reutilizado
+    e a etapa é pulada.
+    """
+    
+    INDEX_FILE = 'index.json'
+    
+    def __init__(self, cache_dir='data/cache', max_bytes=1024 ** 3, enabled=True):
+        """
+        Inicializa o cache
+        
+        Args:
+            cache_dir (str): Diretório dos artefatos e do índice
+            max_bytes (int): Tamanho máximo do cache; as entradas menos
+                usadas recentemente são removidas ao ultrapassá-lo
+            enabled (bool): Se False, nenhuma etapa é reutilizada
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.index_path = os.path.join(cache_dir, self.INDEX_FILE)
+        
+        os.makedirs(cache_dir, exist_ok=True)
+        self.index = self._load_index()
+    
+    @staticmethod
+    def fingerprint(params=None, files=None, parent=None, hash_contents=False):
+        """
+        Calcula a impressão digital de uma etapa
+        
+        Args:
+            params (dict): Configuração da etapa (serializável em JSON)
+            files (list): Arquivos de origem; entram com tamanho e mtime
+                (ou com o hash do conteúdo se hash_contents=True)
+            parent (str): Impressão digital da etapa anterior
+            hash_contents (bool): Usar o conteúdo dos arquivos em vez do mtime
+        
+        Returns:
+            str: Hash SHA-256 em hexadecimal
+        """
+        digest = hashlib.sha256()
+        digest.update(json.dumps(params or {}, sort_keys=True, default=str).encode())
+        digest.update((parent or '').encode())
+        
+        for path in sorted(files or []):
+            digest.update(os.path.abspath(path).encode())
+            if not os.path.exists(path):
+                digest.update(b'<ausente>')
+            elif hash_contents:
+                digest.update(_file_hash(path).encode())
+            else:
+                stat = os.stat(path)
+                digest.update(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+        
+        return digest.hexdigest()
+    
+    def load(self, stage, key):
+        """Retorna o DataFrame armazenado para a etapa ou None"""
+        entry = self._entry(stage, key)
+        if entry is None or not os.path.exists(entry['path']):
+            return None
+        
+        entry['last_access'] = time.time()
+        self._save_index()
+        return pd.read_parquet(entry['path'])
+    
+    def save(self, stage, key, df):
+        """Armazena o artefato da etapa e aplica o limite de tamanho"""
+        if not self.enabled:
+            return None
+        
+        path = os.path.join(self.cache_dir, f"{stage}-{key[:16]}.parquet")
+        df.to_parquet(path, index=False)
+        
+        self.index[self._name(stage, key)] = {
+            'stage': stage,
+            'key': key,
+            'path': path,
+            'bytes': os.path.getsize(path),
+            'last_access': time.time()
+        }
+        self.evict()
+        return path
+    
+    def is_current(self, stage, key):
+        """Verifica se as saídas registradas para a etapa ainda são válidas"""
+        entry = self._entry(stage, key)
+        if entry is None:
+            return False
+        return all(
+            os.path.exists(path) and _file_signature(path) == signature
+            for path, signature in entry.get('outputs', {}).items()
+        )
+    
+    def record(self, stage, key, outputs):
+        """Registra os arquivos gerados por uma etapa sem artefato próprio"""
+        if not self.enabled:
+            return
+        
+        # Apenas uma versão das saídas pode estar válida por vez
+        self.invalidate(stage)
+        self.index[self._name(stage, key)] = {
+            'stage': stage,
+            'key': key,
+            'outputs': {path: _file_signature(path) for path in outputs},
+            'bytes': 0,
+            'last_access': time.time()
+        }
+        self._save_index()
+    
+    def invalidate(self, stage=None):
+        """Remove as entradas de uma etapa (ou todas se stage=None)"""
+        for name, entry in list(self.index.items()):
+            if stage is None or entry['stage'] == stage:
+                self._remove(name)
+        self._save_index()
+    
+    def evict(self):
+        """Remove as entradas menos usadas até respeitar max_bytes"""
+        by_access = sorted(self.index.items(), key=lambda item: item[1]['last_access'])
+        for name, entry in by_access:
+            if self.size_bytes <= self.max_bytes:
+                break
+            self._remove(name)
+        self._save_index()
+    
+    @property
+    def size_bytes(self):
+        """Tamanho total dos artefatos armazenados"""
+        return sum(entry['bytes'] for entry in self.index.values())
+    
+    def _entry(self, stage, key):
+        if not self.enabled:
+            return None
+        return self.index.get(self._name(stage, key))
+    
+    def _name(self, stage, key):
+        return f"{stage}:{key}"
+    
+    def _remove(self, name):
+        entry = self.index.pop(name)
+        path = entry.get('path')
+        if path and os.path.exists(path):
+            os.remove(path)
+    
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            return {}
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            # Índice corrompido: recomeçar com o cache vazio
+            return {}
+    
+    def _save_index(self):
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+def _file_signature(path):
+    """Tamanho e mtime de um arquivo"""
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+def _file_hash(path, block_size=1 << 20):
+    """Hash SHA-256 do conteúdo de um arquivo"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
@@ -0,0 +1,304 @@
+"""
+Grafo de etapas do pipeline: lotes trafegam entre as etapas por filas limitadas
+"""
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from .instrumentation import child_options, get_logger, merge_records, profile_thread, run_recorded, span
+except ImportError:
+    from instrumentation import child_options, get_logger, merge_records, profile_thread, run_recorded, span
+
+logger = get_logger('dag')
+
+# Capacidade padrão da fila de entrada de cada etapa (em lotes)
+QUEUE_SIZE = 2
+
+# Intervalo em que esperas em filas verificam se outra etapa falhou
+POLL_SECONDS = 0.1
+
+# Marca de fim de fluxo enviada por cada etapa às seguintes
+_END = object()
+
+class Stage:
+    """Etapa do grafo: uma função aplicada a cada lote, com concorrência própria"""
+    
+    def __init__(self, name, func, after=(), workers=1, queue_size=QUEUE_SIZE, processes=False):
+        """
+        Args:
+            name (str): Nome único da etapa (também usado nos spans)
+            func (callable): Em uma fonte (sem etapas anteriores), func()
+                retorna um iterável de lotes; nas demais, func(lote)
+                retorna o lote repassado adiante (None = nada a repassar)
+            after (str | tuple): Etapas cujos lotes alimentam esta
+            workers (int): Lotes processados ao mesmo tempo (fontes usam 1)
+            queue_size (int): Capacidade da fila de entrada; com ela cheia,
+                as etapas anteriores esperam (contrapressão)
+            processes (bool): Executar func em um pool de `workers`
+                processos (func e lotes precisam ser serializáveis)
+        """
+        if workers < 1 or queue_size < 1:
+            raise ValueError(f"Etapa '{name}': workers e queue_size devem ser >= 1")
+        self.name = name
+        self.func = func
+        self.after = (after,) if isinstance(after, str) else tuple(after)
+        self.workers = workers if self.after else 1
+        self.queue_size = queue_size
+        self.processes = processes
+        self.stats = {}
+    
+    @property
+    def is_source(self):
+        return not self.after
+
+class StageGraph:
+    """
+    Grafo declarativo de etapas, executado com filas limitadas entre elas
+    
+    Cada etapa roda em suas próprias threads e entrega cada lote a todas
+    as etapas seguintes assim que termina, de modo que o lote N é limpo
+    enquanto o N+1 é coletado e o N-1 é gravado. Uma etapa com várias
+    anteriores recebe os lotes de todas. As filas limitadas aplicam
+    contrapressão: uma etapa lenta faz as anteriores esperarem em vez de
+    acumular lotes na memória, e o tempo total tende ao da etapa mais
+    lenta em vez da soma das etapas. Com workers > 1, os lotes podem
+    sair de uma etapa fora da ordem de chegada.
+    
+    Exemplo:
+        graph = StageGraph('pipeline')
+        graph.add('collect', read_batches)
+        graph.add('clean', clean_batch, after='collect', workers=4, processes=True)
+        graph.add('write', write_batch, after='clean')
+        graph.run()
+    """
+    
+    def __init__(self, name='dag'):
+        """
+        Args:
+            name (str): Prefixo dos spans das etapas (ex.: 'pipeline.clean')
+        """
+        self.name = name
+        self.stages = {}
+    
+    def add(self, name, func, after=(), **options):
+        """Acrescenta uma etapa (opções em Stage) e retorna o grafo"""
+        if name in self.stages:
+            raise ValueError(f"Etapa duplicada: '{name}'")
+        self.stages[name] = Stage(name, func, after, **options)
+        return self
+    
+    def order(self):
+        """Etapas em ordem topológica (ValueError com dependência desconhecida ou ciclo)"""
+        for stage in self.stages.values():
+            unknown = [name for name in stage.after if name not in self.stages]
+            if unknown:
+                raise ValueError(f"Etapa '{stage.name}' depende de etapas inexistentes: {unknown}")
+        
+        pending = {name: set(stage.after) for name, stage in self.stages.items()}
+        ordered = []
+        while pending:
+            ready = [name for name, parents in pending.items() if not parents]
+            if not ready:
+                raise ValueError(f"Ciclo entre as etapas: {sorted(pending)}")
+            for name in ready:
+                ordered.append(self.stages[name])
+                del pending[name]
+            for parents in pending.values():
+                parents.difference_update(ready)
+        return ordered
+    
+    def run(self):
+        """
+        Executa o grafo até todas as fontes se esgotarem
+        
+        A primeira exceção de qualquer etapa cancela as demais e é
+        relançada aqui.
+        
+        Returns:
+            dict: Tempo total ('seconds') e, por etapa ('stages'), lotes,
+                linhas, tempo ocupado, ocioso (esperando lotes) e
+                bloqueado (esperando espaço nas filas seguintes)
+        """
+        return _Run(self).execute()
+
+class _Run:
+    """Estado de uma execução do grafo: filas, threads e contadores"""
+    
+    def __init__(self, graph):
+        self.name = graph.name
+        self.stages = graph.order()
+        self.inputs = {
+            stage.name: queue.Queue(maxsize=stage.queue_size)
+            for stage in self.stages if not stage.is_source
+        }
+        self.downstream = {
+            stage.name: [self.inputs[child.name] for child in self.stages if stage.name in child.after]
+            for stage in self.stages
+        }
+        self.active = {stage.name: stage.workers for stage in self.stages}
+        self.ends = {stage.name: 0 for stage in self.stages}
+        self.pools = {}
+        self.errors = []
+        self.failed = threading.Event()
+        self.lock = threading.Lock()
+    
+    def execute(self):
+        for stage in self.stages:
+            stage.stats = {'workers': stage.workers, 'batches': 0, 'rows_in': 0, 'rows_out': 0,
+                           'busy_s': 0.0, 'idle_s': 0.0, 'blocked_s': 0.0}
+        
+        start = time.perf_counter()
+        threads = []
+        try:
+            for stage in self.stages:
+                if stage.processes:
+                    self.pools[stage.name] = ProcessPoolExecutor(max_workers=stage.workers)
+                for i in range(stage.workers):
+                    thread = threading.Thread(
+                        target=self._work, args=(stage,), name=f'{self.name}.{stage.name}-{i}', daemon=True
+                    )
+                    thread.start()
+                    threads.append(thread)
+            for thread in threads:
+                thread.join()
+        finally:
+            for pool in self.pools.values():
+                pool.shutdown(cancel_futures=True)
+        elapsed = time.perf_counter() - start
+        
+        if self.errors:
+            raise self.errors[0]
+        
+        result = {
+            'seconds': round(elapsed, 3),
+            'stages': {stage.name: _rounded(stage.stats) for stage in self.stages}
+        }
+        self._log(result)
+        return result
+    
+    def _work(self, stage):
+        try:
+            with profile_thread():
+                if stage.is_source:
+                    self._produce(stage)
+                else:
+                    self._consume(stage)
+        except BaseException as exc:
+            with self.lock:
+                self.errors.append(exc)
+            self.failed.set()
+            logger.error(f"❌ Etapa '{stage.name}' falhou: {exc!r}")
+        finally:
+            with self.lock:
+                self.active[stage.name] -= 1
+                last = self.active[stage.name] == 0
+            if last:
+                for target in self.downstream[stage.name]:
+                    self._put(target, _END)
+    
+    def _produce(self, stage):
+        batches = iter(stage.func())
+        try:
+            while not self.failed.is_set():
+                start = time.perf_counter()
+                with span(f'{self.name}.{stage.name}') as s:
+                    batch = next(batches, _END)
+                    s.rows_out = _rows(batch)
+                if batch is _END:
+                    return
+                self._account(stage, busy_s=time.perf_counter() - start, batches=1,
+                              rows_out=_rows(batch) or 0)
+                self._emit(stage, batch)
+        finally:
+            close = getattr(batches, 'close', None)
+            if close is not None:
+                close()
+    
+    def _consume(self, stage):
+        source = self.inputs[stage.name]
+        pool = self.pools.get(stage.name)
+        while True:
+            start = time.perf_counter()
+            batch = self._get(source)
+            self._account(stage, idle_s=time.perf_counter() - start)
+            if batch is None:
+                return
+            if batch is _END:
+                with self.lock:
+                    self.ends[stage.name] += 1
+                    done = self.ends[stage.name] >= len(stage.after)
+                if done:
+                    # Repassa o fim às outras threads da mesma etapa
+                    self._put(source, _END)
+                    return
+                continue
+            
+            start = time.perf_counter()
+            with span(f'{self.name}.{stage.name}', rows_in=_rows(batch)) as s:
+                if pool:
+                    # Spans do processo filho voltam com o resultado
+                    result, records = pool.submit(run_recorded, child_options(), stage.func, batch).result()
+                    merge_records(records)
+                else:
+                    result = stage.func(batch)
+                s.rows_out = _rows(result)
+            self._account(stage, busy_s=time.perf_counter() - start, batches=1,
+                          rows_in=_rows(batch) or 0, rows_out=_rows(result) or 0)
+            if result is not None:
+                self._emit(stage, result)
+    
+    def _emit(self, stage, batch):
+        """Entrega o lote a todas as etapas seguintes (espera se alguma fila estiver cheia)"""
+        start = time.perf_counter()
+        for target in self.downstream[stage.name]:
+            if not self._put(target, batch):
+                break
+        self._account(stage, blocked_s=time.perf_counter() - start)
+    
+    def _get(self, source):
+        """Próximo item da fila, ou None se outra etapa falhou"""
+        while True:
+            try:
+                return source.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                if self.failed.is_set():
+                    return None
+    
+    def _put(self, target, item):
+        """Coloca o item na fila; False se outra etapa falhou enquanto esperava"""
+        while True:
+            try:
+                target.put(item, timeout=POLL_SECONDS)
+                return True
+            except queue.Full:
+                if self.failed.is_set():
+                    return False
+    
+    def _account(self, stage, **deltas):
+        with self.lock:
+            for key, value in deltas.items():
+                stage.stats[key] += value
+    
+    def _log(self, result):
+        """Tabela de ocupação por etapa: a mais ocupada limita o tempo total"""
+        stages = result['stages']
+        logger.info(f"🔀 Grafo '{self.name}': {len(stages)} etapas em {result['seconds']:.2f}s "
+                    f"(soma das etapas: {sum(s['busy_s'] for s in stages.values()):.2f}s)")
+        logger.info(f"   {'Etapa':<16}{'Threads':>8}{'Lotes':>7}{'Linhas':>12}"
+                    f"{'Ocupada (s)':>13}{'Ociosa (s)':>12}{'Bloqueada (s)':>15}")
+        for name, stats in stages.items():
+            rows = stats['rows_out'] or stats['rows_in']
+            logger.info(f"   {name:<16}{stats['workers']:>8}{stats['batches']:>7}{rows:>12,}"
+                        f"{stats['busy_s']:>13.2f}{stats['idle_s']:>12.2f}{stats['blocked_s']:>15.2f}")
+
+def _rows(batch):
+    """Linhas de um lote (None se o lote não tiver tamanho)"""
+    try:
+        return len(batch)
+    except TypeError:
+        return None
+
+def _rounded(stats):
+    return {key: round(value, 3) if isinstance(value, float) else value for key, value in stats.items()}
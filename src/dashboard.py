@@ -1,69 +1,168 @@
 """
 Dashboard Streamlit simplificado
 """
+import functools
+
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 
-# Configuração
-st.set_page_config(
-    page_title="Dashboard de Qualidade do Ar",
-    page_icon="🌍",
-    layout="wide"
-)
+try:
+    from .aqi import CATEGORY_BOUNDS, CATEGORY_COLORS, INDICATORS, compute_aqi, dominant_aqi, load_aqi
+    from .downsampling import CHART_WIDTH_PX, downsample
+    from .rollups import build_rollups, load_rollups, quantiles, summarize
+    from .snapshot import filter_snapshot, open_snapshot, snapshot_version
+    from .stations import StationRegistry
+    from .storage import partition_values, read_dataset
+    from .writers import FORMATS, MIME_TYPES, to_bytes
+except ImportError:
+    from aqi import CATEGORY_BOUNDS, CATEGORY_COLORS, INDICATORS, compute_aqi, dominant_aqi, load_aqi
+    from downsampling import CHART_WIDTH_PX, downsample
+    from rollups import build_rollups, load_rollups, quantiles, summarize
+    from snapshot import filter_snapshot, open_snapshot, snapshot_version
+    from stations import StationRegistry
+    from storage import partition_values, read_dataset
+    from writers import FORMATS, MIME_TYPES, to_bytes
+
+# Colunas exibidas pelo dashboard (as demais não são lidas do disco)
+DISPLAY_COLUMNS = ['date', 'city', 'country', 'parameter', 'value', 'unit', 'season']
+
+@st.cache_resource(max_entries=2)
+def load_snapshot(version):
+    """Snapshot Arrow mapeado em memória, compartilhado entre sessões e processos"""
+    return open_snapshot(version=version)
 
 @st.cache_data
-def load_data():
-    """Carrega os dados processados"""
+def load_options(version=None):
+    """Cidades e poluentes disponíveis, lidos do snapshot ou do manifesto do dataset"""
+    if version is not None:
+        table = load_snapshot(version)
+        return (
+            sorted(table['city'].unique().to_pylist()),
+            sorted(table['parameter'].unique().to_pylist())
+        )
+    
+    values = partition_values()
+    if values:
+        return values['city'], values['parameter']
+    
+    df = load_sample_data()
+    return sorted(df['city'].unique()), sorted(df['parameter'].unique())
+
+@st.cache_data(max_entries=32)
+def load_data(cities, pollutants, version=None):
+    """
+    Carrega apenas as linhas e colunas dos filtros selecionados
+    
+    Com snapshot, só as linhas filtradas saem do arquivo mapeado; a
+    versão faz parte da chave do cache, então uma nova execução do
+    pipeline é vista sem reiniciar o servidor.
+    """
+    if version is not None:
+        return filter_snapshot(load_snapshot(version), cities, pollutants, DISPLAY_COLUMNS)
+    
+    try:
+        return read_dataset(
+            cities=list(cities), parameters=list(pollutants), columns=DISPLAY_COLUMNS
+        )
+    except (FileNotFoundError, ValueError):
+        df = load_sample_data()
+        return df[
+            (df['city'].isin(cities)) &
+            (df['parameter'].isin(pollutants))
+        ]
+
+@st.cache_data(max_entries=16)
+def export_data(cities, pollutants, fmt, version=None):
+    """Arquivo de download da seleção (gerado só no clique e cacheado por filtro)"""
+    return to_bytes(load_data(cities, pollutants, version), fmt)
+
+@st.cache_resource(max_entries=2)
+def load_rollup_store(version=None):
+    """Agregados pré-calculados (compartilhados entre sessões, sem cópia)"""
+    try:
+        return load_rollups()
+    except FileNotFoundError:
+        return build_rollups(load_sample_data())
+
+@st.cache_resource(max_entries=2)
+def load_aqi_store(version=None):
+    """AQI diário calculado pelo pipeline (ou a partir dos dados de exemplo)"""
     try:
-        return pd.read_parquet('data/processed/final_dataset.parquet')
-    except:
-        # Fallback para dados de exemplo
-        from data_collection import DataCollector
-        from data_cleaning import clean_air_quality_data
-        collector = DataCollector()
-        raw = collector.get_data(use_sample=True)
-        return clean_air_quality_data(raw, save_path=None)
+        return load_aqi()[0]
+    except FileNotFoundError:
+        return compute_aqi(load_sample_data())[0]
+
+@st.cache_resource(max_entries=2)
+def load_station_registry(version=None):
+    """Cadastro de estações com o índice espacial (construído uma vez por versão)"""
+    try:
+        registry = StationRegistry.load()
+    except FileNotFoundError:
+        registry = StationRegistry.from_frame(load_sample_data())
+    return registry.build_index()
+
+@st.cache_data
+def load_sample_data():
+    """Fallback para dados de exemplo quando o pipeline não foi executado"""
+    from data_collection import DataCollector
+    from data_cleaning import clean_air_quality_data
+    collector = DataCollector()
+    raw = collector.get_data(use_sample=True)
+    return clean_air_quality_data(raw, save_path=None)
 
 def main():
+    # Configuração (feita aqui para que importar o módulo não altere a página)
+    st.set_page_config(
+        page_title="Dashboard de Qualidade do Ar",
+        page_icon="🌍",
+        layout="wide"
+    )
+    
     st.title("🌍 Dashboard de Qualidade do Ar")
     st.markdown("Análise de poluição em cidades globais (2020-2023)")
     
-    # Carregar dados
-    df = load_data()
+    # Versão dos dados publicada pelo pipeline (muda a chave dos caches)
+    version = snapshot_version()
+    city_options, pollutant_options = load_options(version)
     
     # Sidebar
     st.sidebar.title("🔍 Filtros")
     
     cities = st.sidebar.multiselect(
         "Cidades:",
-        options=sorted(df['city'].unique()),
-        default=['São Paulo', 'Delhi', 'New York']
+        options=city_options,
+        default=[c for c in ['São Paulo', 'Delhi', 'New York'] if c in city_options]
     )
     
     pollutants = st.sidebar.multiselect(
         "Poluentes:",
-        options=sorted(df['parameter'].unique()),
-        default=['PM2.5']
+        options=pollutant_options,
+        default=[p for p in ['PM2.5'] if p in pollutant_options]
+    )
+    
+    downsampling_method = st.sidebar.radio(
+        "Redução de pontos do gráfico:",
+        options=['lttb', 'minmax'],
+        format_func={'lttb': 'LTTB (forma)', 'minmax': 'Mín/Máx (picos)'}.get
     )
     
-    # Filtrar
-    filtered_df = df[
-        (df['city'].isin(cities)) &
-        (df['parameter'].isin(pollutants))
-    ]
+    # Métricas e gráficos vêm dos agregados pré-calculados
+    aggregates, sketches = load_rollup_store(version)
+    city_avg = summarize(aggregates, cities, pollutants)
     
     # Métricas
     col1, col2, col3 = st.columns(3)
     with col1:
-        avg = filtered_df['value'].mean()
+        avg = city_avg['sum'].sum() / city_avg['count'].sum() if not city_avg.empty else float('nan')
         st.metric("Média Geral", f"{avg:.1f} µg/m³")
     with col2:
-        worst_city = filtered_df.groupby('city')['value'].mean().idxmax()
+        city_means = summarize(aggregates, cities, pollutants, by=['city'])
+        worst_city = city_means.loc[city_means['mean'].idxmax(), 'city'] if not city_means.empty else "-"
         st.metric("Cidade Mais Poluída", worst_city)
     with col3:
-        total = len(filtered_df)
+        total = int(city_avg['count'].sum())
         st.metric("Total de Registros", f"{total:,}")
     
     st.markdown("---")
@@ -71,16 +170,23 @@ def main():
     # Gráfico 1: Tendência temporal
     st.subheader("📈 Tendência Temporal")
     
-    if not filtered_df.empty:
+    if not city_avg.empty:
+        daily = summarize(
+            aggregates, cities, pollutants, grain='day', by=['period', 'city', 'parameter']
+        ).rename(columns={'period': 'date', 'mean': 'value'})
+        # No máximo um ponto por pixel de largura em cada série
+        daily = downsample(
+            daily, by=['city', 'parameter'], max_points=CHART_WIDTH_PX, method=downsampling_method
+        )
         fig1 = px.line(
-            filtered_df,
+            daily,
             x='date',
             y='value',
             color='city',
             line_dash='parameter',
             title='Evolução da Poluição'
         )
-        st.plotly_chart(fig1, use_container_width=True)
+        st.plotly_chart(fig1, width='stretch')
     
     # Gráfico 2: Comparação entre cidades
     st.subheader("🏙️ Comparação entre Cidades")
@@ -88,38 +194,90 @@ def main():
     col1, col2 = st.columns(2)
     
     with col1:
-        fig2 = px.box(
-            filtered_df,
-            x='city',
-            y='value',
-            color='parameter',
-            title='Distribuição por Cidade'
+        # Box plot a partir dos quantis (p5/p25/p50/p75/p95) dos esboços
+        city_quantiles = quantiles(sketches, cities, pollutants)
+        fig2 = go.Figure()
+        for i, (parameter, group) in enumerate(city_quantiles.groupby('parameter')):
+            fig2.add_trace(go.Box(
+                name=parameter,
+                x=group['city'],
+                lowerfence=group['q0.05'],
+                q1=group['q0.25'],
+                median=group['q0.5'],
+                q3=group['q0.75'],
+                upperfence=group['q0.95'],
+                marker_color=px.colors.qualitative.Plotly[i % len(px.colors.qualitative.Plotly)]
+            ))
+        fig2.update_layout(
+            title='Distribuição por Cidade',
+            boxmode='group',
+            xaxis_title='city',
+            yaxis_title='value',
+            legend_title='parameter'
         )
-        st.plotly_chart(fig2, use_container_width=True)
+        st.plotly_chart(fig2, width='stretch')
     
     with col2:
-        city_avg = filtered_df.groupby(['city', 'parameter'])['value'].mean().reset_index()
         fig3 = px.bar(
-            city_avg,
+            city_avg.rename(columns={'mean': 'value'}),
             x='city',
             y='value',
             color='parameter',
             barmode='group',
             title='Média por Cidade'
         )
-        st.plotly_chart(fig3, use_container_width=True)
+        st.plotly_chart(fig3, width='stretch')
+    
+    # Gráfico 3: AQI diário (poluente dominante entre os selecionados)
+    st.subheader("🌡️ Índice de Qualidade do Ar (AQI)")
+    
+    city_aqi = dominant_aqi(load_aqi_store(version), cities, pollutants)
+    if not city_aqi.empty:
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            chart = downsample(
+                city_aqi, y='aqi', by=['city'], max_points=CHART_WIDTH_PX, method=downsampling_method
+            )
+            fig4 = px.line(chart, x='date', y='aqi', color='city', title='AQI Diário')
+            for low, high, color in zip(CATEGORY_BOUNDS[:-1], CATEGORY_BOUNDS[1:], CATEGORY_COLORS):
+                if low < chart['aqi'].max():
+                    fig4.add_hrect(y0=low, y1=high, fillcolor=color, opacity=0.12, line_width=0)
+            st.plotly_chart(fig4, width='stretch')
+        with col2:
+            latest = city_aqi.groupby('city').tail(1)[['city', 'date', 'aqi', 'category', 'dominant']]
+            st.markdown("**Último dia disponível**")
+            st.dataframe(latest.set_index('city'), width='stretch')
+    else:
+        st.info(f"AQI disponível apenas para: {', '.join(INDICATORS)}")
+    
+    # Consulta espacial: estações em um raio ao redor de um ponto
+    with st.expander("📍 Estações próximas"):
+        registry = load_station_registry(version)
+        col1, col2, col3 = st.columns(3)
+        latitude = col1.number_input("Latitude", min_value=-90.0, max_value=90.0, value=0.0)
+        longitude = col2.number_input("Longitude", min_value=-180.0, max_value=180.0, value=0.0)
+        radius_km = col3.number_input("Raio (km)", min_value=1.0, value=500.0, step=50.0)
+        
+        nearby = registry.within_radius([latitude], [longitude], radius_km)
+        if nearby.empty:
+            nearby = registry.nearest([latitude], [longitude], k=1)
+            st.info(f"Nenhuma estação em {radius_km:.0f} km; exibindo a mais próxima")
+        stations = registry.lookup(nearby['station_id'], columns=('city', 'country', 'parameters'))
+        stations['distance_km'] = nearby['distance_km'].round(1).to_numpy()
+        st.dataframe(stations.drop(columns='station_id'), width='stretch')
     
-    # Tabela
+    # Tabela (única seção que usa as linhas brutas)
+    filtered_df = load_data(tuple(cities), tuple(pollutants), version)
     st.subheader("📋 Dados Filtrados")
-    st.dataframe(filtered_df.head(50), use_container_width=True)
+    st.dataframe(filtered_df.head(50), width='stretch')
     
     # Download
-    csv = filtered_df.to_csv(index=False)
+    export_format = st.selectbox("Formato do download:", options=list(FORMATS))
     st.download_button(
-        label="📥 Download CSV",
-        data=csv,
-        file_name="air_quality_data.csv",
-        mime="text/csv"
+        label=f"📥 Download {export_format.upper()}",
+        data=functools.partial(export_data, tuple(cities), tuple(pollutants), export_format, version),
+        file_name=f"air_quality_data{FORMATS[export_format]}",
+        mime=MIME_TYPES[export_format]
     )
 
 if __name__ == "__main__":
@@ -3,78 +3,213 @@ Módulo para limpeza e processamento de dados de qualidade do ar
 """
 import pandas as pd
 import numpy as np
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-import warnings
-warnings.filterwarnings('ignore')
+
+try:
+    from .dedup import IDENTITY_KEY, Deduplicator
+    from .imputation import Imputer
+    from .instrumentation import child_options, get_logger, merge_records, run_recorded, span
+    from .outliers import OutlierDetector
+    from .writers import DEFAULT_FORMATS, write_outputs, write_table
+except ImportError:
+    from dedup import IDENTITY_KEY, Deduplicator
+    from imputation import Imputer
+    from instrumentation import child_options, get_logger, merge_records, run_recorded, span
+    from outliers import OutlierDetector
+    from writers import DEFAULT_FORMATS, write_outputs, write_table
+
+logger = get_logger('cleaning')
+
+# Tabela de estações indexada pelo mês (posição 0 não é usada)
+SEASON_LOOKUP = np.array([
+    None,
+    'Verão', 'Verão',
+    'Outono', 'Outono', 'Outono',
+    'Inverno', 'Inverno', 'Inverno',
+    'Primavera', 'Primavera', 'Primavera',
+    'Verão'
+], dtype=object)
+
+SEASONS = ['Verão', 'Outono', 'Inverno', 'Primavera']
+
+# Colunas de texto de baixa cardinalidade convertidas no modo compacto
+CATEGORICAL_COLUMNS = ['city', 'country', 'parameter', 'unit']
 
 class DataCleaner:
     """Classe para limpeza e processamento de dados"""
     
-    def __init__(self, df):
-        self.df = df.copy()
+    def __init__(self, df, verbose=True, vectorized=True, copy=True, compact=False,
+                 incremental_state=None, deduplicator=None, outliers=True, imputer=None):
+        """
+        Args:
+            df (pd.DataFrame): Dados brutos
+            verbose (bool): Exibir mensagens de progresso
+            vectorized (bool): Usar agregações nativas do groupby e tabelas
+                de consulta em vez de callbacks Python por grupo/linha
+            copy (bool): Copiar df; use False quando o chamador entrega a
+                posse do DataFrame (ele será modificado)
+            compact (bool): Modo econômico de memória: categóricos e
+                inteiros pequenos, filtragem sem cópias desnecessárias e
+                relatório de memória por etapa em self.memory_report
+            incremental_state (IncrementalState): Estado da ingestão
+                incremental; linhas até a marca d'água do grupo são
+                descartadas e as médias de imputação incluem o histórico
+            deduplicator (Deduplicator): Chave de identidade, tolerâncias e
+                índice de chaves dos lotes anteriores; o chamador executa
+                deduplicator.commit() depois de gravar o resultado
+            outliers (OutlierDetector | bool): Normalização de unidades e
+                detectores de leituras inválidas (True = configuração
+                padrão, que só marca as leituras em outlier_flags; para
+                removê-las, OutlierDetector(action='drop'); False = etapa
+                desativada)
+            imputer (Imputer): Métodos de imputação e contexto de lotes
+                anteriores (padrão: interpolação temporal, perfil sazonal e
+                média do grupo); com estado, o chamador executa
+                imputer.commit() depois de gravar o resultado
+        """
+        self.df = df.copy() if copy else df
         self.cleaned_df = None
+        self.verbose = verbose
+        self.vectorized = vectorized
+        self.compact = compact
+        self.memory_report = []
+        self.incremental_state = incremental_state
+        self.deduplicator = deduplicator
+        self.outliers = OutlierDetector(action='flag') if outliers is True else (outliers or None)
+        self.imputer = imputer or Imputer()
+        self.value_stats = None
+    
+    def _log(self, message):
+        """Exibe mensagens de progresso (silenciável em laços)"""
+        if self.verbose:
+            logger.info(message)
     
     def clean_data(self):
         """Pipeline completo de limpeza"""
-        print("🧹 Iniciando limpeza de dados...")
+        self._log("🧹 Iniciando limpeza de dados...")
         
-        # 1. Converter tipos
-        self._convert_dtypes()
+        steps = [
+            self._convert_dtypes,         # 1. Converter tipos
+            self._remove_duplicates,      # 2. Remover duplicatas
+            self._detect_outliers,        # 3. Leituras inválidas
+            self._handle_missing_values,  # 4. Tratar valores ausentes
+            self._create_time_features,   # 5. Criar features
+            self._validate_data           # 6. Validar
+        ]
         
-        # 2. Remover duplicatas
-        self._remove_duplicates()
-        
-        # 3. Tratar valores ausentes
-        self._handle_missing_values()
-        
-        # 4. Criar features
-        self._create_time_features()
-        
-        # 5. Validar
-        self._validate_data()
+        for step in steps:
+            with span(f"clean.{step.__name__.lstrip('_')}", rows_in=len(self.df)) as s:
+                if self.compact:
+                    self._run_tracked(step)
+                else:
+                    step()
+                s.rows_out = len(self.df)
         
         self.cleaned_df = self.df
-        print(f"✅ Limpeza concluída! Registros: {len(self.cleaned_df):,}")
+        self._log(f"✅ Limpeza concluída! Registros: {len(self.cleaned_df):,}")
         
         return self.cleaned_df
     
+    def _run_tracked(self, step):
+        """Executa uma etapa registrando a memória antes e depois"""
+        before = self._memory_mb()
+        step()
+        after = self._memory_mb()
+        
+        self.memory_report.append({
+            'step': step.__name__.lstrip('_'),
+            'rows': len(self.df),
+            'memory_before_mb': round(before, 2),
+            'memory_after_mb': round(after, 2)
+        })
+        self._log(f"    🧠 Memória: {before:.1f} MB → {after:.1f} MB")
+    
+    def _memory_mb(self):
+        """Memória ocupada pelo DataFrame em MB"""
+        return self.df.memory_usage(deep=True).sum() / 1024 ** 2
+    
+    def _drop_rows(self, mask):
+        """Remove as linhas marcadas, copiando apenas se houver o que remover"""
+        if mask.any():
+            self.df = self.df.loc[~mask]
+    
     def _convert_dtypes(self):
         """Converte tipos de dados"""
-        print("  🔄 Convertendo tipos de dados...")
+        self._log("  🔄 Convertendo tipos de dados...")
         
         if 'date' in self.df.columns:
             self.df['date'] = pd.to_datetime(self.df['date'], errors='coerce')
         
         if 'value' in self.df.columns:
             self.df['value'] = pd.to_numeric(self.df['value'], errors='coerce')
+        
+        if self.compact:
+            for col in CATEGORICAL_COLUMNS:
+                if col in self.df.columns and not isinstance(self.df[col].dtype, pd.CategoricalDtype):
+                    self.df[col] = self.df[col].astype('category')
     
     def _remove_duplicates(self):
         """Remove registros duplicados de forma segura"""
         initial_count = len(self.df)
         
+        # Descartar linhas já ingeridas em execuções anteriores
+        if self.incremental_state is not None and not self.incremental_state.is_empty:
+            watermarks = self.incremental_state.watermarks_for(self.df)
+            self._drop_rows(pd.Series(self.df['date'].to_numpy() <= watermarks, index=self.df.index))
+            self._log(f"  ⏩ Linhas novas após a marca d'água: {len(self.df):,} de {initial_count:,}")
+            initial_count = len(self.df)
+        
         # Verificar colunas disponíveis
         available_cols = list(self.df.columns)
-        print(f"  🔍 Colunas disponíveis: {available_cols}")
+        self._log(f"  🔍 Colunas disponíveis: {available_cols}")
         
         # Definir colunas para identificar duplicatas
-        possible_cols = ['date', 'city', 'parameter', 'value', 'latitude', 'longitude']
+        possible_cols = self.deduplicator.key if self.deduplicator is not None else IDENTITY_KEY
         
         # Usar apenas colunas que existem
         use_cols = [col for col in possible_cols if col in self.df.columns]
         
         if len(use_cols) >= 2:
-            print(f"  🗑️  Removendo duplicatas usando: {use_cols}")
-            self.df = self.df.drop_duplicates(subset=use_cols, keep='first')
+            self._log(f"  🗑️  Removendo duplicatas usando: {use_cols}")
+            if self.vectorized or self.deduplicator is not None:
+                # Hash de 64 bits por linha em vez de fatorar cada coluna
+                deduplicator = self.deduplicator or Deduplicator(use_cols)
+                self._drop_rows(deduplicator.duplicated(self.df, use_cols))
+            elif self.compact:
+                self._drop_rows(self.df.duplicated(subset=use_cols, keep='first'))
+            else:
+                self.df = self.df.drop_duplicates(subset=use_cols, keep='first')
         else:
-            print("  ⚠️  Poucas colunas para verificar duplicatas")
+            self._log("  ⚠️  Poucas colunas para verificar duplicatas")
         
         removed = initial_count - len(self.df)
         if removed > 0:
-            print(f"    Removidos {removed} duplicatas")
+            self._log(f"    Removidos {removed} duplicatas")
+    
+    def _detect_outliers(self):
+        """Normaliza unidades e remove (ou marca) leituras inválidas antes da imputação"""
+        if self.outliers is None or 'value' not in self.df.columns:
+            return
+        self._log("  🚨 Detectando leituras inválidas...")
+        
+        if self.outliers.normalize:
+            self.outliers.normalize_units(self.df)
+        flags = self.outliers.detect(self.df)
+        
+        if self.outliers.action == 'flag':
+            self.df['outlier_flags'] = flags
+        else:
+            self._drop_rows(flags != 0)
+        for line in self.outliers.summary():
+            self._log(f"    {line}")
     
     def _handle_missing_values(self):
         """Trata valores ausentes"""
-        print("  🔍 Tratando valores ausentes...")
+        self._log("  🔍 Tratando valores ausentes...")
         
         missing_before = self.df.isnull().sum().sum()
         
@@ -83,21 +218,36 @@ class DataCleaner:
         essential = [col for col in essential if col in self.df.columns]
         
         if essential:
-            self.df = self.df.dropna(subset=essential)
+            if self.compact:
+                self._drop_rows(self.df[essential].isna().any(axis=1))
+            else:
+                self.df = self.df.dropna(subset=essential)
         
         # Imputar valores ausentes
         if 'value' in self.df.columns:
-            # Preencher com média por cidade e poluente
-            self.df['value'] = self.df.groupby(['city', 'parameter'])['value'].transform(
-                lambda x: x.fillna(x.mean())
-            )
+            # Interpolação temporal, perfil sazonal e média por cidade e poluente
+            if self.incremental_state is not None:
+                self.value_stats = self.df.groupby(
+                    ['city', 'parameter'], observed=True, sort=False
+                )['value'].agg(value_sum='sum', value_count='count')
+                group_means = self.incremental_state.group_means_for(self.df, self.value_stats)
+                self.df['value'] = self.imputer.fill(self.df, means=group_means)
+            elif self.vectorized:
+                self.df['value'] = self.imputer.fill(self.df)
+            else:
+                self.df['value'] = self.df.groupby(['city', 'parameter'])['value'].transform(
+                    lambda x: x.fillna(x.mean())
+                )
         
         missing_after = self.df.isnull().sum().sum()
-        print(f"    Valores ausentes: {missing_before} → {missing_after}")
+        self._log(f"    Valores ausentes: {missing_before} → {missing_after}")
+        if self.vectorized or self.incremental_state is not None:
+            for line in self.imputer.summary():
+                self._log(f"    {line}")
     
     def _create_time_features(self):
         """Cria features temporais"""
-        print("  ⏰ Criando features temporais...")
+        self._log("  ⏰ Criando features temporais...")
         
         if 'date' in self.df.columns:
             self.df['year'] = self.df['date'].dt.year
@@ -106,7 +256,21 @@ class DataCleaner:
             self.df['is_weekend'] = self.df['day_of_week'].isin([5, 6]).astype(int)
             
             # Estações do ano
-            self.df['season'] = self.df['month'].apply(self._get_season)
+            if self.vectorized:
+                self.df['season'] = SEASON_LOOKUP[self.df['month'].to_numpy()]
+            else:
+                self.df['season'] = self.df['month'].apply(self._get_season)
+            
+            if self.compact:
+                compact_dtypes = {
+                    'year': 'int16',
+                    'month': 'int8',
+                    'day_of_week': 'int8',
+                    'is_weekend': 'bool'
+                }
+                for col, dtype in compact_dtypes.items():
+                    self.df[col] = self.df[col].astype(dtype)
+                self.df['season'] = pd.Categorical(self.df['season'], categories=SEASONS)
     
     def _get_season(self, month):
         """Determina a estação do ano"""
@@ -121,35 +285,173 @@ class DataCleaner:
     
     def _validate_data(self):
         """Validação final"""
-        print("  ✅ Validando dados...")
+        self._log("  ✅ Validando dados...")
         
         if len(self.df) == 0:
             raise ValueError("Nenhum dado restante!")
         
-        print(f"    📈 Dimensões: {self.df.shape}")
-        print(f"    📅 Período: {self.df['date'].min()} a {self.df['date'].max()}")
+        self._log(f"    📈 Dimensões: {self.df.shape}")
+        self._log(f"    📅 Período: {self.df['date'].min()} a {self.df['date'].max()}")
     
-    def save_cleaned_data(self, filepath='data/processed/cleaned_data.csv'):
-        """Salva os dados limpos"""
-        import os
-        os.makedirs(os.path.dirname(filepath), exist_ok=True)
-        
-        self.cleaned_df.to_csv(filepath, index=False)
-        print(f"💾 Dados salvos: {filepath}")
+    def save_cleaned_data(self, filepath='data/processed/cleaned_data.parquet', compression=None):
+        """Salva os dados limpos (formato pela extensão: .parquet, .arrow ou .csv)"""
+        with span('clean.save', rows_in=len(self.cleaned_df)):
+            write_table(self.cleaned_df, filepath, compression=compression)
+        logger.info(f"💾 Dados salvos: {filepath}")
         
         return filepath
 
-def clean_air_quality_data(df, save_path='data/processed/'):
-    """Função principal para limpeza"""
-    import os
+def clean_data_parallel(df, workers=None, min_rows_per_worker=100_000, **cleaner_options):
+    """
+    Limpeza paralela por grupos (cidade, poluente) em um pool de processos
+    
+    Duplicatas, médias de imputação e features temporais são independentes
+    entre grupos, então o resultado é idêntico ao da limpeza sequencial.
+    Os dados chegam aos workers por arquivos Arrow IPC mapeados em memória
+    (em /dev/shm quando disponível), sem serializar DataFrames com pickle.
     
-    cleaner = DataCleaner(df)
-    cleaned_data = cleaner.clean_data()
+    Args:
+        df (pd.DataFrame): Dados brutos
+        workers (int): Número de processos (padrão: os.cpu_count())
+        min_rows_per_worker (int): Abaixo disso, usar menos processos
+        **cleaner_options: Opções do DataCleaner
     
-    if save_path:
-        os.makedirs(save_path, exist_ok=True)
-        output_file = os.path.join(save_path, 'cleaned_data.csv')
-        cleaner.save_cleaned_data(output_file)
+    Returns:
+        pd.DataFrame: Dados limpos, na ordem original das linhas
+    """
+    import pyarrow as pa
+    
+    verbose = cleaner_options.pop('verbose', True)
+    cleaner_options.pop('copy', None)
+    workers = workers or os.cpu_count() or 1
+    workers = max(1, min(workers, len(df) // min_rows_per_worker))
+    group_cols = [col for col in ['city', 'parameter'] if col in df.columns]
+    
+    # Sem colunas de grupo não há como particionar sem mudar o resultado
+    if workers > 1 and group_cols:
+        # Ordenar por grupo para que cada partição seja uma faixa contígua
+        codes = df.groupby(group_cols, sort=False, dropna=False, observed=True).ngroup().to_numpy()
+        order = np.argsort(codes, kind='stable')
+        boundaries = _partition_boundaries(codes[order], workers)
+        workers = len(boundaries) - 1
+    
+    if workers == 1 or not group_cols:
+        return DataCleaner(df, verbose=verbose, **cleaner_options).clean_data()
+    
+    if verbose:
+        logger.info(f"🧹 Iniciando limpeza paralela ({workers} processos)...")
+    
+    table = pa.Table.from_pandas(df.iloc[order], preserve_index=False)
+    table = table.append_column('__row', pa.array(order))
+    
+    shm_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+    tmp_dir = tempfile.mkdtemp(prefix='aq_clean_', dir=shm_dir)
+    try:
+        input_path = os.path.join(tmp_dir, 'input.arrow')
+        _write_ipc(table, input_path)
+        del table
+        
+        options = child_options()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(
+                    run_recorded, options, _clean_partition, input_path, start, stop,
+                    os.path.join(tmp_dir, f'part-{i}.arrow'), cleaner_options
+                )
+                for i, (start, stop) in enumerate(zip(boundaries[:-1], boundaries[1:]))
+            ]
+            # Resultados na ordem das partições: concatenação determinística
+            parts = []
+            for future in futures:
+                path, records = future.result()
+                merge_records(records)
+                parts.append(path)
+        
+        tables = [_read_ipc(path) for path in parts if path is not None]
+        if not tables:
+            raise ValueError("Nenhum dado restante!")
+        cleaned = pa.concat_tables(tables, promote_options='permissive').to_pandas()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    
+    # Restaurar a ordem e o índice originais
+    cleaned = cleaned.sort_values('__row', kind='stable')
+    cleaned.index = df.index[cleaned['__row'].to_numpy()]
+    cleaned = cleaned.drop(columns='__row')
+    
+    if verbose:
+        logger.info(f"✅ Limpeza concluída! Registros: {len(cleaned):,}")
+    return cleaned
+
+def _partition_boundaries(sorted_codes, n_partitions):
+    """
+    Limites de linhas das partições, equilibrados e alinhados aos grupos
+    
+    Com menos grupos que partições, algumas partições desaparecem (um
+    grupo nunca é dividido); com um único grupo, sobra uma partição.
+    """
+    n = len(sorted_codes)
+    if n == 0:
+        return [0, 0]
+    group_starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    targets = np.linspace(0, n, n_partitions + 1)[1:-1]
+    positions = np.minimum(np.searchsorted(group_starts, targets), len(group_starts) - 1)
+    cuts = [int(c) for c in np.unique(group_starts[positions]) if 0 < c < n]
+    return [0] + cuts + [n]
+
+def _clean_partition(input_path, start, stop, output_path, cleaner_options):
+    """Worker: limpa as linhas [start, stop) do arquivo Arrow de entrada"""
+    table = _read_ipc(input_path).slice(start, stop - start)
+    partition = table.to_pandas()
+    del table
+    
+    try:
+        cleaned = DataCleaner(partition, verbose=False, copy=False, **cleaner_options).clean_data()
+    except ValueError:
+        # Partição sem dados válidos após a limpeza
+        return None
+    
+    import pyarrow as pa
+    _write_ipc(pa.Table.from_pandas(cleaned, preserve_index=False), output_path)
+    return output_path
+
+def _write_ipc(table, path):
+    import pyarrow as pa
+    with pa.OSFile(path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+def _read_ipc(path):
+    import pyarrow as pa
+    with pa.memory_map(path) as source:
+        return pa.ipc.open_file(source).read_all()
+
+def clean_air_quality_data(df, save_path='data/processed/', workers=1,
+                           output_formats=DEFAULT_FORMATS, **cleaner_options):
+    """
+    Função principal para limpeza
+    
+    Args:
+        df (pd.DataFrame): Dados brutos
+        save_path (str): Diretório dos dados limpos (None para não salvar)
+        workers (int): Processos para a limpeza paralela (1 = sequencial)
+        output_formats (tuple): Formatos de saída ('parquet', 'feather',
+            'csv'); cada um é gravado uma única vez
+        **cleaner_options: Opções do DataCleaner (verbose, vectorized,
+            copy, compact)
+    """
+    if workers != 1:
+        cleaned_data = clean_data_parallel(df, workers=workers, **cleaner_options)
+    else:
+        cleaned_data = DataCleaner(df, **cleaner_options).clean_data()
+    
+    if save_path and output_formats:
+        with span('clean.save', rows_in=len(cleaned_data), formats=list(output_formats)):
+            paths = write_outputs(
+                cleaned_data, os.path.join(save_path, 'cleaned_data'), formats=output_formats
+            )
+        for path in paths:
+            logger.info(f"💾 Dados salvos: {path}")
     
     return cleaned_data
 
@@ -6,27 +6,34 @@ Data: 29/12/2025
 import pandas as pd
 import numpy as np
 import os
+import time
 from datetime import datetime
-import requests
-import zipfile
-import io
-from tqdm import tqdm
-import warnings
-warnings.filterwarnings('ignore')
+
+try:
+    from .download_cache import DownloadCache
+    from .instrumentation import get_logger, peak_rss_mb, span
+except ImportError:
+    from download_cache import DownloadCache
+    from instrumentation import get_logger, peak_rss_mb, span
+
+logger = get_logger('collection')
 
 class DataCollector:
     """Classe para coleta de dados de qualidade do ar"""
     
-    def __init__(self, data_dir='./data'):
+    def __init__(self, data_dir='./data', download_cache=None):
         """
         Inicializa o coletor de dados
         
         Args:
             data_dir (str): Diretório para salvar os dados
+            download_cache (DownloadCache): Cache dos downloads (padrão:
+                data_dir/cache/downloads, criado no primeiro download)
         """
         self.data_dir = data_dir
         self.raw_dir = os.path.join(data_dir, 'raw')
         self.processed_dir = os.path.join(data_dir, 'processed')
+        self._download_cache = download_cache
         
         # Criar diretórios se não existirem
         os.makedirs(self.raw_dir, exist_ok=True)
@@ -48,88 +55,217 @@ class DataCollector:
         self.start_date = '2020-01-01'
         self.end_date = '2025-12-31'
     
-    def download_from_kaggle(self):
+    @property
+    def download_cache(self):
+        """Cache dos downloads (Kaggle e API da OpenAQ)"""
+        if self._download_cache is None:
+            self._download_cache = DownloadCache(os.path.join(self.data_dir, 'cache', 'downloads'))
+        return self._download_cache
+    
+    def download_from_kaggle(self, dataset='open-aq/openaq'):
         """
         Download do dataset do Kaggle
         Nota: Requer configuração da API do Kaggle
+        
+        O arquivo compactado fica no cache de downloads: dentro do TTL não
+        há nova transferência e, depois dele, o arquivo só é extraído de
+        novo se o checksum mudou.
+        
+        Args:
+            dataset (str): Identificador do dataset no Kaggle
         """
-        print("📥 Método 1: Download do Kaggle")
+        logger.info("📥 Método 1: Download do Kaggle")
         try:
+            import zipfile
             from kaggle.api.kaggle_api_extended import KaggleApi
             api = KaggleApi()
             api.authenticate()
             
-            api.dataset_download_files(
-                'open-aq/openaq',
-                path=self.raw_dir,
-                unzip=True
-            )
-            print("✅ Download do Kaggle concluído!")
-            return True
+            def download(target_dir):
+                api.dataset_download_files(dataset, path=target_dir, unzip=False)
+                return os.path.join(target_dir, dataset.split('/')[-1] + '.zip')
+            
+            with span('collect.kaggle', dataset=dataset) as s:
+                archive, checksum, status = self.download_cache.cached_file(
+                    f'kaggle:{dataset}', download, source='kaggle'
+                )
+                s.set(cache=status)
+                
+                # Extrair apenas se o conteúdo mudou desde a última extração
+                marker = os.path.join(self.raw_dir, f".{dataset.replace('/', '_')}.sha256")
+                extracted = open(marker).read() if os.path.exists(marker) else None
+                if extracted != checksum:
+                    with zipfile.ZipFile(archive) as zf:
+                        zf.extractall(self.raw_dir)
+                    with open(marker, 'w') as f:
+                        f.write(checksum)
             
+            logger.info(f"✅ Download do Kaggle concluído! (cache: {status})")
+            return True
+        
         except Exception as e:
-            print(f"❌ Erro no download do Kaggle: {e}")
-            print("🔄 Tentando método alternativo...")
+            logger.warning(f"❌ Erro no download do Kaggle: {e}")
+            logger.info("🔄 Tentando método alternativo...")
             return False
     
-    def download_sample_data(self):
+    def download_from_openaq(self, date_from, date_to, cities=None, pollutants=None,
+                             window_days=30, save=True, **fetcher_options):
         """
-        Método alternativo: Usar dados de amostra
+        Busca medições recentes na API da OpenAQ (assíncrono e concorrente)
+        
+        Interrupções são retomadas do checkpoint em raw_dir/openaq na
+        próxima chamada com o mesmo período. Em notebooks (loop asyncio já
+        em execução), use `await OpenAQFetcher(...).fetch(jobs)`.
+        
+        Args:
+            date_from, date_to: Período desejado
+            cities (list): Cidades (padrão: self.cities)
+            pollutants (list): Poluentes (padrão: self.pollutants)
+            window_days (int): Tamanho da janela de datas de cada tarefa
+            save (bool): Salvar o CSV consolidado em raw_dir
+            **fetcher_options: Opções do OpenAQFetcher (api_key,
+                concurrency, rate_limit, base_url, transport, cache...);
+                as respostas usam self.download_cache salvo cache=None
         """
-        print("📥 Método 2: Criando dataset de exemplo para desenvolvimento")
+        import asyncio
+        try:
+            from .fetcher import OpenAQFetcher, build_jobs
+        except ImportError:
+            from fetcher import OpenAQFetcher, build_jobs
         
-        np.random.seed(42)
-        dates = pd.date_range(self.start_date, '2023-12-31', freq='D')  # Reduzido para teste
+        logger.info("📥 Método 3: API da OpenAQ")
+        jobs = build_jobs(
+            cities or self.cities, pollutants or self.pollutants,
+            date_from, date_to, window_days=window_days
+        )
+        fetcher_options.setdefault('cache', self.download_cache)
+        fetcher = OpenAQFetcher(os.path.join(self.raw_dir, 'openaq'), **fetcher_options)
+        with span('collect.openaq', jobs=len(jobs)) as s:
+            stats = asyncio.run(fetcher.fetch(jobs))
+            df = fetcher.load(jobs)
+            s.rows_out = len(df)
         
-        data = []
+        if fetcher.cache is not None:
+            cache = fetcher.cache.stats
+            logger.info(f"🗄️  Cache: {cache['hits']} acerto(s), {cache['revalidated']} revalidado(s), "
+                        f"{cache['misses']} falta(s), {cache['bytes_downloaded'] / 1e6:.1f} MB baixados")
+        if stats['failed']:
+            logger.warning(f"⚠️  {len(stats['failed'])} tarefa(s) com falha; execute novamente para retomar")
+        if save:
+            path = os.path.join(self.raw_dir, 'openaq_data.csv')
+            df.to_csv(path, index=False)
+            logger.info(f"💾 Salvo em: {path}")
+        return df
+    
+    def download_sample_data(self, n_days=180, cities=None, pollutants=None,
+                             seed=42, freq='D', save=True):
+        """
+        Método alternativo: Usar dados de amostra
         
-        for city in self.cities:
-            for pollutant in self.pollutants:
-                print(f"  Gerando dados para {city} - {pollutant}...", end='\r')
-                
-                # Valores base por cidade e poluente
-                if 'Delhi' in city or 'Beijing' in city:
-                    base_value = np.random.uniform(80, 200)
-                elif 'São Paulo' in city or 'Mumbai' in city:
-                    base_value = np.random.uniform(40, 120)
-                else:
-                    base_value = np.random.uniform(10, 60)
-                
-                for i, date in enumerate(dates[:180]):  # Apenas 180 dias por combinação
-                    # Variação sazonal
-                    seasonal = 10 * np.sin(2 * np.pi * i / 365)
-                    
-                    # Tendência temporal
-                    year_trend = -0.5 * (date.year - 2020)
-                    
-                    # Variação aleatória
-                    random_var = np.random.normal(0, 10)
-                    
-                    value = max(1, base_value + seasonal + year_trend + random_var)
-                    
-                    data.append({
-                        'date': date,
-                        'city': city,
-                        'country': self._get_country(city),
-                        'parameter': pollutant,
-                        'value': round(value, 2),
-                        'unit': 'µg/m³',
-                        'latitude': self._get_coordinates(city)[0],
-                        'longitude': self._get_coordinates(city)[1]
-                    })
-        
-        print(" " * 50, end='\r')
-        df = pd.DataFrame(data)
-        
-        # Salvar dados
-        sample_path = os.path.join(self.raw_dir, 'sample_data.csv')
-        df.to_csv(sample_path, index=False)
+        Gera os dados em blocos vetorizados (um bloco NumPy por combinação
+        cidade/poluente), o que permite criar milhões de registros para
+        testes de carga em poucos segundos.
         
-        print(f"✅ Dataset de exemplo criado: {len(df):,} registros")
-        print(f"💾 Salvo em: {sample_path}")
+        Args:
+            n_days (int): Número de períodos por combinação cidade/poluente
+            cities (list): Cidades a gerar (padrão: self.cities)
+            pollutants (list): Poluentes a gerar (padrão: self.pollutants)
+            seed (int): Semente do np.random.Generator (saída reprodutível)
+            freq (str): Frequência das medições (ex.: 'D', 'h')
+            save (bool): Salvar o CSV em raw_dir
+        """
+        logger.info("📥 Método 2: Criando dataset de exemplo para desenvolvimento")
+        
+        with span('collect.generate_sample') as s:
+            df = self._generate_sample_frame(n_days, cities, pollutants, seed, freq)
+            s.rows_out = len(df)
+        logger.info(f"✅ Dataset de exemplo criado: {len(df):,} registros")
+        
+        if save:
+            sample_path = os.path.join(self.raw_dir, 'sample_data.csv')
+            with span('collect.save_csv', rows_in=len(df)):
+                df.to_csv(sample_path, index=False)
+            logger.info(f"💾 Salvo em: {sample_path}")
         
         return df
     
+    def _generate_sample_frame(self, n_days, cities=None, pollutants=None,
+                               seed=42, freq='D'):
+        """Gera o dataset de exemplo com operações vetorizadas"""
+        return next(self._iter_sample_frames(n_days, cities, pollutants, seed, freq))
+    
+    def _iter_sample_frames(self, n_days, cities=None, pollutants=None, seed=42, freq='D',
+                            cities_per_batch=None):
+        """
+        Gera o dataset de exemplo em lotes de cidades
+        
+        O gerador aleatório é consumido na mesma ordem para qualquer
+        tamanho de lote, então a concatenação dos lotes é idêntica ao
+        dataset gerado de uma vez (inclusive o índice).
+        """
+        cities = list(self.cities if cities is None else cities)
+        pollutants = list(self.pollutants if pollutants is None else pollutants)
+        cities_per_batch = cities_per_batch or len(cities) or 1
+        rng = np.random.default_rng(seed)
+        
+        dates = pd.date_range(self.start_date, periods=n_days, freq=freq)
+        
+        # Componentes comuns a todos os blocos
+        elapsed_days = (dates - dates[0]) / pd.Timedelta(days=1)
+        seasonal = 10 * np.sin(2 * np.pi * np.asarray(elapsed_days) / 365)
+        year_trend = -0.5 * (dates.year.to_numpy() - dates[0].year)
+        signal = seasonal + year_trend
+        
+        # Valores base por cidade e poluente
+        bounds = np.array([self._get_base_range(city) for city in cities]).reshape(-1, 2)
+        base_values = rng.uniform(
+            np.repeat(bounds[:, 0], len(pollutants)),
+            np.repeat(bounds[:, 1], len(pollutants))
+        )
+        
+        countries = [self._get_country(city) for city in cities]
+        country_categories = list(dict.fromkeys(countries))
+        country_lookup = np.array([country_categories.index(c) for c in countries], dtype=np.int64)
+        coordinates = np.array([self._get_coordinates(city) for city in cities],
+                               dtype=np.float64).reshape(-1, 2)
+        
+        start_row = 0
+        for first in range(0, max(len(cities), 1), cities_per_batch):
+            batch_cities = np.arange(first, min(first + cities_per_batch, len(cities)))
+            n_blocks = len(batch_cities) * len(pollutants)
+            n_rows = n_blocks * n_days
+            
+            values = np.empty(n_rows, dtype=np.float64)
+            for block, base_value in enumerate(base_values[first * len(pollutants):][:n_blocks]):
+                block_slice = slice(block * n_days, (block + 1) * n_days)
+                noise = rng.normal(0, 10, n_days)
+                np.maximum(base_value + signal + noise, 1, out=values[block_slice])
+            np.round(values, 2, out=values)
+            
+            # Códigos categóricos: cada bloco repete uma cidade e um poluente
+            city_codes = np.repeat(batch_cities, len(pollutants) * n_days)
+            pollutant_codes = np.tile(np.repeat(np.arange(len(pollutants)), n_days), len(batch_cities))
+            
+            yield pd.DataFrame({
+                'date': np.tile(dates.values, n_blocks),
+                'city': pd.Categorical.from_codes(city_codes, categories=cities),
+                'country': pd.Categorical.from_codes(country_lookup[city_codes], categories=country_categories),
+                'parameter': pd.Categorical.from_codes(pollutant_codes, categories=pollutants),
+                'value': values,
+                'unit': pd.Categorical.from_codes(np.zeros(n_rows, dtype=np.int8), categories=['µg/m³']),
+                'latitude': coordinates[city_codes, 0],
+                'longitude': coordinates[city_codes, 1]
+            }, index=pd.RangeIndex(start_row, start_row + n_rows))
+            start_row += n_rows
+    
+    def _get_base_range(self, city):
+        """Retorna o intervalo do valor base de poluição da cidade"""
+        if 'Delhi' in city or 'Beijing' in city:
+            return (80, 200)
+        elif 'São Paulo' in city or 'Mumbai' in city:
+            return (40, 120)
+        return (10, 60)
+    
     def _get_country(self, city):
         """Retorna país baseado na cidade"""
         countries = {
@@ -162,27 +298,235 @@ class DataCollector:
         }
         return coordinates.get(city, (0, 0))
     
-    def get_data(self, use_sample=True):
+    def stream_to_parquet(self, output_dir=None, chunksize=500_000, partition_cols=None,
+                          dedup_index=None, dedup_options=None):
+        """
+        Ingestão em streaming de todos os CSVs de raw_dir
+        
+        Lê cada arquivo em blocos de tamanho limitado, limpa cada bloco com
+        o DataCleaner e grava incrementalmente em um dataset Parquet
+        particionado, mantendo o pico de memória constante. Sem índice
+        persistente, cada execução recria o dataset (blocos gravados em um
+        diretório temporário e trocados no fim); com ele, as execuções
+        acrescentam arquivos novos ao mesmo dataset. Duplicatas são
+        removidas entre todos os blocos e arquivos por um índice de chaves
+        de 64 bits (8 bytes por linha única), e a imputação de cada bloco
+        usa a última leitura e o perfil sazonal dos blocos anteriores.
+        
+        Args:
+            output_dir (str): Diretório do dataset (padrão: processed_dir/stream,
+                separado do dataset do pipeline)
+            chunksize (int): Número de linhas por bloco
+            partition_cols (tuple): Colunas de particionamento (padrão:
+                storage.PARTITION_COLS)
+            dedup_index (str): Arquivo .npy do índice de chaves; com ele,
+                execuções seguintes também descartam as linhas já gravadas
+                e o contexto da imputação fica no mesmo diretório
+                (padrão: índice e contexto em memória, válidos só nesta execução)
+            dedup_options (dict): Opções do Deduplicator (key, tolerances)
+        
+        Returns:
+            dict: Estatísticas da ingestão (linhas, tempo, linhas/s, pico de RSS)
+        """
+        try:
+            from .data_cleaning import DataCleaner
+            from .dedup import Deduplicator, KeyIndex
+            from .imputation import IMPUTATION_DIR, ImputationState, Imputer
+            from .storage import PARTITION_COLS, DatasetWriter, append_partitioned
+        except ImportError:
+            from data_cleaning import DataCleaner
+            from dedup import Deduplicator, KeyIndex
+            from imputation import IMPUTATION_DIR, ImputationState, Imputer
+            from storage import PARTITION_COLS, DatasetWriter, append_partitioned
+        
+        output_dir = output_dir or os.path.join(self.processed_dir, 'stream')
+        index = KeyIndex.load(dedup_index) if dedup_index else KeyIndex()
+        deduplicator = Deduplicator(index=index, **(dedup_options or {}))
+        imputer = Imputer(state=(
+            ImputationState.load(os.path.join(os.path.dirname(dedup_index), IMPUTATION_DIR))
+            if dedup_index else ImputationState()
+        ))
+        
+        partition_cols = partition_cols or PARTITION_COLS
+        # Com índice persistente, cada execução grava arquivos novos ao lado
+        # dos anteriores; sem ele, o dataset é recriado e trocado no fim
+        prefix = f"part-{datetime.now():%Y%m%d%H%M%S}-"
+        writer = None if dedup_index else DatasetWriter(output_dir, partition_cols=partition_cols)
+        
+        files = sorted(f for f in os.listdir(self.raw_dir) if f.endswith('.csv'))
+        logger.info(f"🌊 Ingestão em streaming: {len(files)} arquivo(s), blocos de {chunksize:,} linhas")
+        
+        start = time.perf_counter()
+        rows_in = rows_out = 0
+        schema = None
+        batch = 0
+        
+        for file in files:
+            filepath = os.path.join(self.raw_dir, file)
+            for chunk in pd.read_csv(filepath, chunksize=chunksize):
+                rows_in += len(chunk)
+                with span('collect.stream_chunk', rows_in=len(chunk), batch=batch) as s:
+                    try:
+                        cleaned = DataCleaner(
+                            chunk, verbose=False, copy=False, deduplicator=deduplicator,
+                            imputer=imputer
+                        ).clean_data()
+                    except ValueError:
+                        # Bloco sem dados válidos após a limpeza
+                        continue
+                    
+                    if writer is not None:
+                        writer.append(cleaned)
+                    else:
+                        schema = append_partitioned(
+                            cleaned, output_dir, f"{prefix}{batch:06d}",
+                            partition_cols=partition_cols, schema=schema
+                        )
+                    deduplicator.commit()
+                    imputer.commit()
+                    s.rows_out = len(cleaned)
+                batch += 1
+                rows_out += len(cleaned)
+                
+                elapsed = time.perf_counter() - start
+                logger.debug(f"  📦 {rows_in:,} linhas lidas | {rows_in / elapsed:,.0f} linhas/s")
+        
+        if writer is not None and writer.blocks:
+            writer.commit()
+        
+        elapsed = time.perf_counter() - start
+        stats = {
+            'files': len(files),
+            'rows_in': rows_in,
+            'rows_out': rows_out,
+            'duplicates': deduplicator.stats['batch_duplicates'] + deduplicator.stats['seen_duplicates'],
+            'dedup_index_mb': round(index.nbytes / 1024 ** 2, 2),
+            'seconds': round(elapsed, 3),
+            'rows_per_second': round(rows_in / elapsed) if elapsed > 0 else 0,
+            'peak_rss_mb': peak_rss_mb(),
+            'output_dir': output_dir
+        }
+        
+        logger.info(f"✅ Ingestão concluída: {rows_out:,} de {rows_in:,} registros em {elapsed:.1f}s")
+        logger.info(f"⚡ Throughput: {stats['rows_per_second']:,} linhas/s")
+        logger.info(f"🗑️  Duplicatas removidas: {stats['duplicates']:,} "
+                    f"(índice de chaves: {stats['dedup_index_mb']:.1f} MB)")
+        if stats['peak_rss_mb'] is not None:
+            logger.info(f"🧠 Pico de memória (RSS): {stats['peak_rss_mb']:.1f} MB")
+        logger.info(f"💾 Dataset particionado: {output_dir}")
+        
+        return stats
+    
+    def read_raw_files(self, workers=None):
+        """
+        Lê todos os arquivos brutos de raw_dir (CSV, CSV.gz e Parquet) em paralelo
+        
+        Os tipos de cada CSV são inferidos uma única vez por cabeçalho e
+        guardados em data_dir/cache, de modo que as leituras seguintes
+        usam um esquema explícito.
+        
+        Args:
+            workers (int): Arquivos lidos ao mesmo tempo (padrão: núcleos da CPU)
+        
+        Returns:
+            pd.DataFrame: Registros de todos os arquivos (city, parameter,
+                country e unit como categóricos)
+        """
+        try:
+            from .ingest import SCHEMA_CACHE_FILE, SchemaCache, read_raw_frame
+        except ImportError:
+            from ingest import SCHEMA_CACHE_FILE, SchemaCache, read_raw_frame
+        
+        schema_cache = SchemaCache(os.path.join(self.data_dir, 'cache', SCHEMA_CACHE_FILE))
+        return read_raw_frame(self.raw_dir, workers=workers, schema_cache=schema_cache)
+    
+    def iter_batches(self, cities_per_batch=1, use_sample=True, workers=None, **sample_options):
+        """
+        Obtém os dados em lotes de cidades (fonte do pipeline em grafo)
+        
+        Cada (cidade, poluente) fica inteiro em um único lote, então os
+        lotes podem ser limpos e agregados de forma independente. Os
+        dados de exemplo são gerados lote a lote e são idênticos aos de
+        download_sample_data; dados reais são lidos de uma vez e
+        divididos por cidade.
+        
+        Args:
+            cities_per_batch (int): Cidades por lote
+            use_sample (bool): Usar dados de exemplo
+            workers (int): Leitores paralelos dos arquivos reais
+            **sample_options: Opções de download_sample_data (n_days,
+                cities, pollutants, seed, freq, save)
+        
+        Yields:
+            pd.DataFrame: Registros de um lote de cidades
+        """
+        if not use_sample:
+            if self.download_from_kaggle():
+                yield from city_batches(self.read_raw_files(workers=workers), cities_per_batch)
+            return
+        
+        save = sample_options.pop('save', True)
+        sample_options.setdefault('n_days', 180)
+        sample_path = os.path.join(self.raw_dir, 'sample_data.csv')
+        logger.info(f"📥 Método 2: Criando dataset de exemplo em lotes de {cities_per_batch} cidade(s)")
+        
+        frames = self._iter_sample_frames(cities_per_batch=cities_per_batch, **sample_options)
+        for i, df in enumerate(frames):
+            if save:
+                df.to_csv(sample_path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+            yield df
+        if save:
+            logger.info(f"💾 Salvo em: {sample_path}")
+    
+    def get_data(self, use_sample=True, stream=False, chunksize=500_000, workers=None,
+                 **sample_options):
         """
         Método principal para obter dados
+        
+        Args:
+            use_sample (bool): Usar dados de exemplo
+            stream (bool): Com dados reais, ingerir todos os CSVs em blocos
+                e retornar as estatísticas de stream_to_parquet em vez de
+                um DataFrame
+            chunksize (int): Linhas por bloco no modo streaming
+            workers (int): Leitores paralelos dos arquivos reais (padrão:
+                núcleos da CPU)
+            **sample_options: Opções de download_sample_data (n_days,
+                cities, pollutants, seed, freq, save)
         """
-        print("=" * 60)
-        print("🌍 COLETA DE DADOS - QUALIDADE DO AR")
-        print("=" * 60)
+        logger.info("=" * 60)
+        logger.info("🌍 COLETA DE DADOS - QUALIDADE DO AR")
+        logger.info("=" * 60)
         
         if not use_sample:
             success = self.download_from_kaggle()
             if success:
-                for file in os.listdir(self.raw_dir):
-                    if file.endswith('.csv'):
-                        filepath = os.path.join(self.raw_dir, file)
-                        df = pd.read_csv(filepath, low_memory=False)
-                        print(f"📄 Arquivo real carregado: {file}")
-                        return df
+                if stream:
+                    return self.stream_to_parquet(chunksize=chunksize)
+                return self.read_raw_files(workers=workers)
         else:
-            df = self.download_sample_data()
+            df = self.download_sample_data(**sample_options)
             return df
 
+def city_batches(df, cities_per_batch=1):
+    """
+    Divide os registros em lotes de cidades inteiras
+    
+    Args:
+        df (pd.DataFrame): Registros com a coluna city
+        cities_per_batch (int): Cidades por lote
+    
+    Yields:
+        pd.DataFrame: Linhas de cada lote, na ordem original dentro do lote
+    """
+    codes, _ = pd.factorize(df['city'], sort=False)
+    batches = codes // cities_per_batch
+    order = np.argsort(batches, kind='stable')
+    bounds = np.flatnonzero(np.diff(batches[order])) + 1
+    for rows in np.split(order, bounds):
+        if len(rows):
+            yield df.take(rows)
+
 if __name__ == "__main__":
     collector = DataCollector()
     df = collector.get_data(use_sample=True)
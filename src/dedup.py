@@ -0,0 +1,162 @@
+"""
+Deduplicação exata por hash de 64 bits, com índice de chaves persistente entre lotes
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+# Colunas que identificam uma medição
+IDENTITY_KEY = ['date', 'city', 'parameter', 'value', 'latitude', 'longitude']
+
+KEY_INDEX_FILE = 'dedup_keys.npy'
+
+def hash_keys(df, columns=IDENTITY_KEY, tolerances=None):
+    """
+    Hash de 64 bits das colunas de identidade de cada linha (vetorizado)
+    
+    Datas são comparadas em nanossegundos, textos e categóricos pelo valor
+    e números de ponto flutuante em float64 (ou arredondados para múltiplos
+    da tolerância da coluna). Colisões são desprezíveis na escala do
+    projeto (~1e-9 para 100 milhões de chaves).
+    
+    Args:
+        df (pd.DataFrame): Dados
+        columns (list): Colunas de identidade
+        tolerances (dict): {coluna: tolerância} para colunas float
+            (ex.: {'latitude': 1e-4}); sem tolerância a comparação é exata
+    
+    Returns:
+        np.ndarray: Chaves uint64, uma por linha
+    """
+    tolerances = tolerances or {}
+    keys = np.full(len(df), 0x345678, dtype='uint64')
+    for position, col in enumerate(columns):
+        series = df[col]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            values = series.to_numpy(dtype='datetime64[ns]').view('int64')
+        elif pd.api.types.is_float_dtype(series):
+            values = series.to_numpy(dtype='float64', na_value=np.nan)
+            if tolerances.get(col):
+                values = np.floor(values / tolerances[col] + 0.5)
+            # + 0.0 unifica -0.0 e 0.0, como em drop_duplicates
+            values = values + 0.0
+        elif isinstance(series.dtype, pd.CategoricalDtype):
+            values = series.array
+        else:
+            # Textos como object: hash das categorias distintas, não de cada linha
+            values = series.to_numpy(dtype=object)
+        
+        keys ^= pd.util.hash_array(values)
+        keys *= np.uint64(1000003 + 2 * position)
+    return keys
+
+class KeyIndex:
+    """
+    Conjunto de chaves já ingeridas: array uint64 ordenado, salvo em .npy
+    
+    Ocupa 8 bytes por linha única e é aberto com memory-map, de modo que
+    consultas tocam apenas as páginas necessárias.
+    """
+    
+    def __init__(self, path=None, keys=None):
+        """
+        Args:
+            path (str): Arquivo .npy do índice (None = apenas em memória)
+            keys (np.ndarray): Chaves ordenadas e únicas
+        """
+        self.path = path
+        self.keys = keys if keys is not None else np.empty(0, dtype='uint64')
+    
+    @classmethod
+    def load(cls, path):
+        """Carrega o índice salvo (ou um índice vazio)"""
+        if not os.path.exists(path):
+            return cls(path)
+        return cls(path, np.load(path, mmap_mode='r'))
+    
+    def __len__(self):
+        return len(self.keys)
+    
+    @property
+    def nbytes(self):
+        return self.keys.nbytes
+    
+    def contains(self, keys):
+        """Máscara das chaves já presentes no índice"""
+        if not len(self.keys):
+            return np.zeros(len(keys), dtype=bool)
+        positions = np.searchsorted(self.keys, keys)
+        positions[positions == len(self.keys)] = 0
+        return self.keys[positions] == keys
+    
+    def add(self, keys):
+        """Acrescenta chaves, mantendo o array ordenado (intercalação linear)"""
+        keys = np.unique(keys)
+        keys = keys[~self.contains(keys)]
+        if len(keys):
+            self.keys = np.insert(self.keys, np.searchsorted(self.keys, keys), keys)
+    
+    def save(self):
+        """Grava o índice de forma atômica"""
+        if self.path is None:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.save(f, np.asarray(self.keys))
+        os.replace(tmp_path, self.path)
+
+class Deduplicator:
+    """
+    Marca duplicatas dentro do lote e em relação aos lotes anteriores
+    
+    As chaves das linhas mantidas ficam pendentes até `commit()`, chamado
+    depois que o lote foi gravado; assim uma falha na gravação não faz
+    linhas nunca persistidas serem descartadas na próxima execução.
+    """
+    
+    def __init__(self, key=IDENTITY_KEY, tolerances=None, index=None):
+        """
+        Args:
+            key (list): Colunas de identidade
+            tolerances (dict): Tolerância por coluna float (ver hash_keys)
+            index (KeyIndex): Chaves de lotes anteriores (None = apenas o lote)
+        """
+        self.key = list(key)
+        self.tolerances = tolerances or {}
+        self.index = index
+        self.pending = np.empty(0, dtype='uint64')
+        self.stats = {'rows': 0, 'batch_duplicates': 0, 'seen_duplicates': 0}
+    
+    def duplicated(self, df, columns=None):
+        """
+        Máscara das linhas repetidas (mantém a primeira ocorrência)
+        
+        Args:
+            df (pd.DataFrame): Lote
+            columns (list): Colunas de identidade (padrão: as de self.key
+                presentes em df)
+        
+        Returns:
+            np.ndarray: True para linhas a descartar
+        """
+        columns = columns or [col for col in self.key if col in df.columns]
+        keys = hash_keys(df, columns, self.tolerances)
+        in_batch = pd.Series(keys, copy=False).duplicated(keep='first').to_numpy()
+        seen = self.index.contains(keys) & ~in_batch if self.index is not None else np.zeros_like(in_batch)
+        
+        self.stats['rows'] += len(keys)
+        self.stats['batch_duplicates'] += int(in_batch.sum())
+        self.stats['seen_duplicates'] += int(seen.sum())
+        if self.index is not None:
+            self.pending = np.concatenate([self.pending, keys[~(in_batch | seen)]])
+        return in_batch | seen
+    
+    def commit(self):
+        """Incorpora ao índice as chaves dos lotes gravados"""
+        if self.index is None:
+            return
+        self.index.add(self.pending)
+        self.index.save()
+        self.pending = np.empty(0, dtype='uint64')
@@ -0,0 +1,338 @@
+"""
+Cache de downloads do coletor: endereçado por conteúdo, com revalidação, TTL e limite em bytes
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from collections import Counter
+from urllib.parse import urlencode
+
+# Validade padrão das respostas por fonte (segundos); depois disso a
+# entrada é revalidada (ETag/Last-Modified ou checksum) antes do reuso
+DEFAULT_TTLS = {
+    'openaq': 3600,
+    'kaggle': 7 * 24 * 3600
+}
+DEFAULT_TTL = 3600
+
+COUNTERS = ('hits', 'revalidated', 'misses', 'bytes_downloaded', 'bytes_served')
+
+class DownloadCache:
+    """
+    Cache em disco das respostas e arquivos baixados pelo coletor
+    
+    O conteúdo é gravado uma única vez em blobs/<sha256>, e cada chave
+    (URL + parâmetros, ou um identificador como 'kaggle:open-aq/openaq')
+    aponta para o blob. Entradas dentro do TTL da fonte são servidas sem
+    rede; entradas vencidas são revalidadas e as menos usadas são
+    removidas ao ultrapassar max_bytes.
+    """
+    
+    INDEX_FILE = 'index.json'
+    
+    def __init__(self, cache_dir='data/cache/downloads', max_bytes=2 * 1024 ** 3,
+                 ttls=None, enabled=True):
+        """
+        Args:
+            cache_dir (str): Diretório dos blobs e do índice
+            max_bytes (int): Tamanho máximo dos blobs armazenados
+            ttls (dict): Validade por fonte em segundos (mesclado com DEFAULT_TTLS)
+            enabled (bool): Se False, todas as consultas são falhas (misses)
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.enabled = enabled
+        self.index_path = os.path.join(cache_dir, self.INDEX_FILE)
+        
+        os.makedirs(os.path.join(cache_dir, 'blobs'), exist_ok=True)
+        index = self._load_index()
+        self.entries = index.get('entries', {})
+        self.counters = {name: index.get('counters', {}).get(name, 0) for name in COUNTERS}
+    
+    @staticmethod
+    def request_key(url, params=None):
+        """Chave estável de uma requisição (parâmetros em ordem alfabética)"""
+        if not params:
+            return url
+        return f"{url}?{urlencode(sorted((str(k), str(v)) for k, v in params.items()))}"
+    
+    def lookup(self, key):
+        """Entrada da chave (None se ausente ou se o blob sumiu)"""
+        if not self.enabled:
+            return None
+        entry = self.entries.get(key)
+        if entry is None or not os.path.exists(self._blob_path(entry['sha256'])):
+            return None
+        return entry
+    
+    def is_fresh(self, entry):
+        """Entrada validada há menos que o TTL da sua fonte"""
+        ttl = self.ttls.get(entry['source'], DEFAULT_TTL)
+        return time.time() - entry['validated_at'] < ttl
+    
+    def conditional_headers(self, entry):
+        """Cabeçalhos de revalidação condicional (If-None-Match / If-Modified-Since)"""
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+    
+    def read(self, entry):
+        """Conteúdo do blob de uma entrada (conta como acerto servido)"""
+        with open(self._blob_path(entry['sha256']), 'rb') as f:
+            body = f.read()
+        self._touch(entry)
+        self.count('bytes_served', len(body))
+        return body
+    
+    def path(self, entry):
+        """Caminho do blob de uma entrada"""
+        self._touch(entry)
+        return self._blob_path(entry['sha256'])
+    
+    def store(self, key, body=None, file_path=None, source='default', etag=None,
+              last_modified=None, headers=None):
+        """
+        Armazena o conteúdo (bytes ou arquivo, que é movido para o cache)
+        
+        Returns:
+            dict: Entrada criada
+        """
+        if body is not None:
+            sha256 = hashlib.sha256(body).hexdigest()
+            size = len(body)
+        else:
+            sha256 = _file_hash(file_path)
+            size = os.path.getsize(file_path)
+        
+        blob = self._blob_path(sha256)
+        if not os.path.exists(blob):
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            if body is not None:
+                with open(blob + '.tmp', 'wb') as f:
+                    f.write(body)
+                os.replace(blob + '.tmp', blob)
+            else:
+                shutil.move(file_path, blob)
+        elif file_path is not None:
+            os.remove(file_path)
+        
+        now = time.time()
+        entry = {
+            'sha256': sha256,
+            'bytes': size,
+            'source': source,
+            'etag': etag,
+            'last_modified': last_modified,
+            'headers': headers or {},
+            'validated_at': now,
+            'last_access': now
+        }
+        if self.enabled:
+            self.entries[key] = entry
+            self.evict(keep=key)
+        return entry
+    
+    def mark_validated(self, key):
+        """Renova a validade de uma entrada confirmada pela origem (304 ou mesmo checksum)"""
+        entry = self.entries[key]
+        entry['validated_at'] = time.time()
+        self._touch(entry)
+        self._save_index()
+    
+    def cached_file(self, key, download, source='default'):
+        """
+        Arquivo baixado por `download`, reutilizado enquanto válido
+        
+        Sem suporte a ETag na origem (ex.: API do Kaggle), a revalidação é
+        por checksum: o arquivo é baixado de novo após o TTL, mas se o
+        conteúdo não mudou a entrada é apenas renovada.
+        
+        Args:
+            key (str): Identificador do arquivo (ex.: 'kaggle:open-aq/openaq')
+            download (callable): Recebe um diretório temporário e retorna o
+                caminho do arquivo baixado nele
+            source (str): Fonte (define o TTL)
+        
+        Returns:
+            tuple: (caminho do blob, sha256, 'hit' | 'revalidated' | 'miss')
+        """
+        entry = self.lookup(key)
+        if entry is not None and self.is_fresh(entry):
+            self.count('hits')
+            self.count('bytes_served', entry['bytes'])
+            path = self.path(entry)
+            self.flush()
+            return path, entry['sha256'], 'hit'
+        
+        tmp_dir = tempfile.mkdtemp(prefix='download-', dir=self.cache_dir)
+        try:
+            downloaded = download(tmp_dir)
+            self.count('bytes_downloaded', os.path.getsize(downloaded))
+            if entry is not None and _file_hash(downloaded) == entry['sha256']:
+                self.count('revalidated')
+                self.mark_validated(key)
+                return self.path(entry), entry['sha256'], 'revalidated'
+            
+            self.count('misses')
+            entry = self.store(key, file_path=downloaded, source=source)
+            return self._blob_path(entry['sha256']), entry['sha256'], 'miss'
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    
+    def count(self, name, amount=1):
+        """Incrementa um contador (hits, revalidated, misses, bytes_...)"""
+        self.counters[name] += amount
+    
+    def flush(self):
+        """Grava o índice e os contadores em disco"""
+        self._save_index()
+    
+    @property
+    def stats(self):
+        """Contadores acumulados, taxa de acerto e tamanho atual"""
+        lookups = self.counters['hits'] + self.counters['revalidated'] + self.counters['misses']
+        reused = self.counters['hits'] + self.counters['revalidated']
+        return {
+            **self.counters,
+            'hit_rate': round(reused / lookups, 4) if lookups else None,
+            'entries': len(self.entries),
+            'size_bytes': self.size_bytes
+        }
+    
+    @property
+    def size_bytes(self):
+        """Tamanho total dos blobs (conteúdo repetido conta uma vez)"""
+        return sum({entry['sha256']: entry['bytes'] for entry in self.entries.values()}.values())
+    
+    def evict(self, keep=None):
+        """
+        Remove as entradas menos usadas até respeitar max_bytes
+        
+        Args:
+            keep (str): Chave preservada mesmo se sozinha exceder max_bytes
+                (ex.: a que acabou de ser gravada e ainda será lida)
+        """
+        refs = self._blob_refs()
+        size = self.size_bytes
+        by_access = sorted(self.entries.items(), key=lambda item: item[1]['last_access'])
+        for key, entry in by_access:
+            if size <= self.max_bytes:
+                break
+            if key != keep:
+                size -= self._remove(key, refs)
+        self._save_index()
+    
+    def clear(self):
+        """Remove todas as entradas e blobs"""
+        refs = self._blob_refs()
+        for key in list(self.entries):
+            self._remove(key, refs)
+        self._save_index()
+    
+    def _touch(self, entry):
+        entry['last_access'] = time.time()
+    
+    def _blob_path(self, sha256):
+        return os.path.join(self.cache_dir, 'blobs', sha256[:2], sha256)
+    
+    def _blob_refs(self):
+        """Quantas chaves apontam para cada blob"""
+        return Counter(entry['sha256'] for entry in self.entries.values())
+    
+    def _remove(self, key, refs):
+        """Remove a entrada e, se for a última referência, o blob; retorna os bytes liberados"""
+        entry = self.entries.pop(key)
+        # O blob pode ser compartilhado por outras chaves com o mesmo conteúdo
+        refs[entry['sha256']] -= 1
+        if refs[entry['sha256']] > 0:
+            return 0
+        blob = self._blob_path(entry['sha256'])
+        if os.path.exists(blob):
+            os.remove(blob)
+        return entry['bytes']
+    
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            return {}
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            # Índice corrompido: recomeçar com o cache vazio
+            return {}
+    
+    def _save_index(self):
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'entries': self.entries, 'counters': self.counters}, f)
+        os.replace(tmp_path, self.index_path)
+
+class CachingTransport:
+    """
+    Transporte HTTP (ver fetcher.RequestsTransport) com cache de respostas
+    
+    Respostas 200 são guardadas; dentro do TTL são servidas sem rede e,
+    vencidas, revalidadas com If-None-Match/If-Modified-Since (um 304 não
+    transfere o corpo de novo).
+    """
+    
+    def __init__(self, transport, cache, source='openaq'):
+        self.transport = transport
+        self.cache = cache
+        self.source = source
+    
+    async def get(self, url, params=None, headers=None):
+        key = DownloadCache.request_key(url, params)
+        entry = self.cache.lookup(key)
+        if entry is not None and self.cache.is_fresh(entry):
+            self.cache.count('hits')
+            return 200, entry['headers'], self.cache.read(entry)
+        
+        request_headers = dict(headers or {})
+        if entry is not None:
+            request_headers.update(self.cache.conditional_headers(entry))
+        
+        status, response_headers, body = await self.transport.get(
+            url, params=params, headers=request_headers
+        )
+        if status == 304 and entry is not None:
+            self.cache.mark_validated(key)
+            self.cache.count('revalidated')
+            return 200, entry['headers'], self.cache.read(entry)
+        
+        if status == 200:
+            self.cache.count('bytes_downloaded', len(body))
+            self.cache.store(
+                key, body=body, source=self.source,
+                etag=_header(response_headers, 'ETag'),
+                last_modified=_header(response_headers, 'Last-Modified'),
+                headers={'Content-Type': _header(response_headers, 'Content-Type')}
+            )
+            self.cache.count('misses')
+        return status, response_headers, body
+    
+    async def close(self):
+        self.cache.flush()
+        await self.transport.close()
+
+def _header(headers, name):
+    """Valor de um cabeçalho sem diferenciar maiúsculas"""
+    for key, value in (headers or {}).items():
+        if key.lower() == name.lower():
+            return value
+    return None
+
+def _file_hash(path, block_size=1 << 20):
+    """Hash SHA-256 do conteúdo de um arquivo"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
@@ -0,0 +1,103 @@
+"""
+Redução de pontos (downsampling) das séries temporais exibidas no dashboard
+"""
+import numpy as np
+import pandas as pd
+
+# Largura de referência dos gráficos em pixels: não faz sentido enviar ao
+# navegador mais pontos por série do que colunas de pixels disponíveis
+CHART_WIDTH_PX = 1200
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets: escolhe os pontos que preservam a forma
+    
+    Args:
+        x, y (np.ndarray): Série ordenada por x (x numérico)
+        n_out (int): Número de pontos desejado (≥ 3)
+    
+    Returns:
+        np.ndarray: Índices dos pontos selecionados
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    
+    # Buckets internos (o primeiro e o último ponto são sempre mantidos)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    
+    previous = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[next_start:next_end].mean()
+        next_y = y[next_start:next_end].mean()
+        
+        # Área do triângulo (ponto anterior, candidato, média do próximo bucket)
+        area = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        selected[i + 1] = previous
+    
+    return selected
+
+def minmax(x, y, n_buckets):
+    """
+    Mantém o mínimo e o máximo de cada bucket de x (preserva picos)
+    
+    Returns:
+        np.ndarray: Índices ordenados dos pontos selecionados
+    """
+    n = len(x)
+    if 2 * n_buckets >= n:
+        return np.arange(n)
+    
+    x = np.asarray(x, dtype=np.float64)
+    span = x[-1] - x[0] or 1.0
+    buckets = np.minimum(((x - x[0]) / span * n_buckets).astype(np.int64), n_buckets - 1)
+    
+    values = pd.Series(np.asarray(y, dtype=np.float64))
+    grouped = values.groupby(buckets, sort=False)
+    keep = np.concatenate([grouped.idxmin().to_numpy(), grouped.idxmax().to_numpy()])
+    return np.unique(keep)
+
+def downsample(df, x='date', y='value', by=None, max_points=CHART_WIDTH_PX, method='lttb'):
+    """
+    Reduz cada série a no máximo max_points pontos
+    
+    Args:
+        df (pd.DataFrame): Dados do gráfico
+        x, y (str): Colunas dos eixos
+        by (list): Colunas que identificam cada série (ex.: city, parameter)
+        max_points (int): Limite de pontos por série (ex.: largura em pixels)
+        method (str): 'lttb' ou 'minmax'
+    
+    Returns:
+        pd.DataFrame: Linhas selecionadas, ordenadas por série e x
+    """
+    df = df.sort_values((by or []) + [x], ignore_index=True)
+    groups = df.groupby(by, sort=False, observed=True).indices.values() if by else [np.arange(len(df))]
+    
+    x_values = df[x].to_numpy()
+    if np.issubdtype(x_values.dtype, np.datetime64):
+        x_values = x_values.astype('datetime64[ns]').astype(np.int64)
+    y_values = df[y].to_numpy(dtype=np.float64)
+    
+    keep = []
+    for rows in groups:
+        if method == 'minmax':
+            chosen = minmax(x_values[rows], y_values[rows], max_points // 2)
+        else:
+            chosen = lttb(x_values[rows], y_values[rows], max_points)
+        keep.append(rows[chosen])
+    
+    if not keep:
+        return df
+    return df.iloc[np.sort(np.concatenate(keep))].reset_index(drop=True)
@@ -0,0 +1,353 @@
+"""
+Coleta assíncrona da API da OpenAQ: concorrente, com limite de taxa, retentativas e retomada
+
+Cada tarefa é uma combinação (cidade, poluente, janela de datas); as páginas
+de uma tarefa são buscadas em sequência e as tarefas rodam em paralelo.
+Os resultados são gravados em JSON lines conforme chegam, e um checkpoint
+registra a última página concluída de cada tarefa para retomar após falhas.
+"""
+import asyncio
+import functools
+import json
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import quote
+
+import pandas as pd
+
+try:
+    from .download_cache import CachingTransport
+    from .instrumentation import get_logger
+except ImportError:
+    from download_cache import CachingTransport
+    from instrumentation import get_logger
+
+logger = get_logger('fetcher')
+
+OPENAQ_URL = 'https://api.openaq.org'
+MEASUREMENTS_ENDPOINT = '/v2/measurements'
+CHECKPOINT_FILE = '_checkpoint.json'
+
+# Nomes dos poluentes na API
+PARAMETER_CODES = {
+    'PM2.5': 'pm25', 'PM10': 'pm10', 'NO2': 'no2', 'O3': 'o3', 'SO2': 'so2', 'CO': 'co'
+}
+
+# Respostas que valem uma nova tentativa
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+class FetchError(Exception):
+    """Falha definitiva ao buscar uma página"""
+
+class RateLimiter:
+    """Token bucket assíncrono: no máximo `rate` requisições por segundo"""
+    
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class RequestsTransport:
+    """
+    Transporte HTTP padrão: requests.Session com pool de conexões
+    
+    As chamadas bloqueantes rodam em um pool de threads do tamanho do pool
+    de conexões. Outros transportes (ex.: aiohttp) só precisam implementar
+    `async get(url, params, headers) -> (status, headers, body)` e `close()`,
+    com os cabeçalhos da resposta em um mapeamento que não diferencia
+    maiúsculas (como o de requests).
+    """
+    
+    def __init__(self, pool_size=10, timeout=30):
+        import requests
+        from requests.adapters import HTTPAdapter
+        
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='aq_http')
+    
+    async def get(self, url, params=None, headers=None):
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(self._executor, functools.partial(
+            self.session.get, url, params=params, headers=headers, timeout=self.timeout
+        ))
+        return response.status_code, response.headers, response.content
+    
+    async def close(self):
+        self.session.close()
+        self._executor.shutdown(wait=False)
+
+def build_jobs(cities, pollutants, date_from, date_to, window_days=30):
+    """
+    Divide o período em janelas por (cidade, poluente)
+    
+    Returns:
+        list: Tarefas {'key', 'city', 'parameter', 'date_from', 'date_to'}
+    """
+    start, end = pd.Timestamp(date_from), pd.Timestamp(date_to)
+    edges = list(pd.date_range(start, end, freq=f'{window_days}D')) + [end]
+    windows = [(a, b) for a, b in zip(edges[:-1], edges[1:]) if a < b] or [(start, end)]
+    
+    return [
+        {
+            'key': f"{city}|{parameter}|{a:%Y-%m-%d}|{b:%Y-%m-%d}",
+            'city': city,
+            'parameter': parameter,
+            'date_from': a.isoformat(),
+            'date_to': b.isoformat()
+        }
+        for city in cities for parameter in pollutants for a, b in windows
+    ]
+
+class OpenAQFetcher:
+    """Busca medições em paralelo, gravando em disco e retomando de checkpoints"""
+    
+    def __init__(self, output_dir, base_url=OPENAQ_URL, endpoint=MEASUREMENTS_ENDPOINT,
+                 api_key=None, transport=None, concurrency=8, rate_limit=10.0,
+                 max_retries=5, backoff=0.5, page_size=1000, cache=None):
+        """
+        Args:
+            output_dir (str): Diretório dos JSON lines e do checkpoint
+            base_url (str): URL da API (ou de um servidor local de testes)
+            endpoint (str): Caminho do endpoint de medições
+            api_key (str): Chave da API (cabeçalho X-API-Key)
+            transport: Transporte HTTP (padrão: RequestsTransport)
+            concurrency (int): Tarefas buscadas ao mesmo tempo
+            rate_limit (float): Requisições por segundo (limite da API)
+            max_retries (int): Tentativas extras por página
+            backoff (float): Espera base do backoff exponencial (s)
+            page_size (int): Registros por página
+            cache (DownloadCache): Cache de respostas (páginas repetidas são
+                servidas do disco ou revalidadas com ETag)
+        """
+        self.output_dir = output_dir
+        self.url = base_url.rstrip('/') + endpoint
+        self.headers = {'X-API-Key': api_key} if api_key else {}
+        self.transport = transport
+        self.concurrency = concurrency
+        self.rate_limit = rate_limit
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.page_size = page_size
+        self.cache = cache
+        
+        os.makedirs(output_dir, exist_ok=True)
+        self.checkpoint_path = os.path.join(output_dir, CHECKPOINT_FILE)
+        self.checkpoint = self._load_checkpoint()
+    
+    async def fetch(self, jobs):
+        """
+        Executa as tarefas pendentes (as concluídas no checkpoint são puladas)
+        
+        Returns:
+            dict: Estatísticas (tarefas, páginas, linhas, requisições,
+                retentativas, falhas, segundos)
+        """
+        self.stats = {
+            'jobs': len(jobs), 'skipped': 0, 'pages': 0, 'rows': 0,
+            'requests': 0, 'retries': 0, 'failed': []
+        }
+        self._limiter = RateLimiter(self.rate_limit)
+        own_transport = self.transport is None
+        transport = self.transport or RequestsTransport(pool_size=self.concurrency)
+        if self.cache is not None:
+            transport = CachingTransport(transport, self.cache, source='openaq')
+        
+        queue = asyncio.Queue()
+        for job in jobs:
+            if self.checkpoint.get(job['key'], {}).get('done'):
+                self.stats['skipped'] += 1
+            else:
+                queue.put_nowait(job)
+        
+        logger.info(f"🌐 OpenAQ: {queue.qsize()} tarefa(s) pendente(s), "
+                    f"{self.stats['skipped']} já concluída(s)")
+        start = time.perf_counter()
+        try:
+            workers = [
+                asyncio.create_task(self._worker(queue, transport))
+                for _ in range(min(self.concurrency, queue.qsize()))
+            ]
+            await asyncio.gather(*workers)
+        finally:
+            self._save_checkpoint()
+            if self.cache is not None:
+                self.cache.flush()
+            if own_transport:
+                await transport.close()
+        
+        self.stats['seconds'] = round(time.perf_counter() - start, 3)
+        logger.info(f"✅ OpenAQ: {self.stats['rows']:,} registros em {self.stats['pages']} página(s), "
+                    f"{self.stats['retries']} retentativa(s), {len(self.stats['failed'])} falha(s) "
+                    f"em {self.stats['seconds']:.1f}s")
+        return self.stats
+    
+    def load(self, jobs=None):
+        """Lê os registros gravados (das tarefas dadas ou de todas) no formato do pipeline"""
+        if jobs is None:
+            files = sorted(f for f in os.listdir(self.output_dir) if f.endswith('.jsonl'))
+        else:
+            files = [self._job_file(job) for job in jobs]
+        
+        records = []
+        for filename in files:
+            path = os.path.join(self.output_dir, filename)
+            if os.path.exists(path):
+                with open(path, encoding='utf-8') as f:
+                    records.extend(json.loads(line) for line in f if line.strip())
+        return measurements_to_frame(records)
+    
+    @staticmethod
+    def _job_file(job):
+        return quote(job['key'], safe='') + '.jsonl'
+    
+    async def _worker(self, queue, transport):
+        while True:
+            try:
+                job = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                await self._run_job(job, transport)
+            except FetchError as e:
+                logger.warning(f"❌ {job['key']}: {e}")
+                self.stats['failed'].append(job['key'])
+    
+    async def _run_job(self, job, transport):
+        """Busca as páginas de uma tarefa a partir da última concluída"""
+        state = self.checkpoint.setdefault(
+            job['key'], {'page': 0, 'offset': 0, 'rows': 0, 'done': False}
+        )
+        path = os.path.join(self.output_dir, self._job_file(job))
+        
+        # Descarta páginas gravadas após o último checkpoint (execução interrompida)
+        if os.path.exists(path) and os.path.getsize(path) != state['offset']:
+            with open(path, 'r+b') as f:
+                f.truncate(state['offset'])
+        
+        page = state['page'] + 1
+        while True:
+            results = await self._get_page(job, page, transport)
+            
+            with open(path, 'a', encoding='utf-8') as f:
+                for result in results:
+                    f.write(json.dumps(result, ensure_ascii=False) + '\n')
+                state['offset'] = f.tell()
+            state['page'] = page
+            state['rows'] += len(results)
+            self.stats['pages'] += 1
+            self.stats['rows'] += len(results)
+            
+            if len(results) < self.page_size:
+                state['done'] = True
+                self._save_checkpoint()
+                logger.debug(f"  📦 {job['key']}: {state['rows']:,} registros")
+                return
+            self._save_checkpoint()
+            page += 1
+    
+    async def _get_page(self, job, page, transport):
+        """Uma página, com limite de taxa e backoff exponencial com jitter"""
+        params = {
+            'city': job['city'],
+            'parameter': PARAMETER_CODES.get(job['parameter'], job['parameter']),
+            'date_from': job['date_from'],
+            'date_to': job['date_to'],
+            'limit': self.page_size,
+            'page': page
+        }
+        
+        for attempt in range(self.max_retries + 1):
+            await self._limiter.acquire()
+            self.stats['requests'] += 1
+            try:
+                status, headers, body = await transport.get(
+                    self.url, params=params, headers=self.headers
+                )
+            except (OSError, asyncio.TimeoutError) as e:
+                status, headers, error = None, {}, e
+            else:
+                if status == 200:
+                    # Corpo truncado ou corrompido: vale uma nova tentativa
+                    try:
+                        return json.loads(body).get('results', [])
+                    except (ValueError, AttributeError) as e:
+                        error = f"resposta inválida ({e})"
+                else:
+                    error = f"HTTP {status}"
+                    if status not in RETRY_STATUS:
+                        raise FetchError(f"{error} na página {page}")
+            
+            if attempt == self.max_retries:
+                raise FetchError(f"{error} na página {page} após {attempt + 1} tentativas")
+            self.stats['retries'] += 1
+            delay = _retry_after(headers.get('Retry-After'))
+            if delay is None:
+                delay = self.backoff * 2 ** attempt
+            await asyncio.sleep(delay * (1 + random.random() * 0.25))
+    
+    def _load_checkpoint(self):
+        if not os.path.exists(self.checkpoint_path):
+            return {}
+        with open(self.checkpoint_path, encoding='utf-8') as f:
+            return json.load(f)
+    
+    def _save_checkpoint(self):
+        with open(self.checkpoint_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.checkpoint, f, ensure_ascii=False)
+        os.replace(self.checkpoint_path + '.tmp', self.checkpoint_path)
+
+def _retry_after(value):
+    """Espera pedida por um Retry-After, em segundos ou data HTTP (None se ausente ou inválido)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+def measurements_to_frame(records):
+    """Converte registros da API para as colunas do dataset (date, city, ..., longitude)"""
+    names = {code: name for name, code in PARAMETER_CODES.items()}
+    rows = pd.json_normalize(records) if records else pd.DataFrame()
+    columns = ['date', 'city', 'country', 'parameter', 'value', 'unit', 'latitude', 'longitude']
+    if rows.empty:
+        return pd.DataFrame(columns=columns)
+    
+    return pd.DataFrame({
+        'date': pd.to_datetime(rows['date.utc'], utc=True).dt.tz_localize(None),
+        'city': rows['city'],
+        'country': rows.get('country'),
+        'parameter': rows['parameter'].map(lambda p: names.get(p, p)),
+        'value': pd.to_numeric(rows['value'], errors='coerce'),
+        'unit': rows.get('unit'),
+        'latitude': rows.get('coordinates.latitude'),
+        'longitude': rows.get('coordinates.longitude')
+    })[columns]
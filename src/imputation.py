@@ -0,0 +1,350 @@
+"""
+Imputação de valores ausentes por (cidade, poluente) em ordem temporal, com contexto entre lotes
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .writers import write_table
+except ImportError:
+    from writers import write_table
+
+IMPUTATION_DIR = 'imputation'
+
+GROUP_KEYS = ['city', 'parameter']
+PROFILE_KEYS = ['month', 'day_of_week']
+
+# Células do perfil sazonal por grupo: 12 meses x 7 dias da semana
+PROFILE_CELLS = 12 * 7
+
+METHODS = ('ffill', 'interpolate', 'seasonal', 'mean')
+DEFAULT_METHODS = ('interpolate', 'seasonal', 'mean')
+
+class ImputationState:
+    """
+    Contexto da imputação entre blocos e execuções
+    
+    Guarda, por grupo, a última leitura válida (âncora para ffill e
+    interpolação no início do próximo bloco) e as somas/contagens por
+    (mês, dia da semana), das quais saem o perfil sazonal e a média do
+    grupo. O tamanho não depende do histórico: uma linha por grupo e no
+    máximo 84 por grupo no perfil.
+    """
+    
+    ANCHOR_COLUMNS = ['city', 'parameter', 'date', 'value']
+    PROFILE_COLUMNS = ['city', 'parameter', 'month', 'day_of_week', 'value_sum', 'value_count']
+    
+    def __init__(self, path=None, anchors=None, profile=None):
+        """
+        Args:
+            path (str): Diretório do estado (None = apenas em memória)
+            anchors (pd.DataFrame): Última leitura válida por grupo
+            profile (pd.DataFrame): Somas e contagens por grupo, mês e dia da semana
+        """
+        self.path = path
+        self.anchors = anchors if anchors is not None else pd.DataFrame(columns=self.ANCHOR_COLUMNS)
+        self.profile = profile if profile is not None else pd.DataFrame(columns=self.PROFILE_COLUMNS)
+    
+    @classmethod
+    def load(cls, path):
+        """Carrega o estado salvo (ou um estado vazio)"""
+        if not os.path.exists(os.path.join(path, 'anchors.parquet')):
+            return cls(path)
+        return cls(
+            path,
+            pd.read_parquet(os.path.join(path, 'anchors.parquet')),
+            pd.read_parquet(os.path.join(path, 'profile.parquet'))
+        )
+    
+    def save(self):
+        """Grava âncoras e perfil (cada arquivo de forma atômica)"""
+        if self.path is None:
+            return
+        write_table(self.anchors, os.path.join(self.path, 'anchors.parquet'))
+        write_table(self.profile, os.path.join(self.path, 'profile.parquet'))
+    
+    def merge(self, anchors, profile):
+        """Incorpora as âncoras e o perfil observados em um bloco"""
+        combined = pd.concat([df for df in (self.anchors, anchors) if len(df)], ignore_index=True)
+        if len(combined):
+            self.anchors = (
+                combined.sort_values('date', kind='stable')
+                .drop_duplicates(GROUP_KEYS, keep='last')
+                .reset_index(drop=True)[self.ANCHOR_COLUMNS]
+            )
+        combined = pd.concat([df for df in (self.profile, profile) if len(df)], ignore_index=True)
+        if len(combined):
+            self.profile = combined.groupby(
+                GROUP_KEYS + PROFILE_KEYS, sort=False, as_index=False
+            )[['value_sum', 'value_count']].sum()[self.PROFILE_COLUMNS]
+
+class Imputer:
+    """
+    Preenche valores ausentes com uma cadeia de métodos por grupo
+    
+    Cada método só preenche o que os anteriores deixaram:
+    
+    - ffill: repete a última leitura válida (até `limit` leituras seguidas
+      e `max_gap` de distância)
+    - interpolate: interpolação linear ponderada pelo tempo entre as
+      leituras válidas vizinhas, em lacunas de até `max_gap`
+    - seasonal: média do grupo no mesmo mês e dia da semana (perfil
+      sazonal), se houver ao menos `min_profile_count` leituras
+    - mean: média do grupo (o comportamento anterior da limpeza)
+    
+    As linhas são ordenadas por (grupo, data) uma única vez e todos os
+    métodos operam sobre o vetor ordenado, sem laços por grupo. Com um
+    ImputationState, a última leitura de cada grupo no bloco anterior
+    serve de vizinha à esquerda, e perfil e média incluem o histórico;
+    lacunas no fim do bloco, sem vizinha à direita, ficam para o perfil
+    sazonal e a média. As estatísticas observadas no bloco ficam
+    pendentes até `commit()`, chamado depois que o bloco foi gravado.
+    """
+    
+    def __init__(self, methods=DEFAULT_METHODS, limit=None, max_gap='3D', min_profile_count=3,
+                 state=None):
+        """
+        Args:
+            methods (tuple): Métodos, na ordem de aplicação (de METHODS)
+            limit (int): Máximo de leituras seguidas preenchidas por ffill
+                (None = sem limite de contagem)
+            max_gap (str | pd.Timedelta): Distância máxima entre as leituras
+                válidas usadas por ffill e interpolate
+            min_profile_count (int): Leituras mínimas na célula do perfil sazonal
+            state (ImputationState): Contexto de blocos anteriores
+        """
+        unknown = set(methods) - set(METHODS)
+        if unknown:
+            raise ValueError(f"Métodos de imputação desconhecidos: {sorted(unknown)}")
+        self.methods = tuple(methods)
+        self.limit = limit
+        self.max_gap = pd.Timedelta(max_gap).value
+        self.min_profile_count = min_profile_count
+        self.state = state
+        self.stats = {method: 0 for method in self.methods}
+        self._pending = []
+    
+    def fill(self, df, means=None):
+        """
+        Valores de df['value'] com as lacunas preenchidas
+        
+        Args:
+            df (pd.DataFrame): Bloco com date, city, parameter e value
+            means (np.ndarray): Média do grupo de cada linha, calculada
+                pelo chamador (ex.: incluindo o histórico); substitui a
+                média do método 'mean'
+        
+        Returns:
+            np.ndarray: Valores float64 na ordem das linhas de df
+        """
+        values = df['value'].to_numpy(dtype='float64', na_value=np.nan)
+        grouper = df.groupby(GROUP_KEYS, observed=True, sort=False)
+        codes = grouper.ngroup().to_numpy()
+        labels = _string_labels(grouper.size().index)
+        dates = df['date'].to_numpy(dtype='datetime64[ns]').view('int64')
+        cells = _profile_cells(df, codes)
+        
+        order = _group_date_order(codes, dates)
+        v, t, g, cell = values[order], dates[order], codes[order], cells[order]
+        observed = ~np.isnan(v)
+        self._stage(labels, g, t, v, cell, observed)
+        
+        missing = ~observed & (g >= 0)
+        if missing.any():
+            filled = v.copy()
+            context = _Neighbors(v, t, g, observed, self._anchors(labels))
+            for method in self.methods:
+                if not missing.any():
+                    break
+                candidate = self._candidate(method, context, missing, cell, labels, means, order)
+                fillable = missing & ~np.isnan(candidate)
+                filled[fillable] = candidate[fillable]
+                missing &= ~fillable
+                self.stats[method] += int(fillable.sum())
+            v = filled
+        
+        result = np.empty_like(values)
+        result[order] = v
+        return result
+    
+    def commit(self):
+        """Incorpora ao estado as leituras observadas nos blocos gravados"""
+        if self.state is None:
+            self._pending = []
+            return
+        if self._pending:
+            # Todos os blocos pendentes em uma única combinação com o estado
+            self.state.merge(
+                pd.concat([anchors for anchors, _ in self._pending], ignore_index=True),
+                pd.concat([profile for _, profile in self._pending], ignore_index=True)
+            )
+        self._pending = []
+        self.state.save()
+    
+    def summary(self):
+        """Linhas preenchidas por método, para o log"""
+        return [f"{method}: {count:,} valores" for method, count in self.stats.items()]
+    
+    def _candidate(self, method, context, missing, cell, labels, means, order):
+        """Valor proposto pelo método para cada linha (NaN = não preenche)"""
+        if method == 'ffill':
+            return context.forward(self.max_gap, self.limit)
+        if method == 'interpolate':
+            return context.interpolate(self.max_gap)
+        if method == 'mean' and means is not None:
+            return np.asarray(means, dtype='float64')[order]
+        
+        sums, counts = self._profile(labels, context, cell)
+        if method == 'seasonal':
+            with np.errstate(divide='ignore', invalid='ignore'):
+                profile = np.where(counts >= self.min_profile_count, sums / counts, np.nan)
+            return _take(profile, np.where(context.groups >= 0, cell, -1))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            group_means = sums.reshape(-1, PROFILE_CELLS).sum(axis=1) / counts.reshape(-1, PROFILE_CELLS).sum(axis=1)
+        return _take(group_means, context.groups)
+    
+    def _profile(self, labels, context, cell):
+        """Somas e contagens por célula (grupo x mês x dia), do histórico e do bloco"""
+        size = len(labels) * PROFILE_CELLS
+        valid = context.observed & (context.groups >= 0)
+        sums = np.bincount(cell[valid], weights=context.values[valid], minlength=size)
+        counts = np.bincount(cell[valid], minlength=size).astype('float64')
+        
+        if self.state is not None and len(self.state.profile):
+            history = self.state.profile
+            group = labels.get_indexer(pd.MultiIndex.from_frame(history[GROUP_KEYS].astype(str)))
+            known = group >= 0
+            history_cells = (
+                group[known] * PROFILE_CELLS
+                + (history['month'].to_numpy()[known] - 1) * 7
+                + history['day_of_week'].to_numpy()[known]
+            )
+            sums += np.bincount(history_cells, weights=history['value_sum'].to_numpy()[known], minlength=size)
+            counts += np.bincount(history_cells, weights=history['value_count'].to_numpy()[known], minlength=size)
+        return sums, counts
+    
+    def _anchors(self, labels):
+        """(data, valor) da última leitura válida de cada grupo em blocos anteriores"""
+        if self.state is None or not len(self.state.anchors):
+            return None
+        anchors = self.state.anchors
+        anchors = anchors.set_index(pd.MultiIndex.from_frame(anchors[GROUP_KEYS].astype(str)))
+        anchors = anchors.reindex(labels)
+        return (
+            anchors['date'].to_numpy(dtype='datetime64[ns]').view('int64'),
+            anchors['value'].to_numpy(dtype='float64', na_value=np.nan)
+        )
+    
+    def _stage(self, labels, g, t, v, cell, observed):
+        """Guarda âncoras e perfil do bloco até o commit"""
+        if self.state is None:
+            return
+        valid = observed & (g >= 0)
+        # Última leitura válida de cada grupo (vetor ordenado por grupo e data)
+        rows = np.flatnonzero(valid)
+        rows = rows[np.r_[g[rows][1:] != g[rows][:-1], True]] if len(rows) else rows
+        anchors = pd.DataFrame({
+            'city': labels.get_level_values(0)[g[rows]],
+            'parameter': labels.get_level_values(1)[g[rows]],
+            'date': t[rows].view('datetime64[ns]'),
+            'value': v[rows]
+        })
+        
+        counts = np.bincount(cell[valid], minlength=len(labels) * PROFILE_CELLS)
+        sums = np.bincount(cell[valid], weights=v[valid], minlength=len(labels) * PROFILE_CELLS)
+        present = np.flatnonzero(counts)
+        group, offset = np.divmod(present, PROFILE_CELLS)
+        profile = pd.DataFrame({
+            'city': labels.get_level_values(0)[group],
+            'parameter': labels.get_level_values(1)[group],
+            'month': offset // 7 + 1,
+            'day_of_week': offset % 7,
+            'value_sum': sums[present],
+            'value_count': counts[present]
+        })
+        self._pending.append((anchors, profile))
+
+class _Neighbors:
+    """Leitura válida anterior e seguinte de cada linha, dentro do grupo"""
+    
+    def __init__(self, values, dates, groups, observed, anchors=None):
+        self.values = values
+        self.groups = groups
+        self.observed = observed
+        # Datas em float (ns): sem vizinha = ±inf, sem risco de overflow nas diferenças
+        self.dates = dates.astype('float64')
+        
+        n = len(values)
+        positions = np.arange(n)
+        group_start = np.r_[True, groups[1:] != groups[:-1]]
+        start_of = np.maximum.accumulate(np.where(group_start, positions, 0))
+        end_of = np.minimum.accumulate(np.where(np.r_[group_start[1:], True], positions, n)[::-1])[::-1]
+        
+        prev_pos = np.maximum.accumulate(np.where(observed, positions, -1))
+        next_pos = np.minimum.accumulate(np.where(observed, positions, n)[::-1])[::-1]
+        has_prev = prev_pos >= start_of
+        has_next = next_pos <= end_of
+        
+        self.prev_date = np.where(has_prev, self.dates[np.maximum(prev_pos, 0)], -np.inf)
+        self.prev_value = np.where(has_prev, values[np.maximum(prev_pos, 0)], np.nan)
+        # Leituras seguidas sem valor desde a anterior (a âncora conta como logo antes do bloco)
+        self.run_length = positions - np.where(has_prev, prev_pos, start_of - 1)
+        if anchors is not None:
+            anchor_date, anchor_value = anchors
+            use_anchor = ~has_prev & (groups >= 0)
+            group = np.maximum(groups, 0)
+            self.prev_date = np.where(use_anchor & ~np.isnan(anchor_value[group]),
+                                      anchor_date[group].astype('float64'), self.prev_date)
+            self.prev_value = np.where(use_anchor, anchor_value[group], self.prev_value)
+        self.next_date = np.where(has_next, self.dates[np.minimum(next_pos, n - 1)], np.inf)
+        self.next_value = np.where(has_next, values[np.minimum(next_pos, n - 1)], np.nan)
+    
+    def forward(self, max_gap, limit=None):
+        ok = (self.dates - self.prev_date) <= max_gap
+        if limit is not None:
+            ok &= self.run_length <= limit
+        return np.where(ok, self.prev_value, np.nan)
+    
+    def interpolate(self, max_gap):
+        span = self.next_date - self.prev_date
+        ok = (span <= max_gap) & ~np.isnan(self.prev_value) & ~np.isnan(self.next_value)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            weight = np.where(ok & (span > 0), (self.dates - self.prev_date) / span, 0.0)
+        return np.where(ok, self.prev_value + weight * (self.next_value - self.prev_value), np.nan)
+
+def _profile_cells(df, codes):
+    """Célula do perfil sazonal de cada linha: grupo * 84 + (mês - 1) * 7 + dia da semana"""
+    if set(PROFILE_KEYS) <= set(df.columns):
+        month = df['month'].to_numpy(dtype='int64')
+        day_of_week = df['day_of_week'].to_numpy(dtype='int64')
+    else:
+        month = df['date'].dt.month.to_numpy(dtype='int64')
+        day_of_week = df['date'].dt.dayofweek.to_numpy(dtype='int64')
+    return np.where(codes >= 0, codes * PROFILE_CELLS + (month - 1) * 7 + day_of_week, -1)
+
+def _group_date_order(codes, dates):
+    """Permutação que ordena as linhas por (grupo, data), estável"""
+    if not len(dates):
+        return np.arange(0)
+    offset = dates - dates.min()
+    span = int(offset.max()) + 1
+    if (int(codes.max()) + 2) * span < np.iinfo('int64').max:
+        # Uma chave inteira só: um argsort em vez de dois (e quase linear se já ordenado)
+        return np.argsort((codes + 1) * span + offset, kind='stable')
+    return np.lexsort((dates, codes))
+
+def _string_labels(index):
+    """MultiIndex (cidade, poluente) em texto, para casar com o estado salvo"""
+    return pd.MultiIndex.from_arrays(
+        [index.get_level_values(i).astype(str) for i in range(index.nlevels)],
+        names=index.names
+    )
+
+def _take(table, positions):
+    """table[positions], com NaN para posições negativas"""
+    result = np.full(len(positions), np.nan)
+    valid = positions >= 0
+    result[valid] = table[positions[valid]]
+    return result
@@ -0,0 +1,135 @@
+"""
+Estado da ingestão incremental (marcas d'água por cidade e poluente)
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+GROUP_KEYS = ['city', 'parameter']
+
+class IncrementalState:
+    """
+    Marca d'água e estatísticas acumuladas por (cidade, poluente)
+    
+    A marca d'água é a data mais recente já ingerida em cada grupo; apenas
+    linhas posteriores a ela são processadas. As somas e contagens dos
+    valores observados permitem imputar médias de todo o histórico sem
+    recarregá-lo.
+    """
+    
+    COLUMNS = ['city', 'parameter', 'first_date', 'watermark', 'rows', 'value_sum', 'value_count']
+    _AGGREGATES = {
+        'first_date': 'min',
+        'watermark': 'max',
+        'rows': 'sum',
+        'value_sum': 'sum',
+        'value_count': 'sum'
+    }
+    
+    def __init__(self, path='data/processed/watermarks.json', table=None):
+        """
+        Args:
+            path (str): Arquivo JSON do estado
+            table (pd.DataFrame): Estado já carregado (uma linha por grupo)
+        """
+        self.path = path
+        if table is None:
+            table = pd.DataFrame(columns=self.COLUMNS)
+        self.table = table.set_index(GROUP_KEYS) if 'city' in table.columns else table
+    
+    @classmethod
+    def load(cls, path='data/processed/watermarks.json'):
+        """Carrega o estado salvo (ou um estado vazio)"""
+        if not os.path.exists(path):
+            return cls(path)
+        
+        with open(path, encoding='utf-8') as f:
+            records = json.load(f)
+        table = pd.DataFrame.from_records(records, columns=cls.COLUMNS)
+        for col in ['first_date', 'watermark']:
+            table[col] = pd.to_datetime(table[col])
+        return cls(path, table)
+    
+    def save(self):
+        """Grava o estado de forma atômica"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        table = self.table.reset_index()
+        for col in ['first_date', 'watermark']:
+            table[col] = table[col].astype(str)
+        
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(table.to_dict(orient='records'), f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+    
+    @property
+    def is_empty(self):
+        return self.table.empty
+    
+    @property
+    def value_stats(self):
+        """Somas e contagens dos valores observados por grupo"""
+        return self.table[['value_sum', 'value_count']]
+    
+    def watermarks_for(self, df):
+        """Marca d'água de cada linha de df (NaT para grupos novos)"""
+        if self.is_empty:
+            return np.full(len(df), np.datetime64('NaT'), dtype='datetime64[ns]')
+        
+        keys = pd.MultiIndex.from_arrays([df[col].astype(str) for col in GROUP_KEYS])
+        return self.table['watermark'].reindex(keys).to_numpy()
+    
+    def group_means_for(self, df, batch_stats):
+        """
+        Média por grupo de cada linha de df, combinando histórico e lote
+        
+        Args:
+            df (pd.DataFrame): Lote em limpeza
+            batch_stats (pd.DataFrame): Somas/contagens observadas no lote
+        """
+        stats = batch_stats.copy()
+        stats.index = _string_index(stats.index)
+        if not self.is_empty:
+            stats = stats.add(self.value_stats, fill_value=0)
+        
+        means = stats['value_sum'] / stats['value_count'].replace(0, np.nan)
+        keys = pd.MultiIndex.from_arrays([df[col].astype(str) for col in GROUP_KEYS])
+        return means.reindex(keys).to_numpy()
+    
+    def update(self, cleaned, value_stats):
+        """
+        Incorpora um lote já limpo ao estado
+        
+        Args:
+            cleaned (pd.DataFrame): Novas linhas limpas
+            value_stats (pd.DataFrame): Somas/contagens dos valores
+                observados no lote (DataCleaner.value_stats)
+        """
+        if cleaned.empty:
+            return
+        self.merge(self.summarize(cleaned, value_stats))
+    
+    @classmethod
+    def summarize(cls, cleaned, value_stats):
+        """Primeira data, marca d'água, linhas e somas de um lote limpo, por grupo"""
+        batch = cleaned.groupby(
+            [cleaned[col].astype(str) for col in GROUP_KEYS], sort=False
+        )['date'].agg(first_date='min', watermark='max', rows='size')
+        stats = value_stats.copy()
+        stats.index = _string_index(stats.index)
+        batch = batch.join(stats, how='left').fillna({'value_sum': 0, 'value_count': 0})
+        return batch[cls.COLUMNS[2:]]
+    
+    def merge(self, batch):
+        """Incorpora resumos de lotes (ver summarize); vários lotes de uma vez custam um agrupamento"""
+        combined = batch if self.is_empty else pd.concat([self.table, batch])
+        self.table = combined.groupby(level=GROUP_KEYS, sort=False).agg(self._AGGREGATES)
+
+def _string_index(index):
+    """Converte os níveis (possivelmente categóricos) de um MultiIndex em texto"""
+    return pd.MultiIndex.from_arrays(
+        [index.get_level_values(i).astype(str) for i in range(index.nlevels)],
+        names=index.names
+    )
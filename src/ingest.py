@@ -0,0 +1,216 @@
+"""
+Ingestão dos arquivos brutos (CSV, CSV.gz e Parquet) com o leitor multithread do Arrow
+"""
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pyarrow as pa
+import pyarrow.csv as pcsv
+import pyarrow.parquet as pq
+
+try:
+    from .instrumentation import get_logger, span
+except ImportError:
+    from instrumentation import get_logger, span
+
+logger = get_logger('ingest')
+
+RAW_EXTENSIONS = ('.csv', '.csv.gz', '.parquet')
+
+SCHEMA_CACHE_FILE = 'raw_schemas.json'
+
+# Bloco do leitor CSV: cada bloco é convertido por uma thread
+BLOCK_SIZE = 4 * 1024 * 1024
+
+DICTIONARY_TYPE = pa.dictionary(pa.int32(), pa.string())
+
+# Tipos explícitos das colunas conhecidas (as demais são inferidas uma vez e cacheadas)
+COLUMN_TYPES = {
+    'value': pa.float64(),
+    'latitude': pa.float64(),
+    'longitude': pa.float64(),
+    'location': DICTIONARY_TYPE,
+    'city': DICTIONARY_TYPE,
+    'country': DICTIONARY_TYPE,
+    'parameter': DICTIONARY_TYPE,
+    'unit': DICTIONARY_TYPE
+}
+
+DATE_COLUMNS = ('date', 'utc', 'local')
+
+def discover_files(raw_dir):
+    """Arquivos brutos de raw_dir (e subdiretórios), em ordem estável"""
+    paths = []
+    for root, _, files in os.walk(raw_dir):
+        paths.extend(os.path.join(root, f) for f in files if f.endswith(RAW_EXTENSIONS))
+    return sorted(paths)
+
+class SchemaCache:
+    """
+    Esquemas dos CSVs brutos, indexados pelo cabeçalho do arquivo
+    
+    A inferência de tipos lê só o primeiro bloco do primeiro arquivo com
+    um dado cabeçalho; os demais arquivos (e as execuções seguintes) são
+    lidos com o esquema explícito salvo em JSON.
+    """
+    
+    def __init__(self, path=None):
+        """
+        Args:
+            path (str): Arquivo JSON do cache (None = apenas em memória)
+        """
+        self.path = path
+        self.schemas = {}
+        self.inferred = 0
+        self._dirty = False
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.schemas = {
+                    key: pa.ipc.read_schema(pa.py_buffer(base64.b64decode(value)))
+                    for key, value in json.load(f).items()
+                }
+    
+    def schema_for(self, path):
+        """Esquema explícito do CSV (inferido e guardado na primeira vez)"""
+        key = _header_key(path)
+        with self._lock:
+            schema = self.schemas.get(key)
+        if schema is None:
+            schema = _infer_schema(path)
+            with self._lock:
+                self.schemas[key] = schema
+                self.inferred += 1
+                self._dirty = True
+        return schema
+    
+    def save(self):
+        """Grava o cache se algum esquema novo foi inferido"""
+        if self.path is None or not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        encoded = {
+            key: base64.b64encode(schema.serialize().to_pybytes()).decode('ascii')
+            for key, schema in self.schemas.items()
+        }
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(encoded, f, indent=2)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+def read_file(path, schema_cache=None):
+    """
+    Lê um arquivo bruto como tabela Arrow com os tipos de COLUMN_TYPES
+    
+    Args:
+        path (str): Arquivo .csv, .csv.gz (descompactado em streaming) ou .parquet
+        schema_cache (SchemaCache): Esquemas dos CSVs (padrão: inferir sempre)
+    """
+    if path.endswith('.parquet'):
+        table = pq.read_table(path)
+    else:
+        schema = (schema_cache or SchemaCache()).schema_for(path)
+        table = pcsv.read_csv(
+            path,
+            read_options=pcsv.ReadOptions(use_threads=True, block_size=BLOCK_SIZE),
+            convert_options=pcsv.ConvertOptions(
+                column_types={field.name: field.type for field in schema},
+                strings_can_be_null=True
+            )
+        )
+    return _normalize(table)
+
+def read_raw_table(source, workers=None, schema_cache=None):
+    """
+    Lê todos os arquivos brutos em paralelo e concatena as tabelas Arrow
+    
+    Cada arquivo é lido por uma thread do pool e convertido em blocos
+    pelas threads do Arrow (que liberam o GIL); a concatenação só junta
+    os blocos, sem cópia.
+    
+    Args:
+        source (str | list): Diretório dos dados brutos ou lista de arquivos
+        workers (int): Arquivos lidos ao mesmo tempo (padrão: núcleos da CPU)
+        schema_cache (SchemaCache): Esquemas dos CSVs
+    
+    Returns:
+        pa.Table: Linhas de todos os arquivos, na ordem dos arquivos
+    """
+    paths = discover_files(source) if isinstance(source, str) else list(source)
+    if not paths:
+        raise FileNotFoundError(f"Nenhum arquivo bruto ({', '.join(RAW_EXTENSIONS)}) em {source}")
+    schema_cache = schema_cache or SchemaCache()
+    workers = max(1, min(workers or os.cpu_count() or 1, len(paths)))
+    
+    start = time.perf_counter()
+    with span('collect.read_raw', files=len(paths), workers=workers) as s:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            tables = list(pool.map(lambda path: read_file(path, schema_cache), paths))
+        table = pa.concat_tables(tables, promote_options='default')
+        s.rows_out = table.num_rows
+    schema_cache.save()
+    
+    elapsed = time.perf_counter() - start
+    logger.info(f"📄 {len(paths)} arquivo(s) brutos, {table.num_rows:,} registros em {elapsed:.2f}s "
+                f"({workers} leitor(es), {schema_cache.inferred} esquema(s) inferido(s))")
+    return table
+
+def read_raw_frame(source, workers=None, schema_cache=None):
+    """
+    Como read_raw_table, convertendo para DataFrame
+    
+    Colunas de dicionário viram categóricas e os buffers do Arrow são
+    liberados durante a conversão (sem manter duas cópias).
+    """
+    table = read_raw_table(source, workers=workers, schema_cache=schema_cache)
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+def _header_key(path):
+    """Hash do cabeçalho do CSV (lido do arquivo descompactado, se .gz)"""
+    with pa.input_stream(path, compression='detect') as stream:
+        header = stream.read(64 * 1024).split(b'\n', 1)[0]
+    return hashlib.sha1(header.strip()).hexdigest()
+
+def _infer_schema(path):
+    """Tipos inferidos do primeiro bloco, com COLUMN_TYPES aplicado por cima"""
+    reader = pcsv.open_csv(path, read_options=pcsv.ReadOptions(block_size=BLOCK_SIZE))
+    try:
+        inferred = reader.schema
+    finally:
+        reader.close()
+    
+    fields = []
+    for field in inferred:
+        if field.name in COLUMN_TYPES:
+            field = field.with_type(COLUMN_TYPES[field.name])
+        elif field.name in DATE_COLUMNS and _is_temporal(field.type):
+            # Um bloco só com dias (date32) não impede horários no resto do arquivo
+            field = field.with_type(pa.timestamp('ns', tz=getattr(field.type, 'tz', None)))
+        elif pa.types.is_integer(field.type):
+            # Um bloco só com inteiros não garante que o resto do arquivo também seja
+            field = field.with_type(pa.float64())
+        elif pa.types.is_null(field.type):
+            field = field.with_type(pa.string())
+        fields.append(field)
+    return pa.schema(fields)
+
+def _normalize(table):
+    """Aplica COLUMN_TYPES e converte datas para timestamp[ns] sem fuso (UTC)"""
+    fields = []
+    for field in table.schema:
+        if field.name in COLUMN_TYPES:
+            field = field.with_type(COLUMN_TYPES[field.name])
+        elif field.name in DATE_COLUMNS and _is_temporal(field.type):
+            field = field.with_type(pa.timestamp('ns'))
+        fields.append(field)
+    schema = pa.schema(fields)
+    return table if schema.equals(table.schema) else table.cast(schema)
+
+def _is_temporal(arrow_type):
+    return pa.types.is_timestamp(arrow_type) or pa.types.is_date(arrow_type)
@@ -0,0 +1,399 @@
+"""
+Instrumentação do pipeline: logger com níveis e medição de tempo/memória por etapa
+"""
+import contextlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+LOGGER_NAME = 'air_quality'
+
+class _StdoutHandler(logging.StreamHandler):
+    """Handler que escreve sempre no sys.stdout atual (respeita redirecionamentos)"""
+    
+    def __init__(self):
+        super().__init__(sys.stdout)
+    
+    @property
+    def stream(self):
+        return sys.stdout
+    
+    @stream.setter
+    def stream(self, value):
+        pass
+
+def get_logger(name=None):
+    """
+    Logger do projeto (mensagens no mesmo formato dos antigos prints)
+    
+    Args:
+        name (str): Submódulo (ex.: 'cleaning'); None para o logger raiz
+    """
+    root = logging.getLogger(LOGGER_NAME)
+    if not root.handlers:
+        handler = _StdoutHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        root.addHandler(handler)
+        root.setLevel(logging.INFO)
+        root.propagate = False
+    return root.getChild(name) if name else root
+
+def set_log_level(level):
+    """Define o nível do logger do projeto (ex.: 'WARNING' para silenciar)"""
+    get_logger().setLevel(level)
+
+@contextlib.contextmanager
+def quiet(level=logging.WARNING):
+    """Silencia temporariamente as mensagens abaixo de `level` (laços críticos)"""
+    logger = get_logger()
+    previous = logger.level
+    logger.setLevel(level)
+    try:
+        yield
+    finally:
+        logger.setLevel(previous)
+
+def current_rss_mb():
+    """Memória residente atual do processo em MB (None se indisponível)"""
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss / 1024 ** 2
+
+def peak_rss_mb():
+    """Pico de memória residente do processo em MB (None se indisponível)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss é reportado em bytes no macOS e em KB no Linux
+    if sys.platform == 'darwin':
+        return peak / 1024 ** 2
+    return peak / 1024
+
+class Span:
+    """Medição de uma etapa: tempo, linhas de entrada/saída e memória"""
+    
+    def __init__(self, recorder, name, parent, rows_in=None, **attrs):
+        self.recorder = recorder
+        self.name = name
+        self.parent = parent
+        self.depth = parent.depth + 1 if parent else 0
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.attrs = attrs
+        self._tracemalloc_peak = 0
+        self._shared = False
+    
+    def __enter__(self):
+        if self.recorder.tracemalloc:
+            import tracemalloc
+            self.recorder._open_span(self)
+            if self.parent is not None:
+                self.parent._tracemalloc_peak = max(
+                    self.parent._tracemalloc_peak, tracemalloc.get_traced_memory()[1]
+                )
+            tracemalloc.reset_peak()
+            self._tracemalloc_start = tracemalloc.get_traced_memory()[0]
+        
+        self._rss_start = current_rss_mb()
+        self._peak_start = peak_rss_mb()
+        self._wall_start = time.time()
+        self._start = time.perf_counter()
+        self.recorder._stack.append(self)
+        return self
+    
+    def set(self, **attrs):
+        """Atributos conhecidos só durante a etapa, exportados junto com a medição"""
+        self.attrs.update(attrs)
+    
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self._start
+        self.recorder._stack.pop()
+        
+        rss_end = current_rss_mb()
+        peak_end = peak_rss_mb()
+        record = {
+            'name': self.name,
+            'parent': self.parent.name if self.parent else None,
+            'depth': self.depth,
+            'start': round(self._wall_start, 6),
+            'seconds': round(seconds, 6),
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+            'rss_start_mb': _round(self._rss_start),
+            'rss_end_mb': _round(rss_end),
+            'peak_rss_delta_mb': _round(
+                peak_end - self._peak_start if peak_end is not None else None
+            ),
+            'error': exc_type.__name__ if exc_type else None
+        }
+        
+        if self.recorder.tracemalloc:
+            import tracemalloc
+            self.recorder._close_span(self)
+            peak = max(self._tracemalloc_peak, tracemalloc.get_traced_memory()[1])
+            # O pico do tracemalloc é do processo: com spans abertos em outras
+            # threads ao mesmo tempo, ele mistura as etapas e não é reportado
+            record['tracemalloc_peak_mb'] = (
+                None if self._shared else _round((peak - self._tracemalloc_start) / 1024 ** 2)
+            )
+            if self.parent is not None:
+                self.parent._tracemalloc_peak = max(self.parent._tracemalloc_peak, peak)
+        
+        record.update(self.attrs)
+        self.recorder.records.append(record)
+        return False
+
+class _NullSpan:
+    """Span sem custo usado quando a instrumentação está desativada"""
+    
+    rows_in = rows_out = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        return False
+    
+    def set(self, **attrs):
+        pass
+    
+    def __setattr__(self, name, value):
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+class Recorder:
+    """Coleta os registros dos spans e opcionalmente cProfile/tracemalloc"""
+    
+    def __init__(self, tracemalloc=False, cprofile=False):
+        self.tracemalloc = tracemalloc
+        self.records = []
+        # Pilha de spans abertos por thread (etapas do grafo rodam em paralelo)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._open_spans = set()
+        self._profiler = None
+        self._thread_profilers = []
+        
+        if tracemalloc:
+            import tracemalloc as _tracemalloc
+            _tracemalloc.start()
+        if cprofile:
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+    
+    @property
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+    
+    def _open_span(self, span):
+        """Registra o span aberto; spans abertos ao mesmo tempo em threads diferentes são marcados"""
+        span._thread = threading.get_ident()
+        with self._lock:
+            self._open_spans.add(span)
+            if len({other._thread for other in self._open_spans}) > 1:
+                for other in self._open_spans:
+                    other._shared = True
+    
+    def _close_span(self, span):
+        with self._lock:
+            self._open_spans.discard(span)
+    
+    @contextlib.contextmanager
+    def profile_thread(self):
+        """
+        cProfile da thread atual, somado ao do Recorder no relatório
+        
+        O perfilador do Recorder só vê a thread que o criou; cada thread de
+        trabalho (ex.: etapas do grafo) usa o seu.
+        """
+        if self._profiler is None:
+            yield
+            return
+        import cProfile
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Python >= 3.12: um único perfilador por processo, já ativo
+            yield
+            return
+        try:
+            yield
+        finally:
+            profiler.disable()
+            with self._lock:
+                self._thread_profilers.append(profiler)
+    
+    def stop(self):
+        """Encerra as capturas opcionais"""
+        if self._profiler is not None:
+            self._profiler.disable()
+        if self.tracemalloc:
+            import tracemalloc
+            tracemalloc.stop()
+    
+    def export_jsonl(self, path):
+        """Grava um registro JSON por linha"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            for record in self.records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        return path
+    
+    def export_cprofile(self, path):
+        """Grava as estatísticas do cProfile (abrir com pstats ou snakeviz)"""
+        if self._profiler is None:
+            return None
+        self._cprofile_stats().dump_stats(path)
+        return path
+    
+    def cprofile_top(self, limit=15):
+        """Funções com maior tempo acumulado segundo o cProfile"""
+        if self._profiler is None:
+            return ''
+        import io
+        output = io.StringIO()
+        stats = self._cprofile_stats()
+        stats.stream = output
+        stats.sort_stats('cumulative').print_stats(limit)
+        return output.getvalue()
+    
+    def _cprofile_stats(self):
+        """Estatísticas do perfilador principal somadas às das threads de trabalho"""
+        import pstats
+        stats = pstats.Stats(self._profiler)
+        for profiler in self._thread_profilers:
+            stats.add(profiler)
+        return stats
+    
+    def summary_table(self):
+        """Tabela com tempo, linhas e memória agregados por etapa"""
+        totals = {}
+        # Registros são gravados ao fim de cada span; a tabela segue a ordem de início
+        for record in sorted(self.records, key=lambda r: r['start']):
+            entry = totals.setdefault(record['name'], {
+                'depth': record['depth'], 'calls': 0, 'seconds': 0.0,
+                'rows_in': None, 'rows_out': None, 'peak_rss_delta_mb': 0.0, 'rss_end_mb': None
+            })
+            entry['calls'] += 1
+            entry['seconds'] += record['seconds']
+            for key in ('rows_in', 'rows_out'):
+                if record[key] is not None:
+                    entry[key] = (entry[key] or 0) + record[key]
+            entry['peak_rss_delta_mb'] += record['peak_rss_delta_mb'] or 0
+            entry['rss_end_mb'] = record['rss_end_mb']
+        
+        lines = [
+            f"{'Etapa':<40}{'Chamadas':>9}{'Tempo (s)':>11}{'Linhas in':>13}"
+            f"{'Linhas out':>13}{'ΔPico RSS':>11}{'RSS (MB)':>10}"
+        ]
+        for name, entry in totals.items():
+            label = '  ' * entry['depth'] + name
+            lines.append(
+                f"{label:<40}{entry['calls']:>9}{entry['seconds']:>11.3f}"
+                f"{_format_rows(entry['rows_in']):>13}{_format_rows(entry['rows_out']):>13}"
+                f"{entry['peak_rss_delta_mb']:>11.1f}{entry['rss_end_mb'] or 0:>10.1f}"
+            )
+        return '\n'.join(lines)
+
+_recorder = None
+
+def enable(tracemalloc=False, cprofile=False):
+    """Ativa a instrumentação global e retorna o Recorder"""
+    global _recorder
+    _recorder = Recorder(tracemalloc=tracemalloc, cprofile=cprofile)
+    return _recorder
+
+def disable():
+    """Desativa a instrumentação e retorna o Recorder encerrado"""
+    global _recorder
+    recorder, _recorder = _recorder, None
+    if recorder is not None:
+        recorder.stop()
+    return recorder
+
+def span(name, rows_in=None, **attrs):
+    """
+    Mede uma etapa (use com `with`); sem custo se a instrumentação estiver desligada
+    
+    Exemplo:
+        with span('clean.remove_duplicates', rows_in=len(df)) as s:
+            df = df.drop_duplicates()
+            s.rows_out = len(df)
+    """
+    if _recorder is None:
+        return _NULL_SPAN
+    parent = _recorder._stack[-1] if _recorder._stack else None
+    return Span(_recorder, name, parent, rows_in=rows_in, **attrs)
+
+def profile_thread():
+    """cProfile da thread atual (use com `with` no corpo de threads de trabalho)"""
+    if _recorder is None:
+        return contextlib.nullcontext()
+    return _recorder.profile_thread()
+
+def child_options():
+    """Opções da instrumentação a repassar a um processo filho (None se desligada)"""
+    if _recorder is None:
+        return None
+    return {'tracemalloc': _recorder.tracemalloc}
+
+def run_recorded(options, func, *args):
+    """
+    Executa func(*args) em um processo filho, medindo os spans dele
+    
+    Os spans de um processo do pool não chegam ao Recorder do pai; esta
+    função os devolve junto com o resultado para merge_records.
+    
+    Exemplo:
+        future = pool.submit(run_recorded, child_options(), clean, batch)
+        result, records = future.result()
+        merge_records(records)
+    
+    Returns:
+        tuple: (resultado, registros dos spans do filho)
+    """
+    if options is None:
+        return func(*args), []
+    recorder = enable(**options)
+    try:
+        result = func(*args)
+    finally:
+        disable()
+    return result, recorder.records
+
+def merge_records(records):
+    """Acrescenta registros de um processo filho sob o span aberto nesta thread"""
+    if _recorder is None or not records:
+        return
+    parent = _recorder._stack[-1] if _recorder._stack else None
+    for record in records:
+        if parent is not None:
+            record['parent'] = record['parent'] or parent.name
+            record['depth'] += parent.depth + 1
+    with _recorder._lock:
+        _recorder.records.extend(records)
+
+def _round(value, digits=2):
+    return round(value, digits) if value is not None else None
+
+def _format_rows(value):
+    return f"{value:,}" if value is not None else '-'
@@ -0,0 +1,292 @@
+"""
+Detecção vetorizada de leituras inválidas por (cidade, poluente): limites físicos, picos e sensores travados
+"""
+import contextlib
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .instrumentation import get_logger, span
+except ImportError:
+    from instrumentation import get_logger, span
+
+logger = get_logger('outliers')
+
+CANONICAL_UNIT = 'µg/m³'
+
+# Grafias encontradas nos dados (comparadas em minúsculas, com 'μ' grego trocado por 'µ')
+UNIT_ALIASES = {
+    'µg/m³': 'µg/m³', 'µg/m3': 'µg/m³', 'ug/m³': 'µg/m³', 'ug/m3': 'µg/m³',
+    'mg/m³': 'mg/m³', 'mg/m3': 'mg/m³',
+    'ppb': 'ppb', 'ppm': 'ppm'
+}
+
+# µg/m³ por ppb a 25 °C e 1 atm (os mesmos fatores usados no AQI)
+PPB_TO_UGM3 = {'O3': 1.962, 'NO2': 1.88, 'SO2': 2.62, 'CO': 1.145}
+
+# Faixa fisicamente plausível em µg/m³; acima disso só falhas de sensor
+PHYSICAL_BOUNDS = {
+    'PM25': (0.0, 1000.0),
+    'PM10': (0.0, 2000.0),
+    'O3': (0.0, 1000.0),
+    'NO2': (0.0, 2000.0),
+    'SO2': (0.0, 3000.0),
+    'CO': (0.0, 100000.0)
+}
+DEFAULT_BOUNDS = (0.0, np.inf)
+
+# Bit de cada detector na coluna outlier_flags
+FLAGS = {'bounds': 1, 'spike': 2, 'flat': 4}
+DETECTORS = tuple(FLAGS)
+
+class OutlierDetector:
+    """
+    Normalização de unidades e detectores de leituras inválidas
+    
+    Os detectores rodam sobre todos os grupos de uma vez: as linhas são
+    ordenadas por (grupo, data) e cada grupo é tratado como um trecho
+    contíguo do mesmo vetor, sem laços Python por grupo.
+    
+    - bounds: valor fora de PHYSICAL_BOUNDS (ex.: concentrações negativas)
+    - spike: escore z robusto |0,6745 (x - mediana) / MAD| acima do limite,
+      com mediana e MAD em janela móvel centrada (filtro de Hampel)
+    - flat: sensor travado, com flat_run ou mais leituras iguais seguidas
+      (a primeira leitura da sequência é mantida)
+    
+    Leituras fora dos limites físicos não entram nas janelas dos demais
+    detectores. Nas pontas de cada grupo a janela é completada com o reflexo
+    dos valores vizinhos; em lotes incrementais, as janelas não veem o lote
+    anterior.
+    """
+    
+    def __init__(self, detectors=DETECTORS, bounds=None, window=49, threshold=5.0,
+                 min_periods=7, flat_run=12, normalize_units=True, action='drop'):
+        """
+        Args:
+            detectors (tuple): Detectores ativos (subconjunto de DETECTORS)
+            bounds (dict): {poluente: (mínimo, máximo)} em µg/m³, sobre
+                PHYSICAL_BOUNDS
+            window (int): Leituras na janela da mediana móvel (ímpar)
+            threshold (float): Escore z robusto a partir do qual a leitura é um pico
+            min_periods (int): Grupos com menos leituras válidas não passam
+                pelo detector de picos
+            flat_run (int): Leituras iguais seguidas que caracterizam sensor travado
+            normalize_units (bool): Converter ppb, ppm e mg/m³ para µg/m³
+            action (str): 'drop' remove as linhas marcadas; 'flag' as mantém
+                com a máscara de bits em outlier_flags
+        """
+        unknown = set(detectors) - set(FLAGS)
+        if unknown:
+            raise ValueError(f"Detectores desconhecidos: {sorted(unknown)}")
+        if action not in ('drop', 'flag'):
+            raise ValueError(f"Ação desconhecida: {action}")
+        
+        self.detectors = tuple(detectors)
+        self.bounds = {**PHYSICAL_BOUNDS, **{_parameter_key(k): v for k, v in (bounds or {}).items()}}
+        self.window = window
+        self.threshold = threshold
+        self.min_periods = min_periods
+        self.flat_run = flat_run
+        self.normalize = normalize_units
+        self.action = action
+        self.stats = {}
+    
+    def normalize_units(self, df):
+        """
+        Converte os valores para µg/m³ (modifica df)
+        
+        Os fatores são calculados uma vez por par (poluente, unidade)
+        distinto. Unidades desconhecidas (ou ppm de particulados) ficam
+        como estão e são contadas em stats['units']['unknown'].
+        
+        Returns:
+            int: Linhas convertidas
+        """
+        if not {'parameter', 'unit', 'value'} <= set(df.columns):
+            return 0
+        
+        with self._measure('units', len(df)):
+            parameter_codes, parameters = pd.factorize(df['parameter'])
+            unit_codes, units = pd.factorize(df['unit'])
+            
+            # Linha e coluna extras para códigos -1 (poluente ou unidade ausente)
+            factors = np.ones((len(parameters) + 1, len(units) + 1))
+            labels = np.empty((len(parameters) + 1, len(units) + 1), dtype=object)
+            labels[:] = None
+            for i, parameter in enumerate(parameters):
+                for j, unit in enumerate(units):
+                    factors[i, j] = _unit_factor(parameter, unit)
+                    labels[i, j] = CANONICAL_UNIT if not np.isnan(factors[i, j]) else unit
+            
+            row_factors = factors[parameter_codes, unit_codes]
+            converted = ~np.isnan(row_factors) & (row_factors != 1)
+            if converted.any():
+                values = df['value'].to_numpy(dtype='float64', na_value=np.nan)
+                df['value'] = np.where(converted, values * row_factors, values)
+            
+            # Reescreve a coluna só se alguma grafia mudou
+            if any(labels[i, j] != unit for i in range(len(parameters)) for j, unit in enumerate(units)):
+                categories = pd.unique(labels[:-1, :-1].ravel())
+                categories = categories[pd.notna(categories)]
+                label_codes = pd.Index(categories).get_indexer(labels.ravel()).reshape(labels.shape)
+                df['unit'] = pd.Categorical.from_codes(
+                    label_codes[parameter_codes, unit_codes], categories=categories
+                )
+        
+        entry = self._entry('units')
+        entry['rows'] += int(converted.sum())
+        entry['unknown'] = entry.get('unknown', 0) + int(np.isnan(row_factors).sum())
+        return int(converted.sum())
+    
+    def detect(self, df):
+        """
+        Máscara de bits (FLAGS) das leituras inválidas de cada linha
+        
+        Args:
+            df (pd.DataFrame): Dados com value e, se existirem, date, city e parameter
+        
+        Returns:
+            np.ndarray: uint8 por linha (0 = leitura válida)
+        """
+        values = df['value'].to_numpy(dtype='float64', na_value=np.nan)
+        flags = np.zeros(len(df), dtype=np.uint8)
+        
+        if 'bounds' in self.detectors:
+            with self._measure('bounds', len(df)):
+                low, high = self._row_bounds(df)
+                out_of_bounds = (values < low) | (values > high)
+                flags[out_of_bounds] |= FLAGS['bounds']
+                self._entry('bounds')['rows'] += int(out_of_bounds.sum())
+        
+        sequence_detectors = [name for name in ('spike', 'flat') if name in self.detectors]
+        if not sequence_detectors:
+            return flags
+        
+        # Leituras válidas ordenadas por (grupo, data): cada grupo vira um trecho contíguo
+        keys = [col for col in ('city', 'parameter') if col in df.columns]
+        groups = (
+            df.groupby(keys, observed=True, sort=False).ngroup().to_numpy()
+            if keys else np.zeros(len(df), dtype=np.int64)
+        )
+        rows = np.flatnonzero(~np.isnan(values) & (flags == 0) & (groups >= 0))
+        dates = (
+            df['date'].to_numpy(dtype='datetime64[ns]')[rows].view('int64')
+            if 'date' in df.columns else rows
+        )
+        order = np.lexsort((dates, groups[rows]))
+        rows = rows[order]
+        x = values[rows]
+        codes = groups[rows]
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if len(rows) else np.empty(0, int)
+        sizes = np.diff(np.r_[starts, len(rows)])
+        
+        if 'spike' in self.detectors:
+            with self._measure('spike', len(rows)):
+                spikes = _hampel(x, starts, sizes, self.window, self.threshold, self.min_periods)
+                flags[rows[spikes]] |= FLAGS['spike']
+                self._entry('spike')['rows'] += int(spikes.sum())
+        
+        if 'flat' in self.detectors:
+            with self._measure('flat', len(rows)):
+                flat = _flat_runs(x, codes, self.flat_run)
+                flags[rows[flat]] |= FLAGS['flat']
+                self._entry('flat')['rows'] += int(flat.sum())
+        
+        return flags
+    
+    def summary(self):
+        """Linhas marcadas e tempo de cada detector, para o log"""
+        return [
+            f"{name}: {entry['rows']:,} linhas em {entry['seconds']:.3f}s"
+            + (f" ({entry['unknown']:,} com unidade desconhecida)" if entry.get('unknown') else '')
+            for name, entry in self.stats.items()
+        ]
+    
+    def _row_bounds(self, df):
+        """Limites (mínimo, máximo) de cada linha, pelo poluente"""
+        if 'parameter' not in df.columns:
+            return DEFAULT_BOUNDS
+        codes, parameters = pd.factorize(df['parameter'])
+        table = np.array(
+            [self.bounds.get(_parameter_key(p), DEFAULT_BOUNDS) for p in parameters] + [DEFAULT_BOUNDS]
+        )
+        return table[codes, 0], table[codes, 1]
+    
+    def _entry(self, name):
+        return self.stats.setdefault(name, {'rows': 0, 'seconds': 0.0})
+    
+    @contextlib.contextmanager
+    def _measure(self, name, rows_in):
+        """Span do detector, acumulando o tempo em stats"""
+        entry = self._entry(name)
+        start = time.perf_counter()
+        with span(f'clean.outliers.{name}', rows_in=rows_in) as s:
+            yield s
+        entry['seconds'] += time.perf_counter() - start
+
+def _hampel(x, starts, sizes, window, threshold, min_periods):
+    """Picos pelo filtro de Hampel (mediana e MAD móveis por grupo)"""
+    median = _grouped_median_filter(x, starts, sizes, window)
+    deviation = np.abs(x - median)
+    mad = _grouped_median_filter(deviation, starts, sizes, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        spikes = (0.6745 * deviation > threshold * mad) & (mad > 0)
+    # Grupos curtos demais não têm janela representativa
+    return spikes & np.repeat(sizes >= min_periods, sizes)
+
+def _grouped_median_filter(x, starts, sizes, window):
+    """
+    Mediana móvel centrada de cada grupo contíguo em uma única chamada
+    
+    Cada grupo é estendido nas duas pontas com o reflexo dos próprios
+    valores (borda 'mirror'), de modo que nenhuma janela mistura grupos
+    vizinhos e as janelas das bordas mantêm a dispersão do grupo.
+    """
+    from scipy.ndimage import median_filter
+    
+    if not len(x):
+        return x.copy()
+    half = window // 2
+    offsets = np.arange(half)
+    blocks = np.cumsum(sizes + 2 * half) - (sizes + 2 * half)
+    
+    # Índice em x de cada posição do vetor estendido: reflexo, grupo, reflexo
+    index = np.empty(len(x) + 2 * half * len(sizes), dtype=np.int64)
+    group_of_row = np.repeat(np.arange(len(sizes)), sizes)
+    body = np.arange(len(x)) + 2 * half * group_of_row + half
+    index[body] = np.arange(len(x))
+    index[(blocks[:, None] + offsets).ravel()] = (
+        starts[:, None] + np.minimum(half - offsets, sizes[:, None] - 1)
+    ).ravel()
+    index[(blocks[:, None] + half + sizes[:, None] + offsets).ravel()] = (
+        starts[:, None] + np.maximum(sizes[:, None] - 2 - offsets, 0)
+    ).ravel()
+    
+    filtered = median_filter(x[index], size=2 * half + 1, mode='mirror')
+    return filtered[body]
+
+def _flat_runs(x, codes, min_run):
+    """Leituras repetidas em sequências de min_run ou mais (exceto a primeira)"""
+    if not len(x):
+        return np.zeros(0, dtype=bool)
+    new_run = np.r_[True, (x[1:] != x[:-1]) | (codes[1:] != codes[:-1])]
+    run_ids = np.cumsum(new_run) - 1
+    return (np.bincount(run_ids)[run_ids] >= min_run) & ~new_run
+
+def _parameter_key(parameter):
+    """'PM2.5', 'pm25' e 'pm2.5' -> 'PM25'"""
+    return str(parameter).upper().replace('.', '').replace('_', '').strip()
+
+def _unit_factor(parameter, unit):
+    """Fator para µg/m³ (NaN se a conversão não for conhecida)"""
+    unit = UNIT_ALIASES.get(str(unit).strip().lower().replace('μ', 'µ'))
+    if unit == 'µg/m³':
+        return 1.0
+    if unit == 'mg/m³':
+        return 1000.0
+    ppb = PPB_TO_UGM3.get(_parameter_key(parameter))
+    if ppb is None or unit not in ('ppb', 'ppm'):
+        return np.nan
+    return ppb if unit == 'ppb' else ppb * 1000
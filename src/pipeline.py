@@ -4,68 +4,483 @@ Pipeline completo do projeto
 import pandas as pd
 import numpy as np
 from datetime import datetime
+from functools import partial
 import sys
 import os
 
-def run_full_pipeline():
-    """Executa o pipeline completo"""
+try:
+    from . import (aqi, data_cleaning, data_collection, dedup, imputation, outliers, rollups,
+                   snapshot, stations, storage, writers)
+    from .aqi import AQI_DIR, compute_aqi, merge_aqi, update_aqi, write_aqi
+    from .cache import StageCache
+    from .dag import StageGraph
+    from .dedup import IDENTITY_KEY, KEY_INDEX_FILE, Deduplicator, KeyIndex, hash_keys
+    from .imputation import IMPUTATION_DIR, ImputationState, Imputer
+    from .incremental import IncrementalState
+    from .instrumentation import get_logger, span
+    from .query import get_backend
+    from .rollups import ROLLUP_DIR, build_rollups, concat_rollups, update_rollups, write_rollups
+    from .snapshot import SNAPSHOT_DIR, STAMP_FILE, append_snapshot, write_snapshot
+    from .stations import STATIONS_FILE, StationRegistry, update_stations
+    from .storage import DATASET_DIR, MANIFEST_FILE, DatasetWriter, append_partitioned, read_dataset
+    from .writers import output_paths, write_outputs
+except ImportError:
+    import aqi
+    import data_cleaning
+    import data_collection
+    import dedup
+    import imputation
+    import outliers
+    import rollups
+    import snapshot
+    import stations
+    import storage
+    import writers
+    from aqi import AQI_DIR, compute_aqi, merge_aqi, update_aqi, write_aqi
+    from cache import StageCache
+    from dag import StageGraph
+    from dedup import IDENTITY_KEY, KEY_INDEX_FILE, Deduplicator, KeyIndex, hash_keys
+    from imputation import IMPUTATION_DIR, ImputationState, Imputer
+    from incremental import IncrementalState
+    from instrumentation import get_logger, span
+    from query import get_backend
+    from rollups import ROLLUP_DIR, build_rollups, concat_rollups, update_rollups, write_rollups
+    from snapshot import SNAPSHOT_DIR, STAMP_FILE, append_snapshot, write_snapshot
+    from stations import STATIONS_FILE, StationRegistry, update_stations
+    from storage import DATASET_DIR, MANIFEST_FILE, DatasetWriter, append_partitioned, read_dataset
+    from writers import output_paths, write_outputs
+
+logger = get_logger('pipeline')
+
+PROCESSED_DIR = 'data/processed'
+# Marcas d'água do modo incremental, gravadas também pelo pipeline completo
+WATERMARKS_FILE = 'watermarks.json'
+
+def run_full_pipeline(use_cache=True, cache_dir='data/cache', cleaning_options=None,
+                      incremental=False, workers=1, collector_options=None, output_formats=(),
+                      query_backend=None, cities_per_batch=1, stage_options=None):
+    """
+    Executa o pipeline completo
     
-    print("🚀 INICIANDO PIPELINE COMPLETO")
-    print("=" * 60)
+    Coleta, limpeza e gravação formam um grafo de etapas (dag.StageGraph)
+    que processa lotes de cidades inteiras: enquanto um lote é limpo, o
+    seguinte já está sendo coletado e o anterior gravado no dataset e
+    nos agregados. As filas entre as etapas são limitadas, então uma
+    etapa lenta segura as anteriores em vez de acumular lotes. Como cada
+    (cidade, poluente) fica inteiro em um lote, o resultado é idêntico
+    ao do processamento do dataset inteiro de uma vez.
     
-    # 1. Coleta
-    print("\n📥 FASE 1: COLETA DE DADOS")
-    from data_collection import DataCollector
-    collector = DataCollector()
-    raw_data = collector.get_data(use_sample=True)
-    print(f"✅ Dados brutos: {len(raw_data):,} registros")
+    Args:
+        use_cache (bool): Pular etapas cujas entradas não mudaram,
+            reutilizando os artefatos Parquet do cache
+        cache_dir (str): Diretório do cache de etapas
+        cleaning_options (dict): Opções repassadas ao DataCleaner
+        incremental (bool): Processar apenas as linhas novas (ver
+            run_incremental_pipeline)
+        workers (int): Lotes limpos ao mesmo tempo, cada um em um
+            processo (1 = limpeza na thread da própria etapa)
+        collector_options (dict): Opções do gerador de dados de exemplo
+            (ver DataCollector.download_sample_data)
+        output_formats (tuple): Exportações adicionais de cleaned_data
+            ('parquet', 'feather', 'csv'); o dataset particionado e os
+            agregados são sempre gravados
+        query_backend (str): Backend das análises ('pandas' ou 'duckdb';
+            padrão: $AQ_QUERY_BACKEND ou pandas)
+        cities_per_batch (int): Cidades por lote do grafo
+        stage_options (dict): Opções por etapa do grafo (ver dag.Stage),
+            ex.: {'clean': {'workers': 4, 'queue_size': 4}}
+    """
+    if incremental:
+        return run_incremental_pipeline(cleaning_options=cleaning_options)
     
-    # 2. Limpeza
-    print("\n🧹 FASE 2: LIMPEZA DE DADOS")
-    from data_cleaning import clean_air_quality_data
-    cleaned_data = clean_air_quality_data(raw_data, save_path='data/processed/')
-    print(f"✅ Dados limpos: {len(cleaned_data):,} registros")
+    logger.info("🚀 INICIANDO PIPELINE COMPLETO")
+    logger.info("=" * 60)
     
-    # 3. Análise básica
-    print("\n📊 FASE 3: ANÁLISE BÁSICA")
+    cache = StageCache(cache_dir, enabled=use_cache)
+    cleaning_options = cleaning_options or {}
+    collector_options = collector_options or {}
+    stage_options = stage_options or {}
+    collector = data_collection.DataCollector()
     
-    # Estatísticas
-    stats = cleaned_data.groupby(['city', 'parameter'])['value'].agg([
-        'count', 'mean', 'std', 'min', 'max'
-    ]).round(2)
+    # Impressões digitais: configuração da coleta, opções de limpeza e o
+    # código-fonte de todos os módulos que cada etapa executa
+    collect_key = StageCache.fingerprint(
+        params={
+            'use_sample': True,
+            'cities': collector.cities,
+            'pollutants': collector.pollutants,
+            'start_date': collector.start_date,
+            'end_date': collector.end_date,
+            'sample_options': collector_options
+        },
+        files=[data_collection.__file__],
+        hash_contents=True
+    )
+    clean_key = StageCache.fingerprint(
+        params=cleaning_options,
+        files=[module.__file__ for module in (data_cleaning, dedup, imputation, outliers)],
+        parent=collect_key,
+        hash_contents=True
+    )
     
-    print("Estatísticas por cidade e poluente:")
-    print(stats.head(10))
+    summary_path = 'data/processed/summary.txt'
+    export_base = 'data/processed/cleaned_data'
+    outputs = output_paths(export_base, output_formats) + [
+        os.path.join(DATASET_DIR, MANIFEST_FILE),
+        os.path.join(ROLLUP_DIR, 'aggregates.parquet'),
+        os.path.join(AQI_DIR, 'daily.parquet'),
+        STATIONS_FILE,
+        os.path.join(SNAPSHOT_DIR, STAMP_FILE),
+        summary_path
+    ]
+    outputs_key = StageCache.fingerprint(
+        params={'output_formats': list(output_formats)},
+        files=[__file__] + [
+            module.__file__ for module in (storage, rollups, aqi, stations, snapshot, writers)
+        ],
+        parent=clean_key,
+        hash_contents=True
+    )
     
-    # 4. Salvar resultados
-    print("\n💾 FASE 4: SALVANDO RESULTADOS")
+    # 1. Coleta, limpeza e gravação em lotes
+    logger.info("\n📥 FASE 1: COLETA, LIMPEZA E GRAVAÇÃO EM LOTES")
+    cleaned_data = cache.load('clean', clean_key)
+    raw_data = None
+    outputs_current = cleaned_data is not None and cache.is_current('outputs', outputs_key)
+    if cleaned_data is not None:
+        logger.info("⏭️  Coleta e limpeza inalteradas: usando dados limpos do cache")
+    else:
+        raw_data = cache.load('collect', collect_key)
+        if raw_data is not None:
+            logger.info("⏭️  Coleta inalterada: usando dados brutos do cache")
     
-    # Salvar em Parquet (mais eficiente)
-    final_path = 'data/processed/final_dataset.parquet'
-    cleaned_data.to_parquet(final_path, index=False)
-    print(f"✅ Dataset final: {final_path}")
+    batch_outputs = None
+    if not outputs_current:
+        def options(name, **defaults):
+            return {**defaults, **stage_options.get(name, {})}
+        
+        graph = StageGraph('pipeline')
+        collected = []
+        if cleaned_data is not None:
+            graph.add('cache', partial(data_collection.city_batches, cleaned_data, cities_per_batch),
+                      **options('cache'))
+            upstream = 'cache'
+        else:
+            if raw_data is not None:
+                graph.add('cache', partial(data_collection.city_batches, raw_data, cities_per_batch),
+                          **options('cache'))
+            else:
+                graph.add('collect', partial(_collect_batches, collector, cities_per_batch,
+                                             collector_options, collected), **options('collect'))
+            graph.add('clean', partial(_clean_batch, options=cleaning_options),
+                      after='cache' if raw_data is not None else 'collect',
+                      **options('clean', workers=workers, processes=workers > 1))
+            upstream = 'clean'
+        
+        batch_outputs = _BatchOutputs()
+        for name, sink in batch_outputs.stages().items():
+            graph.add(name, sink, after=upstream, **options(name))
+        
+        with span('pipeline.dag', workers=workers, cities_per_batch=cities_per_batch) as s:
+            graph.run()
+            s.rows_out = batch_outputs.rows
+        
+        if collected:
+            raw_data = _concat(collected)
+            cache.save('collect', collect_key, raw_data)
+        if raw_data is not None:
+            logger.info(f"✅ Dados brutos: {len(raw_data):,} registros")
+            cleaned_data = batch_outputs.cleaned()
+            cache.save('clean', clean_key, cleaned_data)
+    logger.info(f"✅ Dados limpos: {len(cleaned_data):,} registros")
     
-    # Sumário
-    summary_path = 'data/processed/summary.txt'
-    with open(summary_path, 'w') as f:
-        f.write(f"RESUMO DO PROJETO\n")
-        f.write(f"Gerado: {datetime.now()}\n")
-        f.write(f"Total registros: {len(cleaned_data):,}\n")
-        f.write(f"Cidades: {cleaned_data['city'].nunique()}\n")
-        f.write(f"Poluentes: {', '.join(cleaned_data['parameter'].unique())}\n")
-        f.write(f"Período: {cleaned_data['date'].min()} a {cleaned_data['date'].max()}\n")
+    # 2. Análise básica
+    logger.info("\n📊 FASE 2: ANÁLISE BÁSICA")
+    
+    # Estatísticas
+    with span('pipeline.analyze', rows_in=len(cleaned_data)):
+        query = get_backend(query_backend, source=cleaned_data)
+        stats = query.aggregate(
+            ['city', 'parameter'], funcs=('count', 'mean', 'std', 'min', 'max')
+        ).set_index(['city', 'parameter']).round(2)
+    
+    logger.info(f"Estatísticas por cidade e poluente:\n{stats.head(10).to_string()}")
+    
+    # 3. Salvar resultados
+    logger.info("\n💾 FASE 3: SALVANDO RESULTADOS")
     
-    print(f"✅ Sumário: {summary_path}")
+    if outputs_current:
+        logger.info("⏭️  Resultados inalterados desde a última execução")
+    else:
+        # Exportações opcionais, cada formato gravado uma única vez
+        if output_formats:
+            with span('pipeline.write_exports', rows_in=len(cleaned_data)):
+                for path in write_outputs(cleaned_data, export_base, formats=output_formats):
+                    logger.info(f"✅ Exportação: {path}")
+        
+        # Dataset particionado (parameter/year/city), agregados, AQI e
+        # estações já foram calculados lote a lote; aqui só são publicados
+        with span('pipeline.publish', rows_in=len(cleaned_data)):
+            manifest, registry = batch_outputs.publish()
+        logger.info(f"✅ Dataset final: {DATASET_DIR} ({len(manifest['files'])} partições)")
+        logger.info(f"✅ Agregados: {ROLLUP_DIR}")
+        logger.info(f"✅ AQI diário: {AQI_DIR}")
+        logger.info(f"✅ Estações: {STATIONS_FILE} ({len(registry)} estações)")
+        logger.info(f"✅ Estado incremental: marcas d'água, chaves e imputação em {PROCESSED_DIR}")
+        
+        # Snapshot Arrow mapeado em memória pelo dashboard
+        with span('pipeline.snapshot', rows_in=len(cleaned_data)):
+            version = write_snapshot(cleaned_data, SNAPSHOT_DIR)
+        logger.info(f"✅ Snapshot do dashboard: {SNAPSHOT_DIR} (versão {version})")
+        
+        # Sumário
+        with open(summary_path, 'w') as f:
+            f.write(f"RESUMO DO PROJETO\n")
+            f.write(f"Gerado: {datetime.now()}\n")
+            f.write(f"Total registros: {len(cleaned_data):,}\n")
+            f.write(f"Cidades: {cleaned_data['city'].nunique()}\n")
+            f.write(f"Poluentes: {', '.join(cleaned_data['parameter'].unique())}\n")
+            f.write(f"Período: {cleaned_data['date'].min()} a {cleaned_data['date'].max()}\n")
+        
+        logger.info(f"✅ Sumário: {summary_path}")
+        cache.record('outputs', outputs_key, outputs)
     
-    print("\n" + "=" * 60)
-    print("🎉 PIPELINE CONCLUÍDO!")
-    print("=" * 60)
+    logger.info("\n" + "=" * 60)
+    logger.info("🎉 PIPELINE CONCLUÍDO!")
+    logger.info("=" * 60)
     
-    print("\n📋 PRÓXIMOS PASSOS:")
-    print("1. Dashboard: streamlit run src/dashboard.py")
-    print("2. Notebook: jupyter notebook notebooks/")
+    logger.info("\n📋 PRÓXIMOS PASSOS:")
+    logger.info("1. Dashboard: streamlit run src/dashboard.py")
+    logger.info("2. Notebook: jupyter notebook notebooks/")
     
     return cleaned_data
 
+class _BatchOutputs:
+    """
+    Saídas do pipeline completo calculadas lote a lote
+    
+    Cada lote traz cidades inteiras, então agregados, AQI e estações de
+    lotes diferentes se combinam sem sobreposição. Cada etapa final do
+    grafo roda em uma única thread e só mexe no próprio acumulador.
+    
+    O estado do modo incremental (marcas d'água, índice de chaves e
+    contexto da imputação) também é montado a partir das linhas
+    publicadas, de modo que run_incremental_pipeline continua o dataset.
+    """
+    
+    def __init__(self, processed_dir=PROCESSED_DIR):
+        self.processed_dir = processed_dir
+        self.frames = []
+        self.dataset = DatasetWriter(DATASET_DIR)
+        self.rollups = []
+        self.aqi = []
+        self.registry = None
+        self.watermarks = []
+        self.keys = []
+        self.imputer = Imputer(state=ImputationState(os.path.join(processed_dir, IMPUTATION_DIR)))
+    
+    @property
+    def rows(self):
+        return sum(len(df) for df in self.frames)
+    
+    def stages(self):
+        """Etapas finais do grafo: nome -> função aplicada a cada lote limpo"""
+        return {
+            'gather': self.frames.append,
+            'write_dataset': self.dataset.append,
+            'rollups': self._add_rollups,
+            'aqi': self._add_aqi,
+            'stations': self._add_stations,
+            'incremental_state': self._add_incremental_state
+        }
+    
+    def cleaned(self):
+        """Dados limpos de todos os lotes, na ordem original das linhas"""
+        if not self.frames:
+            raise ValueError("Nenhum dado restante!")
+        return _concat(self.frames)
+    
+    def publish(self):
+        """Troca o dataset e grava agregados, AQI, estações e o estado incremental"""
+        manifest = self.dataset.commit()
+        write_rollups(concat_rollups(self.rollups), ROLLUP_DIR)
+        write_aqi(merge_aqi(self.aqi), AQI_DIR)
+        self.registry.save(STATIONS_FILE)
+        self._save_incremental_state()
+        return manifest, self.registry
+    
+    def _add_rollups(self, df):
+        self.rollups.append(build_rollups(df))
+    
+    def _add_aqi(self, df):
+        self.aqi.append(compute_aqi(df))
+    
+    def _add_stations(self, df):
+        self.registry = StationRegistry.from_frame(df) if self.registry is None else self.registry.update(df)
+    
+    def _add_incremental_state(self, df):
+        # O lote limpo não distingue valores observados de imputados: as
+        # somas do histórico usam os valores publicados
+        value_stats = df.groupby(['city', 'parameter'], observed=True, sort=False)['value'].agg(
+            value_sum='sum', value_count='count'
+        )
+        self.watermarks.append(IncrementalState.summarize(df, value_stats))
+        self.keys.append(hash_keys(df, [col for col in IDENTITY_KEY if col in df.columns]))
+        self.imputer.fill(df)
+    
+    def _save_incremental_state(self):
+        """Substitui o estado incremental pelo do dataset publicado"""
+        state = IncrementalState(os.path.join(self.processed_dir, WATERMARKS_FILE))
+        state.merge(pd.concat(self.watermarks))
+        state.save()
+        
+        index = KeyIndex(os.path.join(self.processed_dir, KEY_INDEX_FILE))
+        index.add(np.concatenate(self.keys))
+        index.save()
+        
+        self.imputer.commit()
+
+def _collect_batches(collector, cities_per_batch, collector_options, collected):
+    """Fonte do grafo: lotes gerados pelo coletor, guardados também para o cache"""
+    for batch in collector.iter_batches(cities_per_batch, use_sample=True, **collector_options):
+        collected.append(batch)
+        yield batch
+
+def _clean_batch(batch, options):
+    """Limpa um lote (None se nada restar); no nível do módulo para rodar em processos"""
+    try:
+        return data_cleaning.DataCleaner(batch, **{'verbose': False, **options}).clean_data()
+    except ValueError:
+        return None
+
+def _concat(frames):
+    """Junta lotes restaurando a ordem original das linhas (lotes podem chegar fora de ordem)"""
+    df = pd.concat(frames)
+    return df if df.index.is_monotonic_increasing else df.sort_index()
+
+def incremental_conflict(processed_dir='data/processed'):
+    """
+    Dataset em processed_dir sem marcas d'água (ou None)
+    
+    O pipeline completo e o modo incremental gravam o estado junto com o
+    dataset; um dataset sem ele (p. ex. de uma versão anterior) não pode
+    ser continuado: acrescentar a ele duplicaria todo o histórico.
+    """
+    dataset_dir = os.path.join(processed_dir, 'dataset')
+    if os.path.exists(os.path.join(processed_dir, WATERMARKS_FILE)):
+        return None
+    return dataset_dir if os.path.isdir(dataset_dir) and os.listdir(dataset_dir) else None
+
+def run_incremental_pipeline(raw_data=None, processed_dir='data/processed', cleaning_options=None,
+                             dedup_options=None):
+    """
+    Executa o pipeline em modo incremental (somente acréscimos)
+    
+    Mantém uma marca d'água por (cidade, poluente) em watermarks.json,
+    limpa apenas as linhas posteriores a ela e as acrescenta ao dataset
+    particionado em processed_dir/dataset. O tempo de execução é
+    proporcional ao volume de dados novos, não ao histórico. As chaves
+    das linhas gravadas ficam em dedup_keys.npy, e linhas repetidas de
+    lotes anteriores são descartadas. A última leitura e o perfil sazonal
+    de cada grupo ficam em processed_dir/imputation, de modo que lacunas
+    no início do lote são interpoladas a partir do lote anterior.
+    
+    O pipeline completo grava o mesmo estado a partir das linhas que
+    publica, então o modo incremental continua o dataset dele. Um dataset
+    sem marcas d'água é recusado (FileExistsError).
+    
+    Args:
+        raw_data (pd.DataFrame): Dados brutos (padrão: coletar)
+        processed_dir (str): Diretório dos dados processados
+        cleaning_options (dict): Opções repassadas ao DataCleaner
+        dedup_options (dict): Opções do Deduplicator (key, tolerances)
+    
+    Returns:
+        pd.DataFrame: Linhas novas limpas
+    """
+    conflict = incremental_conflict(processed_dir)
+    if conflict:
+        raise FileExistsError(
+            f"{conflict} não tem marcas d'água; "
+            f"rode o pipeline completo para recriá-lo com o estado incremental"
+        )
+    
+    logger.info("🚀 INICIANDO PIPELINE INCREMENTAL")
+    logger.info("=" * 60)
+    
+    state = IncrementalState.load(os.path.join(processed_dir, WATERMARKS_FILE))
+    deduplicator = Deduplicator(
+        index=KeyIndex.load(os.path.join(processed_dir, KEY_INDEX_FILE)), **(dedup_options or {})
+    )
+    imputer = Imputer(state=ImputationState.load(os.path.join(processed_dir, IMPUTATION_DIR)))
+    dataset_dir = os.path.join(processed_dir, 'dataset')
+    logger.info(f"📌 Grupos com marca d'água: {len(state.table)} | "
+                f"chaves já ingeridas: {len(deduplicator.index):,}")
+    
+    # 1. Coleta
+    logger.info("\n📥 FASE 1: COLETA DE DADOS")
+    if raw_data is None:
+        with span('pipeline.collect'):
+            raw_data = data_collection.DataCollector().get_data(use_sample=True)
+    logger.info(f"✅ Dados brutos: {len(raw_data):,} registros")
+    
+    # 2. Limpeza apenas das linhas novas
+    logger.info("\n🧹 FASE 2: LIMPEZA DE DADOS NOVOS")
+    cleaner = data_cleaning.DataCleaner(
+        raw_data, incremental_state=state, deduplicator=deduplicator, imputer=imputer,
+        **(cleaning_options or {})
+    )
+    with span('pipeline.clean', rows_in=len(raw_data)) as s:
+        try:
+            new_data = cleaner.clean_data()
+        except ValueError:
+            # Nenhuma linha posterior às marcas d'água
+            new_data = raw_data.iloc[0:0]
+        s.rows_out = len(new_data)
+    logger.info(f"✅ Linhas novas: {len(new_data):,} registros")
+    
+    # 3. Acrescentar ao dataset e atualizar o estado
+    logger.info("\n💾 FASE 3: SALVANDO RESULTADOS")
+    if len(new_data) > 0:
+        batch_id = datetime.now().strftime('%Y%m%d%H%M%S%f')
+        with span('pipeline.write_dataset', rows_in=len(new_data)):
+            append_partitioned(new_data, dataset_dir, basename=f"inc-{batch_id}")
+        with span('pipeline.rollups', rows_in=len(new_data)):
+            update_rollups(new_data, os.path.join(processed_dir, 'rollups'))
+        with span('pipeline.aqi', rows_in=len(new_data)):
+            update_aqi(new_data, os.path.join(processed_dir, 'aqi'))
+        with span('pipeline.stations', rows_in=len(new_data)):
+            update_stations(new_data, os.path.join(processed_dir, 'stations.parquet'))
+        with span('pipeline.snapshot', rows_in=len(new_data)):
+            # Só a primeira versão (ou uma recriação) lê o dataset inteiro
+            snapshot_dir = os.path.join(processed_dir, 'snapshot')
+            if append_snapshot(new_data, snapshot_dir) is None:
+                write_snapshot(read_dataset(dataset_dir), snapshot_dir)
+        state.update(new_data, cleaner.value_stats)
+        state.save()
+        deduplicator.commit()
+        imputer.commit()
+        logger.info(f"✅ Dataset atualizado: {dataset_dir}")
+    else:
+        logger.info("⏭️  Nada a acrescentar")
+    
+    if not state.is_empty:
+        groups = state.table.reset_index()
+        summary_path = os.path.join(processed_dir, 'summary.txt')
+        with open(summary_path, 'w') as f:
+            f.write(f"RESUMO DO PROJETO\n")
+            f.write(f"Gerado: {datetime.now()}\n")
+            f.write(f"Total registros: {int(groups['rows'].sum()):,}\n")
+            f.write(f"Cidades: {groups['city'].nunique()}\n")
+            f.write(f"Poluentes: {', '.join(groups['parameter'].unique())}\n")
+            f.write(f"Período: {groups['first_date'].min()} a {groups['watermark'].max()}\n")
+        logger.info(f"✅ Sumário: {summary_path}")
+    
+    logger.info("\n" + "=" * 60)
+    logger.info("🎉 PIPELINE INCREMENTAL CONCLUÍDO!")
+    logger.info("=" * 60)
+    
+    return new_data
+
 if __name__ == "__main__":
     run_full_pipeline()
\ No newline at end of file
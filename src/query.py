@@ -0,0 +1,264 @@
+"""
+Camada de consulta: filtros, agrupamentos, agregações e janelas com backends trocáveis
+
+Backends:
+    pandas: execução imediata em memória (comportamento original)
+    duckdb: execução preguiçosa, colunar e multi-thread direto sobre o
+        dataset Parquet, com agregação fora da memória (dependência opcional)
+
+O backend padrão vem da variável de ambiente AQ_QUERY_BACKEND.
+"""
+import os
+
+import pandas as pd
+
+try:
+    from .storage import DATASET_DIR, read_dataset
+except ImportError:
+    from storage import DATASET_DIR, read_dataset
+
+BACKEND_ENV = 'AQ_QUERY_BACKEND'
+DEFAULT_BACKEND = 'pandas'
+
+# Agregações suportadas e seus equivalentes em SQL
+AGGREGATIONS = {
+    'count': 'count',
+    'sum': 'sum',
+    'mean': 'avg',
+    'std': 'stddev_samp',
+    'min': 'min',
+    'max': 'max'
+}
+
+# Colunas que o pandas consegue filtrar já na leitura do dataset
+_PUSHDOWN = {'city': 'cities', 'parameter': 'parameters', 'year': 'years'}
+
+class PandasBackend:
+    """Consultas em pandas sobre um DataFrame ou sobre o dataset particionado"""
+    
+    name = 'pandas'
+    
+    def __init__(self, source=DATASET_DIR):
+        """
+        Args:
+            source (pd.DataFrame | str): Dados em memória ou diretório do
+                dataset Parquet (lido com poda de partições)
+        """
+        self.source = source
+    
+    def select(self, where=None, columns=None, order_by=None):
+        """
+        Linhas que atendem aos filtros
+        
+        Args:
+            where (dict): {coluna: lista de valores} ou {coluna: (mín, máx)}
+                (intervalo inclusivo; None deixa o lado aberto)
+            columns (list): Colunas retornadas (None = todas)
+            order_by (list): Colunas de ordenação
+        """
+        df = self._frame(where, columns)
+        if order_by:
+            df = df.sort_values(list(order_by), ignore_index=True)
+        return df[list(columns)] if columns else df
+    
+    def aggregate(self, by, column='value', funcs=('count', 'mean', 'std', 'min', 'max'), where=None):
+        """
+        Agrega uma coluna por grupo
+        
+        Returns:
+            pd.DataFrame: Colunas de `by` e uma coluna por agregação,
+                ordenado por `by`
+        """
+        by = list(by)
+        _check_funcs(funcs)
+        df = self._frame(where, by + [column])
+        result = df.groupby(by, observed=True)[column].agg(list(funcs))
+        return result.reset_index().sort_values(by, ignore_index=True)
+    
+    def window(self, column='value', size=7, func='mean', by=('city', 'parameter'),
+               order_by='date', where=None):
+        """
+        Janela móvel de `size` linhas por grupo (ex.: média móvel de 7 dias)
+        
+        Returns:
+            pd.DataFrame: by, order_by, column e rolling_{func}, ordenado
+                por by e order_by
+        """
+        by = list(by)
+        _check_funcs([func])
+        df = self._frame(where, by + [order_by, column])[by + [order_by, column]]
+        df = df.sort_values(by + [order_by], ignore_index=True)
+        rolling = df.groupby(by, observed=True, sort=False)[column].rolling(size, min_periods=1)
+        df[f'rolling_{func}'] = getattr(rolling, func)().reset_index(level=by, drop=True)
+        return df
+    
+    def _frame(self, where, columns):
+        """DataFrame filtrado (com leitura apenas do necessário se a fonte for Parquet)"""
+        where = where or {}
+        if isinstance(self.source, pd.DataFrame):
+            df = self.source
+        else:
+            pushdown = {
+                _PUSHDOWN[col]: values for col, values in where.items()
+                if col in _PUSHDOWN and not isinstance(values, tuple)
+            }
+            date_range = where.get('date')
+            if not isinstance(date_range, tuple):
+                date_range = (None, None)
+            needed = None if columns is None else list(dict.fromkeys(list(columns) + list(where)))
+            df = read_dataset(
+                self.source, start_date=date_range[0], end_date=date_range[1],
+                columns=needed, **pushdown
+            )
+        
+        mask = pd.Series(True, index=df.index)
+        for col, values in where.items():
+            if isinstance(values, tuple):
+                low, high = (_coerce(df[col], v) for v in values)
+                if low is not None:
+                    mask &= df[col] >= low
+                if high is not None:
+                    mask &= df[col] <= high
+            else:
+                mask &= df[col].isin(list(values))
+        return df[mask] if not mask.all() else df
+
+class DuckDBBackend:
+    """Consultas SQL preguiçosas no DuckDB (multi-thread, fora da memória)"""
+    
+    name = 'duckdb'
+    
+    def __init__(self, source=DATASET_DIR, threads=None, memory_limit=None, temp_directory=None):
+        """
+        Args:
+            source (pd.DataFrame | str): DataFrame em memória (consultado
+                sem cópia) ou diretório do dataset Parquet particionado
+            threads (int): Threads do DuckDB (padrão: todos os núcleos)
+            memory_limit (str): Limite de memória (ex.: '2GB'); acima
+                dele, agregações e ordenações usam disco
+            temp_directory (str): Diretório para o excedente em disco
+        """
+        try:
+            import duckdb
+        except ImportError as e:
+            raise ImportError("Backend 'duckdb' requer: pip install duckdb") from e
+        
+        self.source = source
+        self.connection = duckdb.connect()
+        settings = {'threads': threads, 'memory_limit': memory_limit, 'temp_directory': temp_directory}
+        for key, value in settings.items():
+            if value is not None:
+                self.connection.execute(f"SET {key} = '{value}'")
+        
+        if isinstance(source, pd.DataFrame):
+            self.connection.register('source', source)
+        else:
+            pattern = os.path.join(source, '**', '*.parquet').replace("'", "''")
+            self.connection.execute(
+                f"CREATE VIEW source AS SELECT * FROM "
+                f"read_parquet('{pattern}', hive_partitioning = true, union_by_name = true)"
+            )
+    
+    def select(self, where=None, columns=None, order_by=None):
+        """Linhas que atendem aos filtros (ver PandasBackend.select)"""
+        projection = ', '.join(_quote(c) for c in columns) if columns else '*'
+        condition, params = _where_sql(where)
+        order = f" ORDER BY {', '.join(_quote(c) for c in order_by)}" if order_by else ''
+        return self._run(f"SELECT {projection} FROM source{condition}{order}", params)
+    
+    def aggregate(self, by, column='value', funcs=('count', 'mean', 'std', 'min', 'max'), where=None):
+        """Agrega uma coluna por grupo (ver PandasBackend.aggregate)"""
+        by = list(by)
+        _check_funcs(funcs)
+        keys = ', '.join(_quote(c) for c in by)
+        measures = ', '.join(f"{AGGREGATIONS[f]}({_quote(column)}) AS {_quote(f)}" for f in funcs)
+        condition, params = _where_sql(where)
+        return self._run(
+            f"SELECT {keys}, {measures} FROM source{condition} GROUP BY {keys} ORDER BY {keys}",
+            params
+        )
+    
+    def window(self, column='value', size=7, func='mean', by=('city', 'parameter'),
+               order_by='date', where=None):
+        """Janela móvel de `size` linhas por grupo (ver PandasBackend.window)"""
+        by = list(by)
+        _check_funcs([func])
+        keys = ', '.join(_quote(c) for c in by)
+        condition, params = _where_sql(where)
+        return self._run(
+            f"SELECT {keys}, {_quote(order_by)}, {_quote(column)}, "
+            f"{AGGREGATIONS[func]}({_quote(column)}) OVER ("
+            f"PARTITION BY {keys} ORDER BY {_quote(order_by)} "
+            f"ROWS BETWEEN {int(size) - 1} PRECEDING AND CURRENT ROW"
+            f") AS {_quote('rolling_' + func)} "
+            f"FROM source{condition} ORDER BY {keys}, {_quote(order_by)}",
+            params
+        )
+    
+    def _run(self, sql, params):
+        return self.connection.execute(sql, params).df()
+
+BACKENDS = {
+    'pandas': PandasBackend,
+    'duckdb': DuckDBBackend
+}
+
+def get_backend(name=None, source=DATASET_DIR, **options):
+    """
+    Cria o backend de consulta configurado
+    
+    Args:
+        name (str): 'pandas' ou 'duckdb' (padrão: $AQ_QUERY_BACKEND ou pandas)
+        source (pd.DataFrame | str): Dados em memória ou diretório Parquet
+        **options: Opções do backend (ex.: memory_limit no DuckDB)
+    """
+    name = name or os.environ.get(BACKEND_ENV, DEFAULT_BACKEND)
+    if name not in BACKENDS:
+        raise ValueError(f"Backend de consulta desconhecido: {name} (opções: {', '.join(BACKENDS)})")
+    return BACKENDS[name](source, **options)
+
+def available_backends():
+    """Backends cujas dependências estão instaladas"""
+    names = ['pandas']
+    try:
+        import duckdb
+        names.append('duckdb')
+    except ImportError:
+        pass
+    return names
+
+def _check_funcs(funcs):
+    unknown = [f for f in funcs if f not in AGGREGATIONS]
+    if unknown:
+        raise ValueError(f"Agregações não suportadas: {unknown}")
+
+def _coerce(series, value):
+    """Converte limites de data em Timestamp para comparar com colunas datetime"""
+    if value is not None and pd.api.types.is_datetime64_any_dtype(series):
+        return pd.Timestamp(value)
+    return value
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+def _where_sql(where):
+    """Cláusula WHERE parametrizada (valores nunca são interpolados no SQL)"""
+    clauses, params = [], []
+    for col, values in (where or {}).items():
+        if isinstance(values, tuple):
+            low, high = values
+            if col == 'date':
+                low, high = (pd.Timestamp(v).to_pydatetime() if v is not None else None
+                             for v in (low, high))
+            if low is not None:
+                clauses.append(f"{_quote(col)} >= ?")
+                params.append(low)
+            if high is not None:
+                clauses.append(f"{_quote(col)} <= ?")
+                params.append(high)
+        else:
+            values = list(values)
+            placeholders = ', '.join('?' for _ in values) or 'NULL'
+            clauses.append(f"{_quote(col)} IN ({placeholders})")
+            params.extend(values)
+    return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), params
@@ -0,0 +1,179 @@
+"""
+Agregados pré-calculados (rollups) para as métricas e gráficos do dashboard
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .writers import write_table
+except ImportError:
+    from writers import write_table
+
+ROLLUP_DIR = 'data/processed/rollups'
+GROUP_KEYS = ['city', 'parameter']
+
+# Granularidades: unidade datetime64 usada para truncar as datas
+GRAINS = {'day': 'D', 'month': 'M', 'year': 'Y'}
+# Granularidades que também guardam esboços de quantis
+SKETCH_GRAINS = ['month', 'year']
+
+# Esboço de quantis em buckets logarítmicos (erro relativo de ~2%)
+RELATIVE_ACCURACY = 0.02
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+MIN_SKETCH_VALUE = 1e-3
+
+def build_rollups(df):
+    """
+    Calcula os agregados diários, mensais e anuais por (cidade, poluente)
+    
+    Args:
+        df (pd.DataFrame): Dados limpos (date, city, parameter, value)
+    
+    Returns:
+        tuple: (aggregates, sketches)
+            aggregates: grain, period, city, parameter, count, sum, min, max
+            sketches: grain, period, city, parameter, bin, count
+    """
+    values = df['value'].to_numpy(dtype=np.float64)
+    valid = ~np.isnan(values)
+    base = pd.DataFrame({
+        'city': df['city'].to_numpy()[valid],
+        'parameter': df['parameter'].to_numpy()[valid],
+        'value': values[valid]
+    })
+    dates = df['date'].to_numpy()[valid]
+    bins = _sketch_bins(base['value'].to_numpy())
+    
+    aggregates, sketches = [], []
+    for grain, unit in GRAINS.items():
+        base['period'] = dates.astype(f'datetime64[{unit}]').astype('datetime64[ns]')
+        keys = ['period'] + GROUP_KEYS
+        
+        agg = base.groupby(keys, sort=False)['value'].agg(['count', 'sum', 'min', 'max'])
+        aggregates.append(agg.reset_index().assign(grain=grain))
+        
+        if grain in SKETCH_GRAINS:
+            sketch = base.assign(bin=bins).groupby(keys + ['bin'], sort=False).size()
+            sketches.append(sketch.rename('count').reset_index().assign(grain=grain))
+    
+    return _finalize(pd.concat(aggregates)), _finalize(pd.concat(sketches))
+
+def merge_rollups(current, new):
+    """Combina dois conjuntos de agregados (somas, contagens, min e max são mergeáveis)"""
+    current_aggs, current_sketches = current
+    new_aggs, new_sketches = new
+    keys = ['grain', 'period'] + GROUP_KEYS
+    
+    aggregates = pd.concat([current_aggs, new_aggs]).groupby(keys, sort=False).agg(
+        {'count': 'sum', 'sum': 'sum', 'min': 'min', 'max': 'max'}
+    ).reset_index()
+    sketches = pd.concat([current_sketches, new_sketches]).groupby(
+        keys + ['bin'], sort=False
+    )['count'].sum().reset_index()
+    
+    return _finalize(aggregates), _finalize(sketches)
+
+def concat_rollups(results):
+    """
+    Junta agregados de build_rollups calculados em lotes com cidades distintas
+    
+    Sem grupos em comum entre os lotes, basta concatenar e ordenar uma
+    vez (merge_rollups reagruparia tudo a cada lote).
+    """
+    results = list(results)
+    aggregates = pd.concat([aggregates for aggregates, _ in results], ignore_index=True)
+    sketches = pd.concat([sketches for _, sketches in results], ignore_index=True)
+    return _finalize(aggregates), _finalize(sketches)
+
+def write_rollups(rollups, root_path=ROLLUP_DIR):
+    """Grava os agregados em Parquet"""
+    aggregates, sketches = rollups
+    os.makedirs(root_path, exist_ok=True)
+    for name, df in (('aggregates', aggregates), ('sketches', sketches)):
+        write_table(df, os.path.join(root_path, f'{name}.parquet'))
+    return root_path
+
+def load_rollups(root_path=ROLLUP_DIR):
+    """Lê os agregados gravados (FileNotFoundError se não existirem)"""
+    return (
+        pd.read_parquet(os.path.join(root_path, 'aggregates.parquet')),
+        pd.read_parquet(os.path.join(root_path, 'sketches.parquet'))
+    )
+
+def update_rollups(df, root_path=ROLLUP_DIR):
+    """Incorpora um lote novo aos agregados gravados, sem reler o histórico"""
+    new = build_rollups(df)
+    try:
+        new = merge_rollups(load_rollups(root_path), new)
+    except FileNotFoundError:
+        pass
+    return write_rollups(new, root_path)
+
+def summarize(aggregates, cities=None, parameters=None, grain='year', by=GROUP_KEYS):
+    """
+    Estatísticas (count, sum, min, max, mean) agrupadas por colunas de rollup
+    
+    Args:
+        aggregates (pd.DataFrame): Agregados de build_rollups/load_rollups
+        cities, parameters (list): Filtros (None = todos)
+        grain (str): Granularidade de origem ('day', 'month' ou 'year')
+        by (list): Colunas de agrupamento (ex.: ['city'], ['period', 'city'])
+    """
+    selected = _select(aggregates, grain, cities, parameters)
+    stats = selected.groupby(list(by), observed=True).agg(
+        {'count': 'sum', 'sum': 'sum', 'min': 'min', 'max': 'max'}
+    )
+    stats['mean'] = stats['sum'] / stats['count']
+    return stats.reset_index()
+
+def quantiles(sketches, cities=None, parameters=None, qs=(0.05, 0.25, 0.5, 0.75, 0.95),
+              grain='year', by=GROUP_KEYS):
+    """
+    Quantis aproximados combinando os esboços selecionados
+    
+    Returns:
+        pd.DataFrame: Colunas de agrupamento e uma coluna por quantil ('q0.25', ...)
+    """
+    by = list(by)
+    selected = _select(sketches, grain, cities, parameters)
+    merged = selected.groupby(by + ['bin'], observed=True)['count'].sum().reset_index()
+    merged = merged.sort_values(by + ['bin'], ignore_index=True)
+    
+    cumulative = merged.groupby(by, observed=True)['count'].cumsum()
+    totals = merged.groupby(by, observed=True)['count'].transform('sum')
+    merged['representative'] = _bin_values(merged['bin'].to_numpy())
+    
+    result = merged[by].drop_duplicates().set_index(by)
+    for q in qs:
+        # Primeiro bucket cuja contagem acumulada atinge o quantil
+        reached = merged[cumulative >= q * totals]
+        first = reached.groupby(by, observed=True)['representative'].first()
+        result[f'q{q}'] = first
+    return result.reset_index()
+
+def _select(df, grain, cities, parameters):
+    mask = df['grain'] == grain
+    if cities is not None:
+        mask &= df['city'].isin(list(cities))
+    if parameters is not None:
+        mask &= df['parameter'].isin(list(parameters))
+    return df[mask]
+
+def _sketch_bins(values):
+    """Bucket logarítmico de cada valor (valores ≤ MIN_SKETCH_VALUE no bucket mínimo)"""
+    clipped = np.maximum(values, MIN_SKETCH_VALUE)
+    return np.ceil(np.log(clipped) / np.log(GAMMA)).astype(np.int32)
+
+def _bin_values(bins):
+    """Valor representativo de cada bucket (erro relativo ≤ RELATIVE_ACCURACY)"""
+    return 2 * GAMMA ** bins.astype(np.float64) / (GAMMA + 1)
+
+def _finalize(df):
+    """Ordena colunas e linhas de forma determinística"""
+    first = ['grain', 'period'] + GROUP_KEYS
+    columns = first + [c for c in df.columns if c not in first]
+    sort_keys = first + (['bin'] if 'bin' in df.columns else [])
+    df = df[columns].astype({'city': str, 'parameter': str})
+    return df.sort_values(sort_keys, ignore_index=True)
@@ -0,0 +1,196 @@
+"""
+Snapshot Arrow IPC (Feather v2, sem compressão) lido pelo dashboard via memory-map
+"""
+import json
+import os
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+try:
+    from .storage import to_arrow_table
+    from .writers import write_table
+except ImportError:
+    from storage import to_arrow_table
+    from writers import write_table
+
+SNAPSHOT_DIR = 'data/processed/snapshot'
+STAMP_FILE = '_current.json'
+# Versões mantidas em disco (leitores antigos continuam com os arquivos mapeados)
+KEEP_VERSIONS = 2
+# Segmentos (cada um ordenado) acumulados antes de reordenar o snapshot inteiro
+MAX_SEGMENTS = 32
+
+def write_snapshot(df, root_path=SNAPSHOT_DIR, keep=KEEP_VERSIONS):
+    """
+    Grava uma nova versão do snapshot e atualiza o carimbo de versão
+    
+    O arquivo não é comprimido para que os leitores possam mapeá-lo em
+    memória sem cópia; as linhas são ordenadas por (parameter, city, date)
+    para que cada filtro do dashboard leia faixas contíguas.
+    
+    Args:
+        df (pd.DataFrame | pa.Table): Dados limpos
+        root_path (str): Diretório dos snapshots
+        keep (int): Número de versões mantidas em disco
+    
+    Returns:
+        str: Versão gravada
+    """
+    table = df if isinstance(df, pa.Table) else to_arrow_table(df)
+    segment = _write_segment(_sorted(table), root_path)
+    return _write_version([segment], root_path, keep)
+
+def append_snapshot(df, root_path=SNAPSHOT_DIR, keep=KEEP_VERSIONS, max_segments=MAX_SEGMENTS):
+    """
+    Grava uma nova versão com os segmentos do snapshot atual mais o de df
+    
+    Só o lote ordenado é gravado, como um segmento novo; a versão nova
+    lista os segmentos anteriores, que não são copiados nem relidos. Cada
+    filtro do dashboard passa a ler uma faixa por segmento, e o snapshot
+    inteiro é reordenado em um único segmento quando passa de
+    `max_segments`.
+    
+    Args:
+        df (pd.DataFrame): Linhas novas (dados limpos)
+        root_path (str): Diretório dos snapshots
+        keep (int): Número de versões mantidas em disco
+        max_segments (int): Segmentos acumulados antes de reordenar tudo
+    
+    Returns:
+        str: Versão gravada (None se ainda não houver snapshot)
+    """
+    segments = _segments(_load_stamp(root_path))
+    if not segments:
+        return None
+    
+    schema = _open_segment(root_path, segments[0]).schema
+    batch = _sorted(to_arrow_table(df, schema))
+    if len(segments) + 1 > max_segments:
+        table = pa.concat_tables([_open_segments(root_path, segments), batch])
+        segments = [_write_segment(_sorted(table), root_path)]
+    else:
+        segments = segments + [_write_segment(batch, root_path)]
+    return _write_version(segments, root_path, keep)
+
+def _sorted(table):
+    """Linhas ordenadas por (parameter, city, date): cada filtro lê faixas contíguas"""
+    sort_keys = [
+        (col, 'ascending') for col in ('parameter', 'city', 'date') if col in table.column_names
+    ]
+    return table.sort_by(sort_keys) if sort_keys else table
+
+def _write_segment(table, root_path):
+    """Grava um segmento imutável e devolve o nome do arquivo"""
+    filename = f"segment-{datetime.now().strftime('%Y%m%d%H%M%S%f')}.arrow"
+    write_table(table, os.path.join(root_path, filename), fmt='feather', compression='uncompressed')
+    return filename
+
+def _write_version(segments, root_path, keep):
+    """Grava o manifesto da versão, troca o carimbo e remove versões antigas"""
+    version = datetime.now().strftime('%Y%m%d%H%M%S%f')
+    tables = [_open_segment(root_path, filename) for filename in segments]
+    manifest = {
+        'version': version,
+        'segments': segments,
+        'rows': sum(table.num_rows for table in tables),
+        'columns': tables[0].column_names,
+        'created': datetime.now().isoformat()
+    }
+    _write_json(manifest, os.path.join(root_path, f'snapshot-{version}.json'))
+    # O carimbo é trocado atomicamente depois que o manifesto está completo
+    _write_json(manifest, os.path.join(root_path, STAMP_FILE))
+    
+    _prune(root_path, keep)
+    return version
+
+def snapshot_version(root_path=SNAPSHOT_DIR):
+    """Versão atual do snapshot (None se não existir); leitura barata a cada rerun"""
+    stamp = _load_stamp(root_path)
+    return stamp['version'] if stamp else None
+
+def open_snapshot(root_path=SNAPSHOT_DIR, version=None):
+    """
+    Abre o snapshot mapeado em memória (sem cópia dos dados)
+    
+    Args:
+        root_path (str): Diretório dos snapshots
+        version (str): Versão desejada (padrão: a atual)
+    
+    Returns:
+        pa.Table: Tabela cujos buffers (um bloco por segmento) apontam para
+            os arquivos mapeados
+    """
+    if version is None:
+        stamp = _load_stamp(root_path)
+        if stamp is None:
+            raise FileNotFoundError(f"Nenhum snapshot em {root_path}")
+    else:
+        with open(os.path.join(root_path, f'snapshot-{version}.json'), encoding='utf-8') as f:
+            stamp = json.load(f)
+    return _open_segments(root_path, _segments(stamp))
+
+def _segments(stamp):
+    """Segmentos listados no manifesto (carimbos antigos apontam um único arquivo)"""
+    if stamp is None:
+        return []
+    return stamp['segments'] if 'segments' in stamp else [stamp['file']]
+
+def _open_segment(root_path, filename):
+    source = pa.memory_map(os.path.join(root_path, filename), 'r')
+    return pa.ipc.open_file(source).read_all()
+
+def _open_segments(root_path, segments):
+    return pa.concat_tables([_open_segment(root_path, filename) for filename in segments])
+
+def filter_snapshot(table, cities=None, parameters=None, columns=None):
+    """
+    Seleciona linhas e colunas do snapshot
+    
+    Returns:
+        pd.DataFrame: Apenas as linhas filtradas são materializadas
+    """
+    mask = None
+    for col, values in (('city', cities), ('parameter', parameters)):
+        if values is not None:
+            value_set = pa.array(list(values), type=table.schema.field(col).type)
+            condition = pc.is_in(table[col], value_set=value_set)
+            mask = condition if mask is None else pc.and_(mask, condition)
+    if columns is not None:
+        table = table.select([col for col in columns if col in table.column_names])
+    if mask is not None:
+        table = table.filter(mask)
+    return table.to_pandas()
+
+def _load_stamp(root_path):
+    path = os.path.join(root_path, STAMP_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def _write_json(data, path):
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(path + '.tmp', path)
+
+def _prune(root_path, keep):
+    """Remove os manifestos além de `keep` e os segmentos que nenhum outro lista"""
+    manifests = sorted(
+        f for f in os.listdir(root_path) if f.startswith('snapshot-') and f.endswith('.json')
+    )
+    referenced = set()
+    for filename in manifests[-keep:]:
+        with open(os.path.join(root_path, filename), encoding='utf-8') as f:
+            referenced.update(json.load(f)['segments'])
+    for filename in manifests[:-keep]:
+        os.remove(os.path.join(root_path, filename))
+    
+    for filename in os.listdir(root_path):
+        if filename.endswith('.arrow') and filename not in referenced:
+            try:
+                os.remove(os.path.join(root_path, filename))
+            except OSError:
+                # Arquivo ainda aberto por um leitor (Windows): remover depois
+                pass
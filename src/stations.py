@@ -0,0 +1,238 @@
+"""
+Cadastro de estações com índice espacial (BallTree haversine) para consultas por raio e vizinho mais próximo
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .dedup import hash_keys
+    from .writers import write_table
+except ImportError:
+    from dedup import hash_keys
+    from writers import write_table
+
+STATIONS_FILE = 'data/processed/stations.parquet'
+EARTH_RADIUS_KM = 6371.0088
+
+# Casas decimais das coordenadas na identidade da estação (~1 m)
+COORD_DECIMALS = 5
+
+COLUMNS = ['station_id', 'location', 'city', 'country', 'latitude', 'longitude',
+           'parameters', 'rows', 'first_date', 'last_date']
+
+class StationRegistry:
+    """
+    Estações únicas (local/cidade + coordenadas) e índice BallTree em radianos
+    
+    O identificador é o hash de 64 bits da identidade da estação, estável
+    entre execuções e lotes. Só a tabela é persistida; o índice é
+    reconstruído na carga (milissegundos para milhares de estações).
+    """
+    
+    def __init__(self, stations=None):
+        """
+        Args:
+            stations (pd.DataFrame): Tabela no formato de COLUMNS
+        """
+        self.stations = stations if stations is not None else pd.DataFrame(columns=COLUMNS)
+        self._tree = None
+    
+    @classmethod
+    def from_frame(cls, df):
+        """
+        Deduplica as estações das medições em uma tabela compacta
+        
+        Args:
+            df (pd.DataFrame): Medições com latitude e longitude (e city,
+                location, country, parameter, date quando existirem)
+        """
+        return cls(_station_table(df))
+    
+    @classmethod
+    def load(cls, path=STATIONS_FILE):
+        """Carrega o cadastro salvo (FileNotFoundError se não existir)"""
+        return cls(pd.read_parquet(path))
+    
+    def save(self, path=STATIONS_FILE):
+        """Grava o cadastro em Parquet"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        write_table(self.stations, path)
+        return path
+    
+    def update(self, df):
+        """Incorpora as estações de um lote novo (contagens e datas acumuladas)"""
+        combined = pd.concat([self.stations, _station_table(df)], ignore_index=True)
+        grouped = combined.groupby('station_id', sort=False)
+        stations = grouped.agg({
+            'location': 'first', 'city': 'first', 'country': 'first',
+            'latitude': 'first', 'longitude': 'first', 'rows': 'sum',
+            'first_date': 'min', 'last_date': 'max'
+        })
+        pairs = combined[['station_id', 'parameters']].assign(
+            parameter=combined['parameters'].str.split(',')
+        ).explode('parameter')
+        stations['parameters'] = _parameter_lists(pairs['station_id'], pairs['parameter'])
+        self.stations = stations.reset_index()[COLUMNS].sort_values('station_id', ignore_index=True)
+        self._tree = None
+        return self
+    
+    def __len__(self):
+        return len(self.stations)
+    
+    @property
+    def tree(self):
+        """BallTree haversine sobre (lat, lon) em radianos, criado sob demanda"""
+        return self.build_index()._tree
+    
+    def build_index(self):
+        """Constrói o índice espacial se ainda não existir (ex.: antes de guardar o cadastro em cache)"""
+        if self._tree is None:
+            from sklearn.neighbors import BallTree
+            self._tree = BallTree(_radians(self.stations['latitude'], self.stations['longitude']),
+                                  metric='haversine')
+        return self
+    
+    def nearest(self, latitudes, longitudes, k=1):
+        """
+        k estações mais próximas de cada ponto (consulta em lote)
+        
+        Returns:
+            pd.DataFrame: point (posição do ponto), rank, station_id e
+                distance_km, k linhas por ponto
+        """
+        points = _radians(latitudes, longitudes)
+        k = min(k, len(self.stations))
+        distances, positions = self.tree.query(points, k=k)
+        return pd.DataFrame({
+            'point': np.repeat(np.arange(len(points)), k),
+            'rank': np.tile(np.arange(1, k + 1), len(points)),
+            'station_id': self.stations['station_id'].to_numpy()[positions.ravel()],
+            'distance_km': distances.ravel() * EARTH_RADIUS_KM
+        })
+    
+    def within_radius(self, latitudes, longitudes, radius_km):
+        """
+        Estações a até radius_km de cada ponto (consulta em lote)
+        
+        Returns:
+            pd.DataFrame: point, station_id e distance_km, ordenado por
+                ponto e distância
+        """
+        points = _radians(latitudes, longitudes)
+        positions, distances = self.tree.query_radius(
+            points, r=radius_km / EARTH_RADIUS_KM, return_distance=True, sort_results=True
+        )
+        counts = np.fromiter((len(p) for p in positions), dtype=np.int64, count=len(positions))
+        if not counts.sum():
+            return pd.DataFrame({'point': [], 'station_id': [], 'distance_km': []})
+        return pd.DataFrame({
+            'point': np.repeat(np.arange(len(points)), counts),
+            'station_id': self.stations['station_id'].to_numpy()[np.concatenate(positions)],
+            'distance_km': np.concatenate(distances) * EARTH_RADIUS_KM
+        })
+    
+    def nearest_to_grid(self, lat_range, lon_range, step_deg):
+        """
+        Estação mais próxima do centro de cada célula de uma grade regular
+        
+        Args:
+            lat_range, lon_range (tuple): (mínimo, máximo) em graus
+            step_deg (float): Tamanho da célula em graus
+        
+        Returns:
+            pd.DataFrame: latitude, longitude (centro), station_id e distance_km
+        """
+        lats = np.arange(lat_range[0] + step_deg / 2, lat_range[1], step_deg)
+        lons = np.arange(lon_range[0] + step_deg / 2, lon_range[1], step_deg)
+        grid_lat, grid_lon = (a.ravel() for a in np.meshgrid(lats, lons, indexing='ij'))
+        nearest = self.nearest(grid_lat, grid_lon, k=1)
+        return pd.DataFrame({
+            'latitude': grid_lat,
+            'longitude': grid_lon,
+            'station_id': nearest['station_id'].to_numpy(),
+            'distance_km': nearest['distance_km'].to_numpy()
+        })
+    
+    def assign(self, df):
+        """Identificador da estação de cada linha de df (mesma identidade de from_frame)"""
+        identity = _identity(df)
+        return hash_keys(identity, list(identity.columns))
+    
+    def lookup(self, station_ids, columns=('city', 'latitude', 'longitude')):
+        """Atributos das estações, na ordem dos identificadores dados"""
+        table = self.stations.set_index('station_id')[list(columns)]
+        return table.reindex(np.asarray(station_ids, dtype=np.uint64)).reset_index()
+
+def update_stations(df, path=STATIONS_FILE):
+    """
+    Atualiza o cadastro salvo com as estações de um lote (cria se não existir)
+    
+    Args:
+        df (pd.DataFrame): Medições novas
+        path (str): Arquivo do cadastro
+    
+    Returns:
+        StationRegistry: Cadastro atualizado
+    """
+    if os.path.exists(path):
+        registry = StationRegistry.load(path).update(df)
+    else:
+        registry = StationRegistry.from_frame(df)
+    registry.save(path)
+    return registry
+
+def _identity(df):
+    """Colunas que identificam uma estação, com coordenadas arredondadas"""
+    # Textos e categóricos têm o mesmo hash; não é preciso convertê-los
+    identity = pd.DataFrame({col: df[col].to_numpy() for col in ['location', 'city'] if col in df.columns})
+    for col in ['latitude', 'longitude']:
+        identity[col] = pd.to_numeric(df[col], errors='coerce').round(COORD_DECIMALS).to_numpy()
+    return identity
+
+def _station_table(df):
+    """Uma linha por estação, com contagens, poluentes e período"""
+    identity = _identity(df)
+    frame = identity.assign(
+        station_id=hash_keys(identity, list(identity.columns)),
+        country=df['country'].to_numpy() if 'country' in df.columns else None,
+        parameter=df['parameter'].to_numpy() if 'parameter' in df.columns else '',
+        date=pd.to_datetime(df['date']).to_numpy() if 'date' in df.columns else pd.NaT
+    )
+    frame = frame.dropna(subset=['latitude', 'longitude'])
+    
+    grouped = frame.groupby('station_id', sort=False)
+    stations = grouped[['latitude', 'longitude']].first()
+    stations['rows'] = grouped.size()
+    stations['first_date'] = grouped['date'].min()
+    stations['last_date'] = grouped['date'].max()
+    for col in ['location', 'city', 'country']:
+        stations[col] = grouped[col].first().astype(str) if col in frame.columns else None
+    stations['parameters'] = _parameter_lists(frame['station_id'], frame['parameter'])
+    return stations.reset_index()[COLUMNS].sort_values('station_id', ignore_index=True)
+
+def _parameter_lists(station_ids, parameters):
+    """
+    Poluentes de cada estação em texto ('NO2,O3,PM2.5')
+    
+    Monta a matriz estação x poluente e formata só os padrões distintos,
+    em vez de juntar textos grupo a grupo.
+    """
+    parameters = np.asarray(parameters, dtype=object).astype(str)
+    valid = ~np.isin(parameters, ['', 'nan', 'None'])
+    station_codes, stations = pd.factorize(np.asarray(station_ids))
+    parameter_codes, names = pd.factorize(parameters[valid], sort=True)
+    present = np.zeros((len(stations), len(names)), dtype=bool)
+    present[station_codes[valid], parameter_codes] = True
+    patterns, inverse = np.unique(present, axis=0, return_inverse=True)
+    names = np.asarray(names, dtype=object)
+    labels = np.array([','.join(names[pattern]) for pattern in patterns], dtype=object)
+    return pd.Series(labels[inverse.ravel()], index=stations)
+
+def _radians(latitudes, longitudes):
+    """Pontos (lat, lon) em radianos, no formato do BallTree haversine"""
+    return np.radians(np.column_stack([
+        np.asarray(latitudes, dtype=np.float64).ravel(),
+        np.asarray(longitudes, dtype=np.float64).ravel()
+    ]))
@@ -0,0 +1,314 @@
+"""
+Armazenamento dos dados processados em datasets Parquet particionados
+"""
+import json
+import os
+import shutil
+from datetime import datetime
+from urllib.parse import unquote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+try:
+    from .writers import DEFAULT_COMPRESSION
+except ImportError:
+    from writers import DEFAULT_COMPRESSION
+
+# Layout padrão do dataset processado: parameter=.../year=.../city=...
+PARTITION_COLS = ('parameter', 'year', 'city')
+DATASET_DIR = 'data/processed/dataset'
+MANIFEST_FILE = '_manifest.json'
+ROW_GROUP_SIZE = 128 * 1024
+
+def to_arrow_table(df, schema=None):
+    """
+    Converte um DataFrame em tabela Arrow com esquema estável
+    
+    Categóricos viram strings e 'value' é sempre float64, para que blocos
+    gravados em momentos diferentes tenham o mesmo esquema.
+    
+    Args:
+        df (pd.DataFrame): Dados limpos
+        schema (pa.Schema): Esquema de destino (ex.: o do primeiro bloco);
+            colunas ausentes no bloco são preenchidas com nulos
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    
+    if schema is None:
+        fields = []
+        for field in table.schema:
+            if pa.types.is_dictionary(field.type):
+                field = field.with_type(field.type.value_type)
+            elif field.name == 'value':
+                field = field.with_type(pa.float64())
+            fields.append(field)
+        schema = pa.schema(fields)
+    
+    for field in schema:
+        if field.name not in table.column_names:
+            table = table.append_column(field.name, pa.nulls(table.num_rows, field.type))
+    return table.select(schema.names).cast(schema)
+
+def write_dataset(df, root_path=DATASET_DIR, partition_cols=PARTITION_COLS, compression=None):
+    """
+    Grava o dataset completo, substituindo a versão anterior
+    
+    Os dados são gravados em um diretório temporário e trocados no final,
+    de modo que leitores nunca vejam um dataset pela metade.
+    
+    Returns:
+        dict: Manifesto do dataset
+    """
+    writer = DatasetWriter(root_path, partition_cols=partition_cols, compression=compression)
+    writer.append(df)
+    return writer.commit()
+
+class DatasetWriter:
+    """
+    Grava um dataset completo em blocos, substituindo a versão anterior no fim
+    
+    Os blocos são acrescentados a um diretório temporário e o dataset só
+    é trocado em commit(), de modo que leitores nunca vejam um dataset
+    pela metade (como em write_dataset, mas sem ter todos os dados em
+    memória de uma vez).
+    """
+    
+    def __init__(self, root_path=DATASET_DIR, partition_cols=PARTITION_COLS, compression=None):
+        """
+        Args:
+            root_path (str): Diretório final do dataset
+            partition_cols (tuple): Colunas de particionamento
+            compression (str): Codec Parquet (padrão: zstd, com dicionário)
+        """
+        self.root_path = root_path
+        self.tmp_path = root_path.rstrip('/\\') + '.tmp'
+        self.partition_cols = partition_cols
+        self.compression = compression
+        self.schema = None
+        self.blocks = 0
+        # Entradas do manifesto, gravado uma única vez em commit()
+        self.entries = []
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+    
+    def append(self, df):
+        """Grava um bloco no diretório temporário (o esquema do primeiro vale para os demais)"""
+        self.schema = append_partitioned(
+            df, self.tmp_path, basename=f'part-{self.blocks:05d}', partition_cols=self.partition_cols,
+            schema=self.schema, compression=self.compression, entries=self.entries
+        )
+        self.blocks += 1
+    
+    def commit(self):
+        """Troca o dataset anterior pelo novo e retorna o manifesto"""
+        if self.blocks:
+            _write_manifest(self.tmp_path, self.entries, self.partition_cols, append=False)
+        # O anterior só é apagado depois da troca: entre as duas renomeações
+        # o dataset fica ausente por um instante, nunca durante o rmtree
+        old_path = self.root_path.rstrip('/\\') + '.old'
+        shutil.rmtree(old_path, ignore_errors=True)
+        if os.path.exists(self.root_path):
+            os.replace(self.root_path, old_path)
+        os.replace(self.tmp_path, self.root_path)
+        shutil.rmtree(old_path, ignore_errors=True)
+        return load_manifest(self.root_path)
+
+def append_partitioned(df, root_path, basename, partition_cols=PARTITION_COLS, schema=None,
+                       compression=None, entries=None):
+    """
+    Acrescenta um bloco de dados a um dataset Parquet particionado (Hive)
+    
+    Cada partição é ordenada por data, para que as estatísticas dos row
+    groups permitam descartar intervalos de datas na leitura. O manifesto
+    é atualizado com os arquivos gravados; um arquivo regravado com o
+    mesmo caminho substitui a entrada anterior.
+    
+    Args:
+        df (pd.DataFrame): Bloco de dados limpos
+        root_path (str): Diretório raiz do dataset
+        basename (str): Prefixo único dos arquivos deste bloco
+        partition_cols (tuple): Colunas de particionamento
+        schema (pa.Schema): Esquema de destino
+        compression (str): Codec Parquet (padrão: zstd, com dicionário)
+        entries (list): Acumula as entradas do manifesto em vez de
+            regravá-lo a cada bloco (o chamador grava no fim)
+    
+    Returns:
+        pa.Schema: Esquema usado (reutilizável nos próximos blocos)
+    """
+    table = to_arrow_table(df, schema)
+    if 'date' in table.column_names:
+        table = table.sort_by('date')
+    
+    written = []
+    pq.write_to_dataset(
+        table,
+        root_path=root_path,
+        partition_cols=[c for c in partition_cols if c in table.column_names],
+        basename_template=f"{basename}-{{i}}.parquet",
+        row_group_size=ROW_GROUP_SIZE,
+        compression=compression or DEFAULT_COMPRESSION['parquet'],
+        use_dictionary=True,
+        write_statistics=True,
+        file_visitor=written.append
+    )
+    
+    new_entries = [_manifest_entry(root_path, written_file) for written_file in written]
+    if entries is not None:
+        entries.extend(new_entries)
+    else:
+        _write_manifest(root_path, new_entries, partition_cols)
+    return table.schema
+
+def load_manifest(root_path=DATASET_DIR):
+    """Lê o manifesto do dataset (None se não existir)"""
+    path = os.path.join(root_path, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def partition_values(root_path=DATASET_DIR):
+    """
+    Valores distintos de cada coluna de partição, lidos do manifesto
+    
+    Returns:
+        dict: {coluna: [valores ordenados]} (vazio se não houver manifesto)
+    """
+    manifest = load_manifest(root_path)
+    if manifest is None:
+        return {}
+    
+    values = {col: set() for col in manifest['partition_cols']}
+    for entry in manifest['files']:
+        for col, value in entry['partition'].items():
+            values[col].add(value)
+    return {col: sorted(vals) for col, vals in values.items()}
+
+def read_dataset(root_path=DATASET_DIR, cities=None, parameters=None, years=None,
+                 start_date=None, end_date=None, columns=None):
+    """
+    Lê apenas as partições, row groups e colunas que atendem aos filtros
+    
+    Args:
+        root_path (str): Diretório raiz do dataset
+        cities (list): Cidades desejadas (None = todas)
+        parameters (list): Poluentes desejados (None = todos)
+        years (list): Anos desejados (None = todos)
+        start_date, end_date: Intervalo de datas (inclusivo)
+        columns (list): Colunas a carregar (None = todas)
+    
+    Returns:
+        pd.DataFrame: Dados filtrados
+    """
+    filters = {'city': cities, 'parameter': parameters, 'year': years}
+    filters = {col: [str(v) for v in vals] for col, vals in filters.items() if vals is not None}
+    
+    manifest = load_manifest(root_path)
+    if manifest is not None:
+        # Poda de partições pelo manifesto, sem listar diretórios
+        files = [
+            os.path.join(root_path, entry['path'])
+            for entry in manifest['files']
+            if all(col not in entry['partition'] or entry['partition'][col] in vals
+                   for col, vals in filters.items())
+            and _overlaps(entry, start_date, end_date)
+        ]
+        if not files:
+            # Nenhuma partição atende aos filtros: tabela vazia com o esquema
+            first = os.path.join(root_path, manifest['files'][0]['path'])
+            dataset = ds.dataset(
+                [first], format='parquet', partitioning='hive', partition_base_dir=root_path
+            )
+            empty = dataset.schema.empty_table()
+            return (empty.select(columns) if columns else empty).to_pandas()
+        
+        dataset = ds.dataset(
+            files, format='parquet', partitioning='hive', partition_base_dir=root_path
+        )
+    else:
+        dataset = ds.dataset(root_path, format='parquet', partitioning='hive')
+    
+    expression = None
+    for col, vals in filters.items():
+        if col in dataset.schema.names:
+            field = ds.field(col)
+            condition = field.cast(pa.string()).isin(vals)
+            expression = condition if expression is None else expression & condition
+    for bound, op in ((start_date, '__ge__'), (end_date, '__le__')):
+        if bound is not None and 'date' in dataset.schema.names:
+            scalar = pa.scalar(_to_timestamp(bound), type=dataset.schema.field('date').type)
+            condition = getattr(ds.field('date'), op)(scalar)
+            expression = condition if expression is None else expression & condition
+    
+    table = dataset.to_table(columns=columns, filter=expression)
+    return table.to_pandas()
+
+def _overlaps(entry, start_date, end_date):
+    """Verifica se o intervalo de datas de um arquivo intersecta o filtro"""
+    if entry.get('date_min') is None:
+        return True
+    if start_date is not None and _to_timestamp(entry['date_max']) < _to_timestamp(start_date):
+        return False
+    if end_date is not None and _to_timestamp(entry['date_min']) > _to_timestamp(end_date):
+        return False
+    return True
+
+def _to_timestamp(value):
+    return pd.Timestamp(value).to_pydatetime()
+
+def _manifest_entry(root_path, written_file):
+    """Entrada do manifesto de um arquivo gravado (partição, linhas e intervalo de datas)"""
+    relative = os.path.relpath(written_file.path, root_path)
+    partition = {}
+    for segment in relative.replace('\\', '/').split('/')[:-1]:
+        key, _, value = segment.partition('=')
+        partition[key] = unquote(value)
+    
+    metadata = written_file.metadata
+    date_min = date_max = None
+    date_index = metadata.schema.to_arrow_schema().get_field_index('date')
+    if date_index >= 0:
+        stats = [
+            metadata.row_group(i).column(date_index).statistics
+            for i in range(metadata.num_row_groups)
+        ]
+        stats = [s for s in stats if s is not None and s.has_min_max]
+        if stats:
+            date_min = str(min(s.min for s in stats))
+            date_max = str(max(s.max for s in stats))
+    
+    return {
+        'path': relative,
+        'partition': partition,
+        'rows': metadata.num_rows,
+        'row_groups': metadata.num_row_groups,
+        'bytes': os.path.getsize(written_file.path),
+        'date_min': date_min,
+        'date_max': date_max
+    }
+
+def _write_manifest(root_path, entries, partition_cols, append=True):
+    """Grava o manifesto (acrescentando ao atual, se append) com as entradas indexadas pelo caminho"""
+    manifest = (load_manifest(root_path) if append else None) or {
+        'version': 1,
+        'partition_cols': [],
+        'files': []
+    }
+    manifest['partition_cols'] = list(dict.fromkeys(manifest['partition_cols'] + list(partition_cols)))
+    
+    # Arquivo regravado com o mesmo caminho substitui a entrada anterior
+    files = {entry['path']: entry for entry in manifest['files']}
+    files.update((entry['path'], entry) for entry in entries)
+    manifest['files'] = list(files.values())
+    
+    manifest['updated'] = datetime.now().isoformat()
+    manifest['rows'] = sum(entry['rows'] for entry in manifest['files'])
+    
+    os.makedirs(root_path, exist_ok=True)
+    path = os.path.join(root_path, MANIFEST_FILE)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(path + '.tmp', path)
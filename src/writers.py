@@ -0,0 +1,112 @@
+"""
+Camada de saída: grava DataFrames em Parquet, Feather (Arrow IPC) ou CSV
+"""
+import io
+import os
+
+import pyarrow as pa
+import pyarrow.csv as pcsv
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+# Extensão de cada formato suportado
+FORMATS = {'parquet': '.parquet', 'feather': '.arrow', 'csv': '.csv'}
+
+# Compressão padrão por formato (zstd: arquivos menores com leitura rápida)
+DEFAULT_COMPRESSION = {'parquet': 'zstd', 'feather': 'lz4', 'csv': None}
+
+# Formatos gravados por padrão; CSV só quando pedido explicitamente
+DEFAULT_FORMATS = ('parquet',)
+
+MIME_TYPES = {
+    'parquet': 'application/vnd.apache.parquet',
+    'feather': 'application/vnd.apache.arrow.file',
+    'csv': 'text/csv'
+}
+
+def infer_format(path):
+    """Formato a partir da extensão do arquivo"""
+    ext = os.path.splitext(path)[1].lower()
+    for fmt, fmt_ext in FORMATS.items():
+        if ext == fmt_ext or (fmt == 'feather' and ext == '.feather'):
+            return fmt
+    raise ValueError(f"Formato de saída desconhecido: {path}")
+
+def write_table(df, path, fmt=None, compression=None, use_dictionary=True):
+    """
+    Grava um DataFrame em um único arquivo (escrita atômica)
+    
+    Args:
+        df (pd.DataFrame | pa.Table): Dados
+        path (str): Arquivo de destino
+        fmt (str): 'parquet', 'feather' ou 'csv' (padrão: pela extensão)
+        compression (str): Codec (ex.: 'zstd', 'snappy', 'lz4',
+            'uncompressed'); padrão em DEFAULT_COMPRESSION
+        use_dictionary (bool): Codificação por dicionário no Parquet
+    
+    Returns:
+        str: Caminho gravado
+    """
+    fmt = fmt or infer_format(path)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    
+    tmp_path = path + '.tmp'
+    _write(_to_table(df), tmp_path, fmt, compression, use_dictionary)
+    os.replace(tmp_path, path)
+    return path
+
+def write_outputs(df, base_path, formats=DEFAULT_FORMATS, compression=None):
+    """
+    Grava o mesmo DataFrame em cada formato pedido (uma conversão para Arrow)
+    
+    Args:
+        df (pd.DataFrame): Dados
+        base_path (str): Caminho sem extensão (ex.: 'data/processed/cleaned_data')
+        formats (tuple): Formatos de FORMATS
+        compression (str): Codec aplicado aos formatos binários
+    
+    Returns:
+        list: Caminhos gravados
+    """
+    table = _to_table(df)
+    return [
+        write_table(table, base_path + FORMATS[fmt], fmt=fmt, compression=compression)
+        for fmt in formats
+    ]
+
+def to_bytes(df, fmt='csv', compression=None):
+    """Serializa um DataFrame em memória (ex.: botão de download)"""
+    sink = io.BytesIO()
+    _write(_to_table(df), sink, fmt, compression, use_dictionary=True)
+    return sink.getvalue()
+
+def output_paths(base_path, formats=DEFAULT_FORMATS):
+    """Caminhos que write_outputs grava para os formatos pedidos"""
+    return [base_path + FORMATS[fmt] for fmt in formats]
+
+def _to_table(df):
+    if isinstance(df, pa.Table):
+        return df
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+def _write(table, sink, fmt, compression, use_dictionary):
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato de saída desconhecido: {fmt}")
+    compression = compression or DEFAULT_COMPRESSION[fmt]
+    
+    if fmt == 'parquet':
+        if compression == 'uncompressed':
+            compression = 'none'
+        pq.write_table(
+            table, sink, compression=compression,
+            use_dictionary=use_dictionary, write_statistics=True
+        )
+    elif fmt == 'feather':
+        feather.write_feather(table, sink, compression=compression)
+    else:
+        # O escritor CSV do Arrow não aceita colunas de dicionário
+        table = table.cast(pa.schema([
+            field.with_type(field.type.value_type) if pa.types.is_dictionary(field.type) else field
+            for field in table.schema
+        ]))
+        pcsv.write_csv(table, sink)